@@ -0,0 +1,40 @@
+"""Add version and updated_at to books
+
+Revision ID: 5c8d1f3e7a20
+Revises: b7e2c41d9a35
+Create Date: 2026-10-18 10:05:41.903517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8d1f3e7a20'
+down_revision: Union[str, None] = 'b7e2c41d9a35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Server defaults fill the existing rows, the ORM bumps both on every UPDATE
+    op.add_column(
+        'books',
+        sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False)
+    )
+    op.add_column(
+        'books',
+        sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=False
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'updated_at')
+    op.drop_column('books', 'version')
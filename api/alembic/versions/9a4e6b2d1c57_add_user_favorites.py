@@ -0,0 +1,50 @@
+"""Add user favorites and books.favorites_count
+
+Revision ID: 9a4e6b2d1c57
+Revises: 5c8d1f3e7a20
+Create Date: 2026-10-18 11:20:37.514862
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4e6b2d1c57'
+down_revision: Union[str, None] = '5c8d1f3e7a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_favorites',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('book_id', sa.Uuid(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=False
+        ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id', 'book_id')
+    )
+    # The primary key serves lookups by user, this one the cascade from books
+    op.create_index(
+        op.f('ix_user_favorites_book_id'), 'user_favorites', ['book_id'], unique=False
+    )
+    # Existing books have no favorites yet
+    op.add_column(
+        'books',
+        sa.Column('favorites_count', sa.Integer(), server_default=sa.text('0'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'favorites_count')
+    op.drop_index(op.f('ix_user_favorites_book_id'), table_name='user_favorites')
+    op.drop_table('user_favorites')
@@ -0,0 +1,41 @@
+"""Add full-text search vector to books
+
+Revision ID: b7e2c41d9a35
+Revises: 3fb5550ebd23
+Create Date: 2026-10-18 09:40:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c41d9a35'
+down_revision: Union[str, None] = '3fb5550ebd23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated column kept in sync by Postgres, titles rank above content.
+    # It is not part of the SQLModel, see CRUDBooks.search
+    op.execute("""
+    ALTER TABLE books ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
+    """)
+    op.create_index(
+        'ix_books_search_vector',
+        'books',
+        ['search_vector'],
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_books_search_vector', table_name='books')
+    op.drop_column('books', 'search_vector')
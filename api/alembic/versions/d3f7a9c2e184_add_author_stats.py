@@ -0,0 +1,53 @@
+"""Add author_stats
+
+Revision ID: d3f7a9c2e184
+Revises: 9a4e6b2d1c57
+Create Date: 2026-10-18 12:02:15.207431
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7a9c2e184'
+down_revision: Union[str, None] = '9a4e6b2d1c57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'author_stats',
+        sa.Column('author_id', sa.Uuid(), nullable=False),
+        sa.Column('book_count', sa.Integer(), nullable=False),
+        sa.Column('published_count', sa.Integer(), nullable=False),
+        sa.Column('last_updated', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('author_id')
+    )
+    op.create_index(
+        op.f('ix_author_stats_book_count'), 'author_stats', ['book_count'], unique=False
+    )
+    op.create_index(
+        op.f('ix_author_stats_published_count'), 'author_stats', ['published_count'], unique=False
+    )
+    # Backfill from the existing books, from now on CRUDBooks keeps the counts
+    op.execute("""
+    INSERT INTO author_stats (author_id, book_count, published_count, last_updated)
+    SELECT author_id,
+           COUNT(*),
+           SUM(CASE WHEN published THEN 1 ELSE 0 END),
+           MAX(updated_at)
+    FROM books
+    WHERE author_id IS NOT NULL
+    GROUP BY author_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_author_stats_published_count'), table_name='author_stats')
+    op.drop_index(op.f('ix_author_stats_book_count'), table_name='author_stats')
+    op.drop_table('author_stats')
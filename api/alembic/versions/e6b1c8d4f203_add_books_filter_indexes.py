@@ -0,0 +1,47 @@
+"""Add indexes for the filters and sort keys of books
+
+Revision ID: e6b1c8d4f203
+Revises: d3f7a9c2e184
+Create Date: 2026-10-18 13:21:47.560318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b1c8d4f203'
+down_revision: Union[str, None] = 'd3f7a9c2e184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (columns, partial index predicate), see Books.__table_args__
+INDEXES = {
+    'ix_books_author_id_id': (['author_id', 'id'], None),
+    'ix_books_author_id_updated_at_id': (['author_id', 'updated_at', 'id'], None),
+    'ix_books_title_id': (['title', 'id'], None),
+    'ix_books_updated_at_id': (['updated_at', 'id'], None),
+    'ix_books_published_id': (['id'], 'published'),
+    'ix_books_published_updated_at_id': (['updated_at', 'id'], 'published'),
+}
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name, (columns, where) in INDEXES.items():
+            op.create_index(
+                name, 'books', columns, unique=False,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in reversed(INDEXES):
+            op.drop_index(
+                name, table_name='books', postgresql_concurrently=True, if_exists=True
+            )
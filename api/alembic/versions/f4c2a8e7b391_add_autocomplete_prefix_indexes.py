@@ -0,0 +1,49 @@
+"""Add prefix indexes for autocomplete
+
+Revision ID: f4c2a8e7b391
+Revises: e6b1c8d4f203
+Create Date: 2026-10-18 14:08:32.914027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c2a8e7b391'
+down_revision: Union[str, None] = 'e6b1c8d4f203'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name -> (table, expression, partial index predicate), see db.models.
+# "C" collation orders by code point, so a prefix is a range of the index
+INDEXES = {
+    'ix_books_title_prefix': ('books', 'lower(title) COLLATE "C"', None),
+    'ix_users_author_name_prefix': (
+        'users', "lower(first_name || ' ' || last_name) COLLATE \"C\"", "account_type = 'AUTHOR'"
+    ),
+    'ix_users_author_last_name_prefix': (
+        'users', 'lower(last_name) COLLATE "C"', "account_type = 'AUTHOR'"
+    ),
+}
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run in a transaction
+    with op.get_context().autocommit_block():
+        for name, (table, expression, where) in INDEXES.items():
+            op.create_index(
+                name, table, [sa.text(expression)], unique=False,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, (table, _, _) in reversed(INDEXES.items()):
+            op.drop_index(
+                name, table_name=table, postgresql_concurrently=True, if_exists=True
+            )
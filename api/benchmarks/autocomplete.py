@@ -0,0 +1,87 @@
+"""
+Measure autocomplete latency per keystroke: prefix index lookups in the
+database, the in-memory index and the per-prefix result cache.
+
+Run against a database seeded with `make populate records=<n>` and migrated
+to head (on SQLite the database lookups have no prefix index).
+
+Example: python -m benchmarks.autocomplete --words 50
+"""
+import asyncio
+import random
+import statistics
+import time
+from typing import Callable, List
+
+import typer
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from db.crud.autocomplete import AsyncAutocomplete, CRUDAutocomplete, suggestion_cache
+from db.database import get_engine
+from db.models import Books
+
+app = typer.Typer()
+
+
+def sample_prefixes(db: Session, count: int) -> List[str]:
+    """Every prefix typed on the way to `count` titles present in the dataset"""
+    titles = db.exec(select(Books.title).order_by(func.random()).limit(count)).all()
+    if not titles:
+        raise typer.BadParameter("No books found, seed the database first")
+    return [title[:length] for title in titles for length in range(1, min(len(title), 12) + 1)]
+
+
+def measure(fn: Callable[[str], object], prefixes: List[str]) -> List[float]:
+    samples = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        fn(prefix)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: List[float]) -> None:
+    p99 = statistics.quantiles(samples, n=100)[98] if len(samples) > 1 else samples[0]
+    typer.echo(
+        f"{label:>10}: median={statistics.median(samples):.3f}ms p99={p99:.3f}ms "
+        f"max={max(samples):.3f}ms"
+    )
+
+
+@app.command()
+def run(
+    words: int = typer.Option(50, help="Titles to type prefixes of"),
+    limit: int = typer.Option(5, help="Suggestions per kind"),
+):
+    with Session(get_engine()) as db:
+        total = db.exec(select(func.count()).select_from(Books)).one()
+        prefixes = sample_prefixes(db, words)
+        typer.echo(f"{total} books, {len(prefixes)} keystrokes")
+
+        memory = CRUDAutocomplete("memory", index_ttl=3600)
+        start = time.perf_counter()
+        memory.memory.get(db)
+        typer.echo(f"memory index built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        for label, crud in (("database", CRUDAutocomplete("database")), ("memory", memory)):
+            report(label, measure(lambda prefix: crud.suggest(db, prefix, limit), prefixes))
+
+        cached = AsyncAutocomplete(memory)
+        suggestion_cache.clear()
+
+        async def main():
+            for prefix in prefixes:
+                await cached.suggest(db, prefix, limit)
+            samples = []
+            for prefix in prefixes:
+                start = time.perf_counter()
+                await cached.suggest(db, prefix, limit)
+                samples.append((time.perf_counter() - start) * 1000)
+            return samples
+
+        report("cached", asyncio.run(main()))
+
+
+if __name__ == "__main__":
+    app()
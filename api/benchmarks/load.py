@@ -0,0 +1,278 @@
+"""
+Load test of the main API routes with JSON output comparable between commits.
+
+Seeds a benchmark author and books, then drives /auth/login, /books,
+/books/{id}, /users/{id} and /users/me with `--concurrency` clients, either
+in-process (ASGI transport), against a uvicorn started with `--launch`, or
+against a running server with `--url`.
+
+Example:
+    python -m benchmarks.load run --output baseline.json
+    git checkout my-branch
+    python -m benchmarks.load run --output current.json
+    python -m benchmarks.load compare baseline.json current.json --threshold 0.1
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+import typer
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from db.crud.books import books
+from db.crud.users import users
+from db.database import get_engine, init_db
+from db.models import AccountType, Books, Users
+
+app = typer.Typer()
+
+EMAIL = "load@benchmark.local"
+PASSWORD = "benchmark-password"
+
+# Metrics where a higher value is a regression, the others regress when lower
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def seed(num_books: int) -> Dict[str, list]:
+    """Create the benchmark author and top its books up to `num_books`"""
+    with Session(get_engine()) as db:
+        author = users.get_by_email(db, EMAIL) or users.create(db, {
+            "email": EMAIL,
+            "password": PASSWORD,
+            "first_name": "Load",
+            "last_name": "Benchmark",
+            "account_type": AccountType.AUTHOR,
+        })
+        existing = db.exec(
+            select(func.count()).select_from(Books).where(Books.author_id == author.id)
+        ).one()
+        missing = num_books - existing
+        for start in range(0, max(missing, 0), 1000):
+            books.create_books(db, [
+                {"title": f"Benchmark book {start + i}", "content": "x" * 2000}
+                for i in range(min(1000, missing - start))
+            ], author)
+
+        return {
+            "book_ids": [str(id) for id in db.exec(select(Books.id).limit(1000)).all()],
+            "user_ids": [str(id) for id in db.exec(select(Users.id).limit(1000)).all()],
+        }
+
+
+def percentile(quantiles: List[float], samples: List[float], p: int) -> float:
+    return quantiles[p - 1] if quantiles else samples[0]
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    make_request: Callable[[], httpx.Request],
+    requests: int,
+    concurrency: int,
+) -> Dict[str, float]:
+    """Send `requests` requests from `concurrency` concurrent clients"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.send(make_request())
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(quantiles, latencies, 50),
+        "p95_ms": percentile(quantiles, latencies, 95),
+        "p99_ms": percentile(quantiles, latencies, 99),
+    }
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient, ids: Dict[str, list], requests: int, concurrency: int
+) -> Dict[str, Dict[str, float]]:
+    response = await client.post(
+        "/api/v1/auth/login", data={"username": EMAIL, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    def get(path_factory: Callable[[], str]) -> Callable[[], httpx.Request]:
+        return lambda: client.build_request("GET", path_factory(), headers=headers)
+
+    scenarios = {
+        # bcrypt bound, fewer requests keep the run short
+        "POST /auth/login": (
+            lambda: client.build_request(
+                "POST", "/api/v1/auth/login", data={"username": EMAIL, "password": PASSWORD}
+            ),
+            max(1, requests // 10),
+        ),
+        "GET /books": (get(lambda: "/api/v1/books?limit=100"), requests),
+        "GET /books/{id}": (
+            get(lambda: f"/api/v1/books/{random.choice(ids['book_ids'])}"), requests
+        ),
+        "GET /users/{id}": (
+            get(lambda: f"/api/v1/users/{random.choice(ids['user_ids'])}"), requests
+        ),
+        "GET /users/me": (get(lambda: "/api/v1/users/me"), requests),
+    }
+
+    results = {}
+    for name, (make_request, count) in scenarios.items():
+        results[name] = await drive(client, make_request, count, concurrency)
+        typer.echo(
+            f"{name:>18}: {results[name]['rps']:>8.1f} rps  "
+            f"p50={results[name]['p50_ms']:.1f}ms p95={results[name]['p95_ms']:.1f}ms "
+            f"p99={results[name]['p99_ms']:.1f}ms errors={results[name]['errors']}"
+        )
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def launch_uvicorn(workers: int) -> Iterator[str]:
+    """Start uvicorn on a free port with the current environment and wait until it answers"""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(url)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("uvicorn did not start")
+        yield url
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@app.command()
+def run(
+    requests: int = typer.Option(1000, help="Requests per endpoint"),
+    concurrency: int = typer.Option(20, help="Concurrent clients"),
+    num_books: int = typer.Option(1000, help="Books seeded for the benchmark author"),
+    url: Optional[str] = typer.Option(None, help="Benchmark a running server"),
+    launch: bool = typer.Option(False, help="Start uvicorn instead of running in-process"),
+    workers: int = typer.Option(1, help="uvicorn workers with --launch"),
+    output: Optional[str] = typer.Option(None, help="Write results as JSON to this file"),
+):
+    init_db()
+    ids = seed(num_books)
+
+    async def main(base_url: Optional[str]) -> Dict[str, Dict[str, float]]:
+        if base_url:
+            client = httpx.AsyncClient(base_url=base_url, timeout=60)
+        else:
+            from main import app as api
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=api), base_url="http://benchmark"
+            )
+        async with client:
+            return await run_scenarios(client, ids, requests, concurrency)
+
+    if launch and not url:
+        with launch_uvicorn(workers) as launched_url:
+            results = asyncio.run(main(launched_url))
+    else:
+        results = asyncio.run(main(url))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "mode": "url" if url else "uvicorn" if launch else "in-process",
+            "requests": requests,
+            "concurrency": concurrency,
+            "num_books": num_books,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        typer.echo(f"Results written to {output}")
+
+
+@app.command()
+def compare(
+    baseline: str = typer.Argument(..., help="JSON report of the reference commit"),
+    current: str = typer.Argument(..., help="JSON report to check"),
+    threshold: float = typer.Option(0.1, help="Allowed relative regression, 0.1 = 10%"),
+):
+    """Exit with status 1 if any endpoint regressed by more than `threshold`"""
+    with open(baseline) as f:
+        base = json.load(f)["results"]
+    with open(current) as f:
+        curr = json.load(f)["results"]
+
+    regressions = 0
+    for name in (name for name in base if name in curr):
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            before, after = base[name][metric], curr[name][metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            regressed = (
+                change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            )
+            regressions += regressed
+            marker = "REGRESSION" if regressed else ""
+            typer.echo(
+                f"{name:>18} {metric:>7}: {before:>9.1f} -> {after:>9.1f} "
+                f"({change:+.1%}) {marker}"
+            )
+
+    if regressions:
+        typer.echo(f"{regressions} regression(s) above {threshold:.0%}", err=True)
+        raise typer.Exit(code=1)
+    typer.echo("No regressions")
+
+
+if __name__ == "__main__":
+    app()
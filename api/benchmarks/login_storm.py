@@ -0,0 +1,110 @@
+"""
+Measure GET /books latency while a storm of concurrent logins is running.
+
+With bcrypt in the password hashing process pool the /books latency should
+stay close to the idle baseline. Compare with PASSWORD_HASH_WORKERS=0, which
+hashes inside the API process.
+
+Example: python -m benchmarks.login_storm --logins 200 --concurrency 20
+"""
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+import typer
+
+from core.security import password_hasher
+from db.crud.users import users
+from db.database import get_engine, init_db
+from db.models import AccountType
+from main import app as api
+from sqlmodel import Session
+
+app = typer.Typer()
+
+EMAIL = "login-storm@benchmark.local"
+PASSWORD = "benchmark-password"
+
+
+def ensure_user() -> None:
+    with Session(get_engine()) as db:
+        if not users.get_by_email(db, EMAIL):
+            users.create(db, {
+                "email": EMAIL,
+                "password": PASSWORD,
+                "first_name": "Login",
+                "last_name": "Storm",
+                "account_type": AccountType.READER,
+            })
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/api/v1/auth/login", data={"username": EMAIL, "password": PASSWORD}
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def sample_books(client: httpx.AsyncClient, token: str, requests: int) -> List[float]:
+    """Sequential GET /books latencies in milliseconds"""
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(
+            "/api/v1/books?limit=10", headers={"Authorization": f"Bearer {token}"}
+        )
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def storm(client: httpx.AsyncClient, logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await login(client)
+
+    await asyncio.gather(*(one() for _ in range(logins)))
+
+
+def report(label: str, samples: List[float]) -> None:
+    quantiles = statistics.quantiles(samples, n=100)
+    typer.echo(
+        f"{label:>12}: p50={quantiles[49]:.1f}ms p95={quantiles[94]:.1f}ms "
+        f"max={max(samples):.1f}ms"
+    )
+
+
+async def main(logins: int, concurrency: int, requests: int) -> None:
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        token = await login(client)
+        report("idle", await sample_books(client, token, requests))
+
+        storm_task = asyncio.create_task(storm(client, logins, concurrency))
+        samples = await sample_books(client, token, requests)
+        await storm_task
+        report("login storm", samples)
+
+
+@app.command()
+def run(
+    logins: int = typer.Option(200, help="Total logins in the storm"),
+    concurrency: int = typer.Option(20, help="Concurrent logins"),
+    requests: int = typer.Option(100, help="GET /books samples per phase"),
+):
+    init_db()
+    ensure_user()
+    typer.echo(f"Password hash workers: {password_hasher.workers}")
+    try:
+        asyncio.run(main(logins, concurrency, requests))
+    finally:
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,77 @@
+"""
+Measure the per-request cost of the instrumentation middlewares.
+
+Drives a trivial endpoint in-process (no database, no network) with and
+without MetricsMiddleware and QueryStatsMiddleware, so the difference is
+the time the middlewares add to every request.
+
+Example: python -m benchmarks.middleware --requests 20000
+"""
+import asyncio
+import statistics
+import time
+from typing import List, Type
+
+import httpx
+import typer
+from fastapi import FastAPI
+
+from core.metrics import Metrics
+from core.middleware import MetricsMiddleware, QueryStatsMiddleware
+
+app = typer.Typer()
+
+
+def build_app(middlewares: List[Type]) -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    for middleware in middlewares:
+        if middleware is MetricsMiddleware:
+            # Separate registry, keeps the benchmark out of the app metrics
+            api.add_middleware(middleware, registry=Metrics())
+        else:
+            api.add_middleware(middleware)
+    return api
+
+
+async def measure(api: FastAPI, requests: int) -> float:
+    """Mean microseconds per request"""
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for i in range(100):  # warm up
+            await client.get(f"/items/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/items/{i}")
+        return (time.perf_counter() - start) / requests * 1_000_000
+
+
+@app.command()
+def run(
+    requests: int = typer.Option(20_000, help="Requests per configuration and round"),
+    rounds: int = typer.Option(3, help="Rounds, the median is reported"),
+):
+    configurations = {
+        "none": [],
+        "metrics": [MetricsMiddleware],
+        "query stats": [QueryStatsMiddleware],
+        "both": [QueryStatsMiddleware, MetricsMiddleware],
+    }
+    results = {}
+    for name, middlewares in configurations.items():
+        api = build_app(middlewares)
+        results[name] = statistics.median(
+            asyncio.run(measure(api, requests)) for _ in range(rounds)
+        )
+
+    baseline = results["none"]
+    for name, micros in results.items():
+        typer.echo(f"{name:>12}: {micros:>8.1f} us/request  ({micros - baseline:+.1f} us)")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,82 @@
+"""
+Compare OFFSET and keyset (cursor) pagination latency at increasing page depth.
+
+Example: python -m benchmarks.pagination --pages 10000 --limit 100 --seed
+"""
+import statistics
+import time
+from typing import List
+from uuid import uuid4
+
+import typer
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+
+from db.crud.base import encode_cursor
+from db.crud.books import books
+from db.database import get_engine, init_db
+from db.models import Books
+
+app = typer.Typer()
+
+SEED_BATCH_SIZE = 10_000
+
+
+def seed_books(db: Session, total: int) -> None:
+    """Top up the books table to `total` rows using batched multi-row inserts"""
+    existing = db.exec(select(func.count()).select_from(Books)).one()
+    missing = total - existing
+    while missing > 0:
+        batch = min(SEED_BATCH_SIZE, missing)
+        db.exec(
+            insert(Books),
+            params=[
+                {"id": uuid4(), "title": "Benchmark", "content": "x", "published": True}
+                for _ in range(batch)
+            ],
+        )
+        db.commit()
+        missing -= batch
+        typer.echo(f"Seeded {total - missing}/{total} books...")
+
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of `fn` in milliseconds"""
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+@app.command()
+def run(
+    pages: int = typer.Option(10_000, help="Deepest page to measure"),
+    limit: int = typer.Option(100, help="Page size"),
+    repeat: int = typer.Option(5, help="Samples per measurement"),
+    seed: bool = typer.Option(False, help="Insert rows until the deepest page exists"),
+):
+    init_db()
+    with Session(get_engine()) as db:
+        if seed:
+            seed_books(db, pages * limit)
+
+        depths = sorted({1, 10, 100, 1_000, pages} & set(range(1, pages + 1)))
+        typer.echo(f"{'page':>8} {'offset ms':>12} {'keyset ms':>12}")
+        for page in depths:
+            skip = (page - 1) * limit
+            # Resolve the cursor for this depth once, outside the timed section
+            last_id = db.exec(
+                select(Books.id).order_by(Books.id).offset(skip - 1).limit(1)
+            ).first() if skip else None
+            cursor = encode_cursor(last_id) if last_id else None
+
+            offset_ms = timed(lambda: books.get_multi(db, skip=skip, limit=limit), repeat)
+            keyset_ms = timed(lambda: books.get_page(db, cursor, limit), repeat)
+            db.expunge_all()
+            typer.echo(f"{page:>8} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    app()
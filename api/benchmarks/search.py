@@ -0,0 +1,76 @@
+"""
+Compare book search latency with the full-text index against an ILIKE scan.
+
+Run against a database seeded with `make populate records=<n>` and migrated
+to head (the search vector only exists on Postgres; on SQLite both columns
+measure a scan).
+
+Example: python -m benchmarks.search --queries 50
+"""
+import random
+import re
+import statistics
+import time
+from typing import Callable, List
+
+import typer
+from sqlalchemy import func
+from sqlmodel import Session, or_, select
+
+from db.crud.books import books
+from db.database import get_engine
+from db.models import Books
+
+app = typer.Typer()
+
+
+def sample_terms(db: Session, count: int) -> List[str]:
+    """Pick search terms from the titles actually present in the dataset"""
+    titles = db.exec(select(Books.title).order_by(func.random()).limit(count * 5)).all()
+    words = [word for title in titles for word in re.findall(r"\w{4,}", title.lower())]
+    if not words:
+        raise typer.BadParameter("No books found, seed the database first")
+    return random.choices(words, k=count)
+
+
+def measure(fn: Callable[[str], object], terms: List[str]) -> List[float]:
+    samples = []
+    for term in terms:
+        start = time.perf_counter()
+        fn(term)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+@app.command()
+def run(
+    queries: int = typer.Option(50, help="Number of search terms"),
+    limit: int = typer.Option(20, help="Results per query"),
+):
+    with Session(get_engine()) as db:
+        total = db.exec(select(func.count()).select_from(Books)).one()
+        terms = sample_terms(db, queries)
+        typer.echo(f"{total} books, {queries} queries")
+
+        def ilike(term: str):
+            pattern = f"%{term}%"
+            return db.exec(
+                select(Books)
+                .where(or_(Books.title.ilike(pattern), Books.content.ilike(pattern)))
+                .limit(limit)
+            ).all()
+
+        for label, fn in (
+            ("full-text", lambda term: books.search(db, term, limit=limit)),
+            ("ilike scan", ilike),
+        ):
+            samples = measure(fn, terms)
+            db.expunge_all()
+            typer.echo(
+                f"{label:>10}: median={statistics.median(samples):.2f}ms "
+                f"max={max(samples):.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,93 @@
+"""
+Compare CPU time per request of list responses serialized through
+response_model (validation against the Union response model, then
+serialization; jsonable_encoder on FastAPI versions before the dump_json
+fast path) and through json_list.
+
+Serves the same in-memory page of books from routes declaring the
+response_model of GET /books, in-process, so neither the database nor the
+network is measured.
+
+Example: python -m benchmarks.serialization --page-size 100 --requests 2000
+"""
+import asyncio
+import time
+from typing import List, Union
+from uuid import uuid4
+
+import httpx
+import typer
+from fastapi import FastAPI, Response
+
+from db.models import Books, BookSummary
+from v1.serialization import json_list
+
+app = typer.Typer()
+
+
+# response_model of GET /books and GET /books/user
+BOOK_LIST = Union[List[Books], List[BookSummary]]
+
+
+def build_app(page: List[Books], summaries: List[BookSummary]) -> FastAPI:
+    api = FastAPI()
+
+    @api.get("/response-model/full", response_model=BOOK_LIST)
+    async def full_response_model():
+        return page
+
+    @api.get("/json-list/full", response_model=BOOK_LIST)
+    async def full_json_list(response: Response):
+        return json_list(response, page, Books)
+
+    @api.get("/response-model/summary", response_model=BOOK_LIST)
+    async def summary_response_model():
+        return summaries
+
+    @api.get("/json-list/summary", response_model=BOOK_LIST)
+    async def summary_json_list(response: Response):
+        return json_list(response, summaries, BookSummary)
+
+    return api
+
+
+async def cpu_per_request(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    """CPU milliseconds per request"""
+    for _ in range(20):  # warm up
+        await client.get(path)
+    start = time.process_time()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    return (time.process_time() - start) / requests * 1000
+
+
+@app.command()
+def run(
+    page_size: int = typer.Option(100, help="Books per response"),
+    content_size: int = typer.Option(2000, help="Characters of content per book"),
+    requests: int = typer.Option(2000, help="Requests per route"),
+):
+    author_id = uuid4()
+    page = [
+        Books(title=f"Book {i}", content="x" * content_size, author_id=author_id)
+        for i in range(page_size)
+    ]
+    summaries = [BookSummary.model_validate(book, from_attributes=True) for book in page]
+    api = build_app(page, summaries)
+
+    async def main():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for view in ("full", "summary"):
+                before = await cpu_per_request(client, f"/response-model/{view}", requests)
+                after = await cpu_per_request(client, f"/json-list/{view}", requests)
+                typer.echo(
+                    f"{view:>8}: response_model {before:.3f} ms  json_list {after:.3f} ms  "
+                    f"({before / after:.1f}x less CPU)"
+                )
+
+    asyncio.run(main())
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,60 @@
+"""
+Compare get_current_user throughput with and without the verified token cache.
+
+The user cache stays enabled in both runs, so the difference is the cost of
+jwt.decode (signature check, JSON parsing and claim validation).
+
+Example: python -m benchmarks.token_cache --iterations 20000
+"""
+import asyncio
+import time
+
+import typer
+from sqlmodel import Session
+
+from core.security import create_access_token, token_cache
+from db.crud.users import users
+from db.database import get_engine, init_db
+from db.models import AccountType
+from v1.dependencies import get_current_user
+
+app = typer.Typer()
+
+EMAIL = "token-cache@benchmark.local"
+
+
+async def resolve(db: Session, token: str, iterations: int) -> float:
+    """Dependency resolutions per second"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await get_current_user(db, token)
+    return iterations / (time.perf_counter() - start)
+
+
+@app.command()
+def run(iterations: int = typer.Option(20_000, help="Resolutions per run")):
+    init_db()
+    with Session(get_engine()) as db:
+        user = users.get_by_email(db, EMAIL) or users.create(db, {
+            "email": EMAIL,
+            "password": "benchmark-password",
+            "first_name": "Token",
+            "last_name": "Cache",
+            "account_type": AccountType.READER,
+        })
+        token = create_access_token({"sub": str(user.id)})
+
+        maxsize = token_cache.maxsize
+        token_cache.maxsize = 0  # disables caching, see TTLCache.set
+        token_cache.clear()
+        uncached = asyncio.run(resolve(db, token, iterations))
+
+        token_cache.maxsize = maxsize
+        cached = asyncio.run(resolve(db, token, iterations))
+
+    typer.echo(f"uncached: {uncached:>10.0f} resolutions/s")
+    typer.echo(f"  cached: {cached:>10.0f} resolutions/s ({cached / uncached:.1f}x)")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Protocol, Tuple, TypeVar,
+)
+
+ValueType = TypeVar("ValueType")
+
+
+class CacheBackend(Protocol[ValueType]):
+    """
+    Storage of a LoadingCache. TTLCache is the in-process implementation; a
+    shared backend (e.g. Redis with pickled values under a key prefix) only
+    needs these methods, with clear() dropping its own keys.
+    """
+
+    def get(self, key: Hashable) -> Optional[ValueType]: ...
+
+    def set(self, key: Hashable, value: ValueType, ttl: Optional[float] = None) -> None: ...
+
+    def invalidate(self, key: Hashable) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def stats(self) -> Dict[str, Any]: ...
+
+
+class TTLCache(Generic[ValueType]):
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    The cache is per process: entries invalidated in one worker may stay
+    cached in others until they expire, so keep `ttl` short.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, ValueType]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[ValueType]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: ValueType, ttl: Optional[float] = None) -> None:
+        """Store a value, `ttl` overrides the cache default for this entry"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent loads of the same key: the first caller runs the
+    load, callers arriving while it runs await the same result.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[ValueType]]) -> ValueType:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(load())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the load the others wait for
+        return await asyncio.shield(call)
+
+
+class LoadingCache(Generic[ValueType]):
+    """
+    Cache-aside reads with stampede protection: on a miss only one load per
+    key runs (see SingleFlight) and its result is stored unless the cache
+    was invalidated meanwhile, so a load racing a write never stores the
+    old value. None results are not cached.
+    """
+
+    def __init__(self, backend: CacheBackend[ValueType]):
+        self.backend = backend
+        self.flight = SingleFlight()
+        self._generation = 0
+
+    async def get_or_load(
+        self, key: Hashable, load: Callable[[], Awaitable[Optional[ValueType]]]
+    ) -> Optional[ValueType]:
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        async def load_and_store() -> Optional[ValueType]:
+            generation = self._generation
+            loaded = await load()
+            if loaded is not None and generation == self._generation:
+                self.backend.set(key, loaded)
+            return loaded
+
+        return await self.flight.do(key, load_and_store)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._generation += 1
+        self.backend.invalidate(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.backend.clear()
@@ -16,6 +16,35 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "8989")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "fabooks")
     
+    # Full SQLAlchemy URL, overrides the POSTGRES_* settings when set
+    # (e.g. sqlite:///./test.db for running tests without Postgres)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    
+    # Optional read replica serving the GET endpoints, see db.database.get_read_session
+    READ_DATABASE_URL: str = os.getenv("READ_DATABASE_URL", "")
+    # Seconds reads go to the primary after the replica could not be reached
+    READ_REPLICA_RETRY_SECONDS: float = float(os.getenv("READ_REPLICA_RETRY_SECONDS", "30"))
+    
+    # Serve the v1 endpoints through the async engine (asyncpg/aiosqlite)
+    ASYNC_DB: bool = os.getenv("ASYNC_DB", "false").lower() == "true"
+    
+    # Connection pool of each process. Sync handlers run in a threadpool of
+    # 40 threads, so size + overflow should cover it; across all workers
+    # (WEB_CONCURRENCY x (size + overflow)) stay below the server's max_connections
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+    # Seconds to wait for a free connection before failing the request
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "300"))
+    # Connections opened at startup so the first requests don't pay for connecting
+    DB_POOL_WARMUP: int = int(os.getenv("DB_POOL_WARMUP", "0"))
+    # Test every connection with a round trip on checkout
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # Ping the database every N seconds in the background instead (0 disables),
+    # a failed ping invalidates every pooled connection at once. Meant to be
+    # combined with DB_POOL_PRE_PING=false
+    DB_POOL_VALIDATION_INTERVAL: float = float(os.getenv("DB_POOL_VALIDATION_INTERVAL", "0"))
+    
     # Cloud SQL settings
     CLOUD_SQL_CONNECTION_NAME: str = os.getenv("CLOUD_SQL_CONNECTION_NAME", "")
     
@@ -23,6 +52,46 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-for-local-dev")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    
+    # Maximum number of items accepted by the bulk endpoints
+    BULK_MAX_BATCH_SIZE: int = int(os.getenv("BULK_MAX_BATCH_SIZE", "1000"))
+    
+    # Per-process cache of authenticated users, see v1.dependencies.get_current_user
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    
+    # Per-process cache of books by id and by author, see db.crud.books.AsyncCRUDBooks
+    BOOK_CACHE_SIZE: int = int(os.getenv("BOOK_CACHE_SIZE", "10000"))
+    BOOK_CACHE_TTL_SECONDS: float = float(os.getenv("BOOK_CACHE_TTL_SECONDS", "30"))
+    
+    # Rows fetched per round trip by GET /books/export
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # POST /books/import: rows per INSERT, longest accepted line (or CSV
+    # record) and number of line errors reported in the summary
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+    IMPORT_MAX_LINE_BYTES: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    
+    # GET /autocomplete: "database" reads prefix indexes (Postgres), "memory"
+    # searches sorted arrays of all titles and author names rebuilt after
+    # writes, "auto" picks database on Postgres. Results are cached per prefix.
+    AUTOCOMPLETE_MODE: str = os.getenv("AUTOCOMPLETE_MODE", "auto")
+    AUTOCOMPLETE_INDEX_TTL_SECONDS: float = float(os.getenv("AUTOCOMPLETE_INDEX_TTL_SECONDS", "60"))
+    AUTOCOMPLETE_CACHE_SIZE: int = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "10000"))
+    AUTOCOMPLETE_CACHE_TTL_SECONDS: float = float(os.getenv("AUTOCOMPLETE_CACHE_TTL_SECONDS", "30"))
+    
+    # Per-process cache of verified JWT claims, see core.security.verify_token
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    
+    # Requests executing more SQL statements than this are logged as warnings
+    # (0 disables the check), see core.middleware.QueryStatsMiddleware
+    QUERY_BUDGET: int = int(os.getenv("QUERY_BUDGET", "20"))
+    
+    # Password hashing process pool
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    # Hashes allowed in flight (running + queued) before callers wait for a slot
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
 
     class Config:
         case_sensitive = True
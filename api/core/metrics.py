@@ -0,0 +1,136 @@
+"""
+Per-process request metrics in the Prometheus text exposition format.
+
+Request metrics are only updated from the event loop thread (see
+core.middleware.MetricsMiddleware), so the hot path takes no locks.
+Values of other components (connection pools, caches, the password hasher)
+are read through callbacks when /metrics is scraped. Every uvicorn worker
+keeps its own metrics, scrape each instance separately.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, DefaultDict, Dict, List, Tuple
+
+from core.cache import CacheBackend, LoadingCache
+
+# Upper bounds of the latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label of requests that matched no route, keeps 404 scans from adding series
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative histogram, bucket counts are accumulated when rendering"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self.requests_in_flight = 0
+        self.latency: DefaultDict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.responses: DefaultDict[Tuple[str, str, int], int] = defaultdict(int)
+        # name -> (type, help, series) of the values read on every scrape
+        self._callbacks: Dict[str, Tuple[str, str, List[Tuple[Labels, Callable[[], float]]]]] = {}
+
+    def observe_request(self, method: str, route: str, status_code: int, duration: float) -> None:
+        self.latency[method, route].observe(duration)
+        self.responses[method, route, status_code] += 1
+
+    def register_gauge(
+        self, name: str, help_text: str, callback: Callable[[], float], **labels: str
+    ) -> None:
+        """Report `callback()` as gauge `name` on every scrape"""
+        _, _, series = self._callbacks.setdefault(name, ("gauge", help_text, []))
+        series.append((tuple(labels.items()), callback))
+
+    def register_counter(
+        self, name: str, help_text: str, callback: Callable[[], float], **labels: str
+    ) -> None:
+        """Report `callback()`, a monotonically increasing count, as counter `name`"""
+        _, _, series = self._callbacks.setdefault(name, ("counter", help_text, []))
+        series.append((tuple(labels.items()), callback))
+
+    def register_cache(self, name: str, cache: CacheBackend) -> None:
+        """Report size and hit ratio of a cache (e.g. a TTLCache)"""
+        self.register_gauge(
+            "cache_size", "Entries held by the cache", lambda: cache.stats()["size"], cache=name
+        )
+        self.register_counter(
+            "cache_hits_total", "Cache lookups that found an entry", lambda: cache.hits, cache=name
+        )
+        self.register_counter(
+            "cache_misses_total", "Cache lookups that found no entry",
+            lambda: cache.misses, cache=name,
+        )
+        self.register_gauge(
+            "cache_hit_ratio", "Share of cache lookups that found an entry",
+            lambda: cache.stats()["hit_ratio"], cache=name,
+        )
+
+    def register_loading_cache(self, name: str, cache: LoadingCache) -> None:
+        """Report the backend of a LoadingCache plus its coalesced loads"""
+        self.register_cache(name, cache.backend)
+        self.register_counter(
+            "cache_coalesced_loads_total", "Misses that awaited a load already running",
+            lambda: cache.flight.coalesced, cache=name,
+        )
+
+    def reset(self) -> None:
+        """Forget the request metrics, registered callbacks are kept"""
+        self.latency.clear()
+        self.responses.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.requests_in_flight}",
+            "# HELP http_responses_total Responses sent by route and status code",
+            "# TYPE http_responses_total counter",
+        ]
+        # Copy before iterating, requests may add series while rendering
+        for (method, route, status_code), count in list(self.responses.items()):
+            lines.append(
+                f'http_responses_total{{method="{method}",route="{route}",'
+                f'status="{status_code}"}} {count}'
+            )
+
+        lines += [
+            "# HELP http_request_duration_seconds Request latency by route",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), histogram in list(self.latency.items()):
+            labels = f'method="{method}",route="{route}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), list(histogram.counts)):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {histogram.count}")
+
+        for name, (kind, help_text, series) in list(self._callbacks.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, callback in list(series):
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels)
+                series_name = f"{name}{{{label_text}}}" if label_text else name
+                lines.append(f"{series_name} {callback()}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
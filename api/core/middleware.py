@@ -0,0 +1,114 @@
+import logging
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import settings
+from core.metrics import UNMATCHED_ROUTE, Metrics, metrics
+from db.instrumentation import track_queries
+
+logger = logging.getLogger(__name__)
+
+# Response header with the number of SQL statements executed by the request
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryStatsMiddleware:
+    """
+    Count the SQL statements of every request and report them as
+    Server-Timing and X-Query-Count response headers plus log fields.
+    Requests above `budget` statements are logged as warnings.
+
+    Headers are sent before streamed bodies, so statements executed while
+    streaming only show up in the log.
+    """
+
+    def __init__(self, app: ASGIApp, budget: int = settings.QUERY_BUDGET):
+        self.app = app
+        self.budget = budget
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        with track_queries() as stats:
+            async def send_with_stats(message: Message) -> None:
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", (
+                        f'db;dur={stats.total_time * 1000:.2f};desc="{stats.count} queries", '
+                        f"db-slowest;dur={stats.slowest_time * 1000:.2f}, "
+                        f"app;dur={(time.perf_counter() - started) * 1000:.2f}"
+                    ))
+                    headers[QUERY_COUNT_HEADER] = str(stats.count)
+                await send(message)
+
+            await self.app(scope, receive, send_with_stats)
+
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status_code": status_code,
+            "query_count": stats.count,
+            "db_time_ms": round(stats.total_time * 1000, 2),
+            "slowest_query_ms": round(stats.slowest_time * 1000, 2),
+            "slowest_statement": stats.slowest_statement,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if self.budget and stats.count > self.budget:
+            logger.warning(
+                f"{scope['method']} {scope['path']} executed {stats.count} SQL statements "
+                f"(budget {self.budget})",
+                extra=fields,
+            )
+        else:
+            logger.debug(
+                f"{scope['method']} {scope['path']}: {stats.count} SQL statements "
+                f"in {fields['db_time_ms']}ms",
+                extra=fields,
+            )
+
+
+class MetricsMiddleware:
+    """
+    Record latency and status code of every request by route template
+    (e.g. /books/{book_id}) and the number of requests in flight.
+    Only runs on the event loop thread, so updates need no locks.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics):
+        self.app = app
+        self.metrics = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.requests_in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.requests_in_flight -= 1
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            self.metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status_code,
+                time.perf_counter() - started,
+            )
@@ -1,9 +1,20 @@
+import asyncio
 import datetime
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from datetime import timedelta
-from typing import Optional, Tuple
+from typing import Callable, Deque, Optional, Tuple, Union
+from fastapi.concurrency import run_in_threadpool
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 
+from core.cache import TTLCache
+from core.config import settings
+from core.metrics import metrics
+
 # Constants
 SECRET_KEY = "your-secret-key-here"  # In production, use proper secret management
 ALGORITHM = "HS256"
@@ -22,6 +33,178 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class Slots:
+    """
+    Counting semaphore shared by threads and event loops. Threads block in
+    acquire(), coroutines await acquire_async() without occupying a thread
+    of the threadpool. A released slot is handed to the longest waiter.
+    """
+
+    def __init__(self, size: int):
+        self._free = size
+        self._lock = threading.Lock()
+        self._waiters: Deque[Union[threading.Event, "asyncio.Future[None]"]] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def acquire_async(self) -> None:
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiting = future in self._waiters
+                if waiting:
+                    self._waiters.remove(future)
+            # A slot handed over before the cancellation is passed on, one
+            # handed over after it is passed on by _hand_over
+            if not waiting and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            if not self._waiters:
+                self._free += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+            return
+        try:
+            waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter)
+        except RuntimeError:
+            # The loop of the waiter is closed
+            self.release()
+
+    def _hand_over(self, future: "asyncio.Future[None]") -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification in a dedicated process pool.
+
+    bcrypt costs hundreds of milliseconds of CPU per call, so running it in
+    the API process starves every other request. At most `max_pending` calls
+    are in flight at once; further callers wait for a slot (async callers
+    on the event loop, see Slots). With `workers` set to 0 hashing runs
+    inline in the calling thread.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._slots = Slots(max_pending)
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of hashes submitted and not finished yet"""
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of hashes waiting for a free worker process"""
+        return max(0, self._in_flight - self.workers)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: forking a process that holds DB connections and threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _track(self, delta: int) -> None:
+        with self._in_flight_lock:
+            self._in_flight += delta
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        """Submit to the pool, the caller must already hold a slot"""
+        self._track(1)
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._track(-1)
+            self._slots.release()
+            raise
+
+        def done(_: Future) -> None:
+            self._track(-1)
+            self._slots.release()
+
+        future.add_done_callback(done)
+        return future
+
+    def _run(self, fn: Callable, *args):
+        if not self.workers:
+            return fn(*args)
+        self._slots.acquire()
+        return self._submit(fn, *args).result()
+
+    async def _run_async(self, fn: Callable, *args):
+        if not self.workers:
+            return await run_in_threadpool(fn, *args)
+        await self._slots.acquire_async()
+        return await asyncio.wrap_future(self._submit(fn, *args))
+
+    def hash(self, password: str) -> str:
+        return self._run(get_password_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(verify_password, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run_async(get_password_hash, password)
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+metrics.register_gauge(
+    "password_hash_in_flight", "Password hashes running or queued",
+    lambda: password_hasher.in_flight,
+)
+metrics.register_gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a worker process",
+    lambda: password_hasher.queue_depth,
+)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -66,6 +249,32 @@ def create_token_pair(data: dict) -> Tuple[str, str]:
     return access_token, refresh_token
 
 
+# Verified claims by raw token, each entry expires together with its token
+token_cache: TTLCache[dict] = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE, ttl=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+)
+metrics.register_cache("tokens", token_cache)
+
+
+def verify_token(token: str) -> dict:
+    """
+    Decode and verify a JWT, raising JWTError if it is invalid.
+    Clients reuse tokens until they expire, so verified claims are cached
+    and repeated tokens skip signature verification and parsing. Tokens
+    without an expiry are verified every time. Each caller gets its own
+    copy of the claims.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return dict(payload)
+    
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    exp = payload.get("exp")
+    if exp is not None and exp > time.time():
+        token_cache.set(token, dict(payload), ttl=min(exp - time.time(), token_cache.ttl))
+    return payload
+
+
 def decode_token(token: str) -> dict:
     """Decode a JWT token without validation"""
     try:
@@ -0,0 +1,442 @@
+"""
+Query plan audit behind `manage.py db-audit`.
+
+Calls every read and write of the CRUD objects once against a seeded
+database, inside a transaction that is rolled back, records the statements
+they emit with their parameters and EXPLAINs each of them. Postgres and
+SQLite are supported; unused indexes and per-table bloat need the Postgres
+statistics views.
+"""
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+from sqlalchemy import Connection, Engine, create_engine, event, inspect
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, select
+
+from db.crud.author_stats import author_stats
+from db.crud.books import books
+from db.crud.favorites import favorites
+from db.crud.users import users
+from db.models import Books, Users
+
+# Statements worth explaining, transaction control is left out
+EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+# Predicates in the WHERE clauses emitted by SQLAlchemy, e.g. `books.author_id = ?`
+PREDICATE = r"\b{table}\.(\w+)\s*(?:=|<|>|<=|>=|IN\b|LIKE\b|ILIKE\b|IS\b)"
+
+
+@dataclass
+class Sample:
+    """Existing rows the audited calls operate on"""
+    author_id: UUID
+    book_id: UUID
+    email: str
+    search_term: str
+
+
+@dataclass
+class CapturedQuery:
+    operation: str
+    statement: str
+    parameters: Any
+
+
+@dataclass
+class SeqScan:
+    table: str
+    detail: str
+
+
+@dataclass
+class PlanReport:
+    query: CapturedQuery
+    plan: List[str]
+    seq_scans: List[SeqScan] = field(default_factory=list)
+
+
+@dataclass
+class IndexSuggestion:
+    table: str
+    columns: Tuple[str, ...]
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return f"ix_{self.table}_{'_'.join(self.columns)}"
+
+
+@dataclass
+class UnusedIndex:
+    table: str
+    index: str
+    size: int
+
+
+@dataclass
+class TableBloat:
+    table: str
+    live: int
+    dead: int
+    # Tuples on Postgres, pages of the whole database file on SQLite
+    unit: str = "tuples"
+
+    @property
+    def dead_ratio(self) -> float:
+        total = self.live + self.dead
+        return self.dead / total if total else 0.0
+
+
+@dataclass
+class AuditReport:
+    dialect: str
+    plans: List[PlanReport] = field(default_factory=list)
+    missing_fk_indexes: List[IndexSuggestion] = field(default_factory=list)
+    unused_indexes: List[UnusedIndex] = field(default_factory=list)
+    bloat: List[TableBloat] = field(default_factory=list)
+    suggestions: List[IndexSuggestion] = field(default_factory=list)
+
+
+def crud_operations(sample: Sample) -> List[Tuple[str, Callable[[Session], Any]]]:
+    """One representative call of every CRUD method, writes last"""
+    def author(db: Session) -> Users:
+        return db.get(Users, sample.author_id)
+
+    return [
+        ("books.get", lambda db: books.get(db, sample.book_id)),
+        ("books.get_multi", lambda db: books.get_multi(db, 100, 100)),
+        ("books.get_page", lambda db: books.get_page(db, None, 100)),
+        ("books.get_books_by_author", lambda db: books.get_books_by_author(db, sample.author_id)),
+        ("books.get_books_by_author_page",
+         lambda db: books.get_books_by_author_page(db, sample.author_id)),
+        ("books.get_summaries_page",
+         lambda db: books.get_summaries_page(db, None, 100, sample.author_id)),
+        ("books.get_content", lambda db: books.get_content(db, sample.book_id)),
+        ("books.get_author_ids", lambda db: books.get_author_ids(db, [sample.book_id])),
+        ("books.search", lambda db: books.search(db, sample.search_term)),
+        ("users.get", lambda db: users.get(db, sample.author_id)),
+        ("users.get_by_email", lambda db: users.get_by_email(db, sample.email)),
+        ("users.get_page", lambda db: users.get_page(db, None, 100)),
+        ("users.get_detail", lambda db: users.get_detail(db, sample.author_id)),
+        ("users.get_details_page", lambda db: users.get_details_page(db, None, 100)),
+        ("favorites.get_favorited",
+         lambda db: favorites.get_favorited(db, sample.author_id, [sample.book_id])),
+        ("favorites.get_books_page", lambda db: favorites.get_books_page(db, sample.author_id)),
+        ("author_stats.get_leaderboard", lambda db: author_stats.get_leaderboard(db)),
+        ("books.create_book",
+         lambda db: books.create_book(db, {"title": "Audit", "content": "Audit"}, author(db))),
+        ("books.update", lambda db: books.update(db, sample.book_id, {"published": True})),
+        ("favorites.add", lambda db: favorites.add(db, sample.author_id, sample.book_id)),
+        ("favorites.remove", lambda db: favorites.remove(db, sample.author_id, sample.book_id)),
+        ("books.delete", lambda db: books.delete(db, sample.book_id)),
+    ]
+
+
+def find_sample(db: Session) -> Sample:
+    row = db.exec(
+        select(Books.id, Books.title, Books.author_id, Users.email)
+        .join(Users, Users.id == Books.author_id)
+        .limit(1)
+    ).first()
+    if row is None:
+        raise ValueError("No books to audit with, seed the database (manage.py populate)")
+    book_id, title, author_id, email = row
+    words = re.findall(r"\w+", title)
+    return Sample(author_id, book_id, email, words[0] if words else title)
+
+
+@contextmanager
+def capture_statements(
+    connection: Connection,
+    captured: List[CapturedQuery],
+    on_capture: Optional[Callable[[CapturedQuery], None]] = None,
+) -> Iterator[Callable[[str], None]]:
+    """
+    Record the statements executed on `connection`, `on_capture` is called
+    with each of them before it runs. Yields a function setting the
+    operation name attached to the following statements.
+    """
+    operation = ["?"]
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Multi-row INSERTs have a single plan, explaining one row set is enough
+        if EXPLAINABLE.match(statement):
+            params = parameters[0] if executemany else parameters
+            query = CapturedQuery(operation[0], statement, params)
+            captured.append(query)
+            if on_capture:
+                on_capture(query)
+
+    event.listen(connection, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield lambda name: operation.__setitem__(0, name)
+    finally:
+        event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(
+    connection: Connection, query: CapturedQuery, tables: Sequence[str], analyze: bool = False
+) -> PlanReport:
+    """EXPLAIN a captured statement, ANALYZE executes it (Postgres only)"""
+    if connection.dialect.name == "postgresql":
+        options = "FORMAT JSON, ANALYZE, BUFFERS" if analyze else "FORMAT JSON"
+        result = connection.exec_driver_sql(
+            f"EXPLAIN ({options}) {query.statement}", query.parameters
+        ).scalar()
+        plan = result if isinstance(result, list) else json.loads(result)
+        report = PlanReport(query, [])
+        _walk_postgres_plan(plan[0]["Plan"], report, 0)
+        return report
+
+    rows = connection.exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {query.statement}", query.parameters
+    ).all()
+    report = PlanReport(query, [row[-1] for row in rows])
+    for detail in report.plan:
+        # "SCAN books [USING INDEX ...]" reads the whole table (in index
+        # order), only "SEARCH" looks rows up through an index
+        words = detail.split()
+        if len(words) >= 2 and words[0] == "SCAN" and words[1] in tables:
+            report.seq_scans.append(SeqScan(words[1], detail))
+    return report
+
+
+def _walk_postgres_plan(node: Dict[str, Any], report: PlanReport, depth: int) -> None:
+    rows = node.get("Actual Rows", node.get("Plan Rows"))
+    line = f"{'  ' * depth}{node['Node Type']}"
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+    report.plan.append(f"{line} (rows={rows})")
+    if node["Node Type"] == "Seq Scan":
+        detail = f"rows={rows}"
+        if "Filter" in node:
+            detail += f", filter: {node['Filter']}"
+        report.seq_scans.append(SeqScan(node["Relation Name"], detail))
+    for child in node.get("Plans", ()):
+        _walk_postgres_plan(child, report, depth + 1)
+
+
+def _indexed_prefixes(inspector, table: str) -> List[Tuple[str, ...]]:
+    """Column lists of the primary key and every index of `table`"""
+    prefixes = [tuple(inspector.get_pk_constraint(table)["constrained_columns"])]
+    prefixes += [tuple(index["column_names"]) for index in inspector.get_indexes(table)]
+    prefixes += [
+        tuple(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table)
+    ]
+    return prefixes
+
+
+def _is_indexed(prefixes: List[Tuple[str, ...]], columns: Tuple[str, ...]) -> bool:
+    return any(prefix[:len(columns)] == columns for prefix in prefixes)
+
+
+def find_missing_fk_indexes(inspector) -> List[IndexSuggestion]:
+    """Foreign keys whose columns don't lead any index (slow joins and cascades)"""
+    missing = []
+    for table in inspector.get_table_names():
+        prefixes = _indexed_prefixes(inspector, table)
+        for foreign_key in inspector.get_foreign_keys(table):
+            columns = tuple(foreign_key["constrained_columns"])
+            if not _is_indexed(prefixes, columns):
+                missing.append(IndexSuggestion(
+                    table, columns, [f"foreign key to {foreign_key['referred_table']}"]
+                ))
+    return missing
+
+
+def suggest_from_scans(inspector, plans: List[PlanReport]) -> List[IndexSuggestion]:
+    """Index the columns the statements filter on where they scanned a whole table"""
+    suggestions = []
+    for report in plans:
+        for scan in report.seq_scans:
+            prefixes = _indexed_prefixes(inspector, scan.table)
+            where = re.split(r"\bWHERE\b", report.query.statement, maxsplit=1, flags=re.IGNORECASE)
+            if len(where) < 2:
+                continue
+            columns = tuple(dict.fromkeys(
+                re.findall(PREDICATE.format(table=re.escape(scan.table)), where[1], re.IGNORECASE)
+            ))
+            if columns and not _is_indexed(prefixes, columns):
+                suggestions.append(IndexSuggestion(
+                    scan.table, columns, [f"full scan in {report.query.operation}"]
+                ))
+    return suggestions
+
+
+def merge_suggestions(suggestions: List[IndexSuggestion]) -> List[IndexSuggestion]:
+    merged: Dict[Tuple[str, Tuple[str, ...]], IndexSuggestion] = {}
+    for suggestion in suggestions:
+        key = (suggestion.table, suggestion.columns)
+        if key in merged:
+            merged[key].reasons += [
+                reason for reason in suggestion.reasons if reason not in merged[key].reasons
+            ]
+        else:
+            merged[key] = IndexSuggestion(
+                suggestion.table, suggestion.columns, list(suggestion.reasons)
+            )
+    return list(merged.values())
+
+
+def find_unused_indexes(connection: Connection) -> List[UnusedIndex]:
+    """Indexes never scanned since the statistics were reset (Postgres only)"""
+    if connection.dialect.name != "postgresql":
+        return []
+    rows = connection.exec_driver_sql("""
+        SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid)
+        FROM pg_stat_user_indexes s
+        JOIN pg_index i ON i.indexrelid = s.indexrelid
+        WHERE s.idx_scan = 0 AND NOT i.indisunique AND NOT i.indisprimary
+        ORDER BY pg_relation_size(s.indexrelid) DESC
+    """).all()
+    return [UnusedIndex(*row) for row in rows]
+
+
+def find_bloat(connection: Connection) -> List[TableBloat]:
+    """Dead tuples per table on Postgres, free pages of the database file on SQLite"""
+    if connection.dialect.name == "postgresql":
+        rows = connection.exec_driver_sql("""
+            SELECT relname, n_live_tup, n_dead_tup
+            FROM pg_stat_user_tables
+            ORDER BY n_dead_tup DESC
+        """).all()
+        return [TableBloat(*row) for row in rows]
+    if connection.dialect.name == "sqlite":
+        pages = connection.exec_driver_sql("PRAGMA page_count").scalar()
+        free = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        return [TableBloat("(database)", pages - free, free, unit="pages")]
+    return []
+
+
+@contextmanager
+def transactional_engine(engine: Engine) -> Iterator[Engine]:
+    """
+    pysqlite only emits BEGIN before DML, so SAVEPOINTs don't nest in the
+    outer transaction and the commits of the CRUD methods would persist.
+    On SQLite, yield a separate engine applying SQLAlchemy's documented fix.
+    """
+    if engine.dialect.name != "sqlite":
+        yield engine
+        return
+    sqlite_engine = create_engine(engine.url, poolclass=NullPool)
+
+    @event.listens_for(sqlite_engine, "connect")
+    def disable_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(sqlite_engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    try:
+        yield sqlite_engine
+    finally:
+        sqlite_engine.dispose()
+
+
+def run_audit(engine: Engine, analyze: bool = False) -> AuditReport:
+    """Audit the CRUD queries on `engine`, the database is left unchanged"""
+    report = AuditReport(dialect=engine.dialect.name)
+    with transactional_engine(engine) as audit_engine, audit_engine.connect() as connection:
+        inspector = inspect(connection)
+        tables = inspector.get_table_names()
+        # End the transaction the inspector began
+        connection.rollback()
+        transaction = connection.begin()
+        try:
+            def explain_before_running(query: CapturedQuery) -> None:
+                # EXPLAIN ANALYZE executes the statement: explained after running,
+                # a write would collide with its own effects (e.g. the inserted
+                # row), so explain it first and roll back what ANALYZE changed
+                savepoint = connection.begin_nested()
+                try:
+                    report.plans.append(explain(connection, query, tables, analyze))
+                finally:
+                    savepoint.rollback()
+
+            captured: List[CapturedQuery] = []
+            # Commits of the CRUD methods only release savepoints
+            with Session(bind=connection, join_transaction_mode="create_savepoint") as db:
+                sample = find_sample(db)
+                with capture_statements(connection, captured, explain_before_running) as set_operation:
+                    for name, call in crud_operations(sample):
+                        set_operation(name)
+                        call(db)
+        finally:
+            transaction.rollback()
+
+        report.missing_fk_indexes = find_missing_fk_indexes(inspector)
+        report.unused_indexes = find_unused_indexes(connection)
+        report.bloat = find_bloat(connection)
+    report.suggestions = merge_suggestions(
+        report.missing_fk_indexes + suggest_from_scans(inspector, report.plans)
+    )
+    return report
+
+
+MIGRATION_TEMPLATE = '''"""Add indexes suggested by db-audit
+
+Revision ID: {revision}
+Revises: {down_revision}
+Create Date: {create_date}
+
+Generated by `manage.py db-audit --migration`, review before applying.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '{revision}'
+down_revision: Union[str, None] = '{down_revision}'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run in a transaction
+    with op.get_context().autocommit_block():
+{upgrade}
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+{downgrade}
+'''
+
+
+def render_migration(
+    suggestions: List[IndexSuggestion],
+    revision: str,
+    down_revision: Optional[str],
+    create_date: Optional[datetime] = None,
+) -> str:
+    """Source of an Alembic migration creating the suggested indexes concurrently"""
+    upgrade, downgrade = [], []
+    for suggestion in suggestions:
+        upgrade += [f"        # {reason}" for reason in suggestion.reasons]
+        upgrade.append(
+            f"        op.create_index('{suggestion.name}', '{suggestion.table}', "
+            f"{list(suggestion.columns)!r}, unique=False, postgresql_concurrently=True, "
+            f"if_not_exists=True)"
+        )
+    for suggestion in reversed(suggestions):
+        downgrade.append(
+            f"        op.drop_index('{suggestion.name}', table_name='{suggestion.table}', "
+            f"postgresql_concurrently=True, if_exists=True)"
+        )
+    return MIGRATION_TEMPLATE.format(
+        revision=revision,
+        down_revision=down_revision,
+        create_date=create_date or datetime.now(),
+        upgrade="\n".join(upgrade) or "        pass",
+        downgrade="\n".join(downgrade) or "        pass",
+    )
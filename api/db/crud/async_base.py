@@ -0,0 +1,37 @@
+from typing import Any, Callable, Coroutine, Generic, TypeVar
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.crud.base import CRUDBase
+from db.database import DBSession
+
+CRUDType = TypeVar("CRUDType", bound=CRUDBase)
+
+
+class AsyncCRUD(Generic[CRUDType]):
+    """
+    Awaitable facade over a sync CRUD object.
+
+    Every method of the wrapped CRUD is exposed as a coroutine taking the same
+    arguments. With an AsyncSession the query runs on the async driver through
+    AsyncSession.run_sync; with a regular Session it is offloaded to the
+    threadpool so the event loop is never blocked.
+    """
+
+    def __init__(self, crud: CRUDType):
+        self.crud = crud
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        method = getattr(self.crud, name)
+
+        async def call(db: DBSession, *args, **kwargs):
+            return await run_db(db, method, *args, **kwargs)
+
+        return call
+
+
+async def run_db(db: DBSession, fn: Callable, *args, **kwargs):
+    """Call fn(session, *args, **kwargs) without blocking the event loop"""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
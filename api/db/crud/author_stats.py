@@ -0,0 +1,133 @@
+"""
+Per-author book counts. CRUDBooks adds the changes of every write to books
+to author_stats in the same transaction, so reads never count books.
+Rows written around the CRUD layer (e.g. `manage.py populate`) are fixed by
+`manage.py reconcile-author-stats`.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+from db.crud.async_base import AsyncCRUD
+from db.crud.base import CRUDBase
+from db.models import AuthorRanking, AuthorStats, Books, Users, utcnow
+
+# (author_id, published) of a book before or after a change
+BookState = Tuple[Optional[UUID], bool]
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+LEADERBOARD_COLUMNS = {"books": AuthorStats.book_count, "published": AuthorStats.published_count}
+
+
+def count_deltas(
+    removed: Iterable[BookState] = (), added: Iterable[BookState] = ()
+) -> Dict[UUID, Tuple[int, int]]:
+    """Change of the (book, published) counts of every author involved"""
+    deltas = defaultdict(lambda: [0, 0])
+    for sign, states in ((-1, removed), (1, added)):
+        for author_id, published in states:
+            if author_id is None:
+                continue
+            delta = deltas[author_id]
+            delta[0] += sign
+            delta[1] += sign * bool(published)
+    return {author_id: tuple(delta) for author_id, delta in deltas.items()}
+
+
+class CRUDAuthorStats(CRUDBase[AuthorStats]):
+    def apply(self, db: Session, deltas: Dict[UUID, Tuple[int, int]]) -> None:
+        """
+        Add count deltas (see count_deltas) and touch last_updated of every
+        author in `deltas`, without committing. One statement on Postgres
+        and SQLite.
+        """
+        if not deltas:
+            return
+        now = utcnow()
+        rows = [
+            {"author_id": author_id, "book_count": books, "published_count": published,
+             "last_updated": now}
+            for author_id, (books, published) in deltas.items()
+        ]
+        upsert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if upsert is None:
+            for row in rows:
+                self._apply_row(db, row)
+            return
+        statement = upsert(AuthorStats).values(rows)
+        db.exec(statement.on_conflict_do_update(
+            index_elements=[AuthorStats.author_id],
+            set_={
+                "book_count": AuthorStats.book_count + statement.excluded.book_count,
+                "published_count": (
+                    AuthorStats.published_count + statement.excluded.published_count
+                ),
+                "last_updated": statement.excluded.last_updated,
+            },
+        ))
+
+    @staticmethod
+    def _apply_row(db: Session, row: dict) -> None:
+        """Portable UPDATE, then INSERT when the author has no row yet"""
+        result = db.exec(
+            update(AuthorStats)
+            .where(AuthorStats.author_id == row["author_id"])
+            .values(
+                book_count=AuthorStats.book_count + row["book_count"],
+                published_count=AuthorStats.published_count + row["published_count"],
+                last_updated=row["last_updated"],
+            )
+        )
+        if not result.rowcount:
+            db.exec(insert(AuthorStats).values(row))
+
+    def reconcile(self, db: Session, author_ids: List[UUID]) -> int:
+        """
+        Recompute the stats of `author_ids` from books and commit. Returns
+        the number of authors with books. Writes to the same authors while
+        this runs may be lost, run it when books are not being written.
+        """
+        if not author_ids:
+            return 0
+        counts = db.exec(
+            select(
+                Books.author_id,
+                func.count(),
+                func.sum(case((Books.published, 1), else_=0)),
+                func.max(Books.updated_at),
+            )
+            .where(Books.author_id.in_(author_ids))
+            .group_by(Books.author_id)
+        ).all()
+        db.exec(delete(AuthorStats).where(AuthorStats.author_id.in_(author_ids)))
+        if counts:
+            db.exec(insert(AuthorStats), params=[
+                {"author_id": author_id, "book_count": books, "published_count": published,
+                 "last_updated": last_updated}
+                for author_id, books, published, last_updated in counts
+            ])
+        db.commit()
+        return len(counts)
+
+    def get_leaderboard(
+        self, db: Session, by: Literal["books", "published"] = "books", limit: int = 10
+    ) -> List[AuthorRanking]:
+        """Authors with the most (published) books, read from the indexed counts"""
+        rows = db.exec(
+            select(
+                AuthorStats.author_id, Users.first_name, Users.last_name,
+                AuthorStats.book_count, AuthorStats.published_count, AuthorStats.last_updated,
+            )
+            .join(Users, Users.id == AuthorStats.author_id)
+            .order_by(LEADERBOARD_COLUMNS[by].desc(), AuthorStats.author_id)
+            .limit(limit)
+        ).all()
+        return [AuthorRanking.model_validate(row._mapping) for row in rows]
+
+
+author_stats = CRUDAuthorStats(AuthorStats)
+async_author_stats = AsyncCRUD(author_stats)
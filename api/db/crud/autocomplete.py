@@ -0,0 +1,354 @@
+"""
+Typeahead suggestions of book titles and author names by prefix.
+
+On Postgres prefixes are ranges of the expression indexes of lowercased
+titles and names in "C" collation (see db.models), read in index order so a
+lookup stops after `limit` entries. Elsewhere (SQLite in development and
+tests), or with AUTOCOMPLETE_MODE=memory, lookups binary search sorted
+arrays of every title and author name held by the process, patched with the
+rows changed by writes. Results of both are cached per prefix.
+"""
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Callable, Generic, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+from uuid import UUID
+from sqlalchemy import and_, func, literal_column, or_
+from sqlmodel import Session, select
+from db.crud.async_base import run_db
+from db.crud.base import prefix_clauses, register_invalidation_hook
+from db.database import DBSession
+from db.models import (
+    AuthorSuggestion, AutocompleteResult, Books, TitleSuggestion, Users, AccountType,
+)
+from core.cache import LoadingCache, TTLCache
+from core.config import settings
+from core.metrics import metrics
+
+ValueType = TypeVar("ValueType")
+
+# Results by (prefix, limit), cleared by any write to books or users
+suggestion_cache: LoadingCache[AutocompleteResult] = LoadingCache(
+    TTLCache(maxsize=settings.AUTOCOMPLETE_CACHE_SIZE, ttl=settings.AUTOCOMPLETE_CACHE_TTL_SECONDS)
+)
+metrics.register_loading_cache("autocomplete", suggestion_cache)
+
+
+def normalize(prefix: str) -> str:
+    """Lookup key of a typed prefix, trailing spaces are kept ("john " -> last names)"""
+    return prefix.lstrip().lower()
+
+
+def full_name(first_name: str, last_name: str) -> str:
+    return f"{first_name} {last_name}"
+
+
+class PrefixIndex(Generic[ValueType]):
+    """
+    Values sorted by key, then by `order` of the value (if given) and id.
+    The entries of a key prefix are found by binary search.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[Tuple[str, UUID, ValueType]] = (),
+        order: Optional[Callable[[ValueType], str]] = None,
+    ):
+        self._order = order
+        rows = sorted(
+            ((self._sort_key(key, id, value), value) for key, id, value in entries),
+            key=itemgetter(0),
+        )
+        self._sort_keys = [sort_key for sort_key, _ in rows]
+        self._values = [value for _, value in rows]
+        self._sort_key_of = {sort_key[2]: sort_key for sort_key in self._sort_keys}
+
+    def _sort_key(self, key: str, id: UUID, value: ValueType) -> Tuple[str, str, UUID]:
+        return key, self._order(value) if self._order else "", id
+
+    def __len__(self) -> int:
+        return len(self._sort_keys)
+
+    def search(self, prefix: str) -> Iterator[Tuple[str, UUID, ValueType]]:
+        """Entries whose key starts with `prefix`, in index order"""
+        index = bisect_left(self._sort_keys, (prefix,))
+        while index < len(self._sort_keys) and self._sort_keys[index][0].startswith(prefix):
+            key, _, id = self._sort_keys[index]
+            yield key, id, self._values[index]
+            index += 1
+
+    def search_each_key(self, prefix: str, limit: int) -> Iterator[Tuple[str, UUID, ValueType]]:
+        """Like search, but at most the first `limit` entries of every key"""
+        index = bisect_left(self._sort_keys, (prefix,))
+        while index < len(self._sort_keys) and self._sort_keys[index][0].startswith(prefix):
+            key, end = self._sort_keys[index][0], index + limit
+            while index < min(end, len(self._sort_keys)) and self._sort_keys[index][0] == key:
+                yield key, self._sort_keys[index][2], self._values[index]
+                index += 1
+            # Skip the rest of the key, "\0" sorts before any longer key
+            index = bisect_left(self._sort_keys, (key + "\0",), index)
+
+    def replace(
+        self, ids: Iterable[UUID], entries: Iterable[Tuple[str, UUID, ValueType]]
+    ) -> "PrefixIndex[ValueType]":
+        """Copy without the entries of `ids`, plus `entries`. Searches of this index go on"""
+        index = PrefixIndex(order=self._order)
+        index._sort_keys = self._sort_keys.copy()
+        index._values = self._values.copy()
+        index._sort_key_of = self._sort_key_of.copy()
+        for id in ids:
+            sort_key = index._sort_key_of.pop(id, None)
+            if sort_key is not None:
+                position = bisect_left(index._sort_keys, sort_key)
+                del index._sort_keys[position], index._values[position]
+        for key, id, value in entries:
+            sort_key = self._sort_key(key, id, value)
+            position = bisect_left(index._sort_keys, sort_key)
+            index._sort_keys.insert(position, sort_key)
+            index._values.insert(position, value)
+            index._sort_key_of[id] = sort_key
+        return index
+
+
+Indexes = Tuple[PrefixIndex, PrefixIndex, PrefixIndex]
+
+
+class MemoryIndex:
+    """
+    Prefix indexes of all titles and author names. Writes through the CRUD
+    layer record the ids they changed and the next lookup re-reads just
+    those rows; after `ttl` seconds the indexes are rebuilt anyway to pick
+    up writes of other processes. Batches of more than `max_changes` ids are
+    applied with a rebuild as well.
+    """
+
+    def __init__(self, ttl: float, max_changes: int = 1000):
+        self.ttl = ttl
+        self.max_changes = max_changes
+        self.builds = 0
+        self.updates = 0
+        # Writes seen by mark_changed, and how many of them the indexes include
+        self.writes = 0
+        self._built_writes = 0
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._indexes: Optional[Indexes] = None
+        # Ids changed since the last build or update, swapped with `writes`
+        # read under _changes_lock so no change is counted without its id
+        self._changes_lock = threading.Lock()
+        self._changed_books: Set[UUID] = set()
+        self._changed_users: Set[UUID] = set()
+
+    def mark_changed(self, model: type, id: UUID) -> None:
+        with self._changes_lock:
+            (self._changed_books if model is Books else self._changed_users).add(id)
+            self.writes += 1
+
+    def _expired(self) -> bool:
+        return self._indexes is None or self._built_writes != self.writes or self._ttl_expired()
+
+    def _ttl_expired(self) -> bool:
+        return time.monotonic() - self._built_at > self.ttl
+
+    def get(self, db: Session) -> Tuple[Indexes, bool]:
+        """
+        (titles, author full names, author last names) brought up to date
+        first, and whether they include every write. Lookups arriving during
+        an update use the previous indexes, the first build is waited for.
+        """
+        if self._expired() and self._lock.acquire(blocking=self._indexes is None):
+            try:
+                if self._expired():
+                    with self._changes_lock:
+                        writes, started = self.writes, time.monotonic()
+                        book_ids, self._changed_books = self._changed_books, set()
+                        user_ids, self._changed_users = self._changed_users, set()
+                    if (
+                        self._indexes is None
+                        or self._ttl_expired()
+                        or len(book_ids) + len(user_ids) > self.max_changes
+                    ):
+                        self._indexes, self._built_at = self._build(db), started
+                        self.builds += 1
+                    else:
+                        self._indexes = self._update(db, self._indexes, book_ids, user_ids)
+                        self.updates += 1
+                    self._built_writes = writes
+            finally:
+                self._lock.release()
+        indexes, built_writes = self._indexes, self._built_writes
+        return indexes, built_writes == self.writes
+
+    @staticmethod
+    def _build(db: Session) -> Indexes:
+        titles = db.exec(select(Books.id, Books.title)).all()
+        authors = db.exec(
+            select(Users.id, Users.first_name, Users.last_name)
+            .where(Users.account_type == AccountType.AUTHOR)
+        ).all()
+        return (
+            PrefixIndex(title_entries(titles)),
+            PrefixIndex(name_entries(authors)),
+            PrefixIndex(last_name_entries(authors), order=name_order),
+        )
+
+    @staticmethod
+    def _update(
+        db: Session, indexes: Indexes, book_ids: Set[UUID], user_ids: Set[UUID]
+    ) -> Indexes:
+        """Re-read the changed rows, deleted ones (or no longer authors) are dropped"""
+        titles, names, last_names = indexes
+        if book_ids:
+            rows = db.exec(select(Books.id, Books.title).where(Books.id.in_(book_ids))).all()
+            titles = titles.replace(book_ids, title_entries(rows))
+        if user_ids:
+            authors = db.exec(
+                select(Users.id, Users.first_name, Users.last_name)
+                .where(Users.id.in_(user_ids), Users.account_type == AccountType.AUTHOR)
+            ).all()
+            names = names.replace(user_ids, name_entries(authors))
+            last_names = last_names.replace(user_ids, last_name_entries(authors))
+        return titles, names, last_names
+
+
+def title_entries(rows) -> List[Tuple[str, UUID, str]]:
+    return [(title.lower(), id, title) for id, title in rows]
+
+
+def name_entries(rows) -> List[Tuple[str, UUID, Tuple[str, str]]]:
+    return [(full_name(first, last).lower(), id, (first, last)) for id, first, last in rows]
+
+
+def last_name_entries(rows) -> List[Tuple[str, UUID, Tuple[str, str]]]:
+    return [(last.lower(), id, (first, last)) for id, first, last in rows]
+
+
+def name_order(name: Tuple[str, str]) -> str:
+    """Authors with the same last name come in the result order"""
+    return full_name(*name).lower()
+
+
+class CRUDAutocomplete:
+    """Case-insensitive prefix matches of book titles and of author first, last or full names"""
+
+    def __init__(self, mode: str = "auto", index_ttl: float = 60):
+        self.mode = mode
+        self.memory = MemoryIndex(index_ttl)
+
+    def use_database(self, db: Session) -> bool:
+        if self.mode == "auto":
+            return db.get_bind().dialect.name == "postgresql"
+        return self.mode == "database"
+
+    def suggest(self, db: Session, prefix: str, limit: int = 5) -> AutocompleteResult:
+        """Up to `limit` books and authors, ordered by lowercased title and full name"""
+        return self.lookup(db, prefix, limit)[0]
+
+    def lookup(self, db: Session, prefix: str, limit: int = 5) -> Tuple[AutocompleteResult, bool]:
+        """Suggestions and whether they reflect every write (False from outdated memory indexes)"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return AutocompleteResult(), True
+        if self.use_database(db):
+            return self._suggest_database(db, prefix, limit), True
+        return self._suggest_memory(db, prefix, limit)
+
+    def _suggest_database(self, db: Session, prefix: str, limit: int) -> AutocompleteResult:
+        def key(expression):
+            # Matches the index expressions, SQLite has no "C" collation but
+            # compares code points by default
+            key = func.lower(expression)
+            return key.collate("C") if db.get_bind().dialect.name == "postgresql" else key
+
+        title = key(Books.title)
+        titles = db.exec(
+            select(Books.id, Books.title)
+            .where(*prefix_clauses(title, prefix))
+            .order_by(title, Books.id)
+            .limit(limit)
+        ).all()
+
+        # Literals rather than parameters so Postgres matches the partial indexes
+        name = key(Users.first_name + literal_column("' '") + Users.last_name)
+        last_name = key(Users.last_name)
+        authors = db.exec(
+            select(Users.id, Users.first_name, Users.last_name)
+            .where(
+                Users.account_type == literal_column("'AUTHOR'"),
+                or_(and_(*prefix_clauses(name, prefix)), and_(*prefix_clauses(last_name, prefix))),
+            )
+            .order_by(name, Users.id)
+            .limit(limit)
+        ).all()
+        return AutocompleteResult(
+            books=[TitleSuggestion(id=id, title=title) for id, title in titles],
+            authors=[
+                AuthorSuggestion(id=id, first_name=first, last_name=last)
+                for id, first, last in authors
+            ],
+        )
+
+    def _suggest_memory(
+        self, db: Session, prefix: str, limit: int
+    ) -> Tuple[AutocompleteResult, bool]:
+        (titles, names, last_names), current = self.memory.get(db)
+
+        books = []
+        for _, id, title in titles.search(prefix):
+            if len(books) == limit:
+                break
+            books.append(TitleSuggestion(id=id, title=title))
+
+        # Full name matches come in the result order, last name matches only
+        # within a last name: rank the first `limit` of each last name
+        matches = {}
+        for _, id, name in itertools.islice(names.search(prefix), limit):
+            matches[id] = name
+        for _, id, name in last_names.search_each_key(prefix, limit):
+            matches[id] = name
+        ranked = sorted(matches.items(), key=lambda item: (full_name(*item[1]).lower(), item[0]))
+        return AutocompleteResult(
+            books=books,
+            authors=[
+                AuthorSuggestion(id=id, first_name=first, last_name=last)
+                for id, (first, last) in ranked[:limit]
+            ],
+        ), current
+
+
+class AsyncAutocomplete:
+    """Awaitable suggestions through suggestion_cache, concurrent misses share one lookup"""
+
+    def __init__(self, crud: CRUDAutocomplete):
+        self.crud = crud
+
+    async def suggest(self, db: DBSession, prefix: str, limit: int = 5) -> AutocompleteResult:
+        key = (normalize(prefix), limit)
+
+        async def load() -> AutocompleteResult:
+            result, current = await run_db(db, self.crud.lookup, *key)
+            if not current:
+                # Computed while the indexes are rebuilt after a write: invalidating
+                # the key keeps get_or_load from storing it, like a racing write would
+                suggestion_cache.invalidate(key)
+            return result
+
+        return await suggestion_cache.get_or_load(key, load)
+
+
+autocomplete = CRUDAutocomplete(settings.AUTOCOMPLETE_MODE, settings.AUTOCOMPLETE_INDEX_TTL_SECONDS)
+async_autocomplete = AsyncAutocomplete(autocomplete)
+
+
+def invalidate_suggestions(model: type) -> Callable[[UUID], None]:
+    def invalidate(id: UUID) -> None:
+        suggestion_cache.clear()
+        autocomplete.memory.mark_changed(model, id)
+
+    return invalidate
+
+
+register_invalidation_hook(Books, invalidate_suggestions(Books))
+register_invalidation_hook(Users, invalidate_suggestions(Users))
@@ -1,9 +1,74 @@
-from typing import Generic, List, Optional, Type, TypeVar
+import base64
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import (
+    Any, Callable, DefaultDict, Generic, List, Optional, Sequence, Tuple, Type, TypeVar,
+)
 from uuid import UUID
+from sqlalchemy import delete, insert, tuple_, update
 from sqlmodel import Session, select, SQLModel
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 
+# Callbacks run with the primary key of every row changed through CRUDBase
+_invalidation_hooks: DefaultDict[Type[SQLModel], List[Callable[[UUID], None]]] = defaultdict(list)
+
+
+def register_invalidation_hook(model: Type[SQLModel], hook: Callable[[UUID], None]) -> None:
+    """
+    Call `hook(id)` after a row of `model` is created, updated or deleted
+    (e.g. to evict caches, lists and indexes need to see new rows too)
+    """
+    _invalidation_hooks[model].append(hook)
+
+
+def encode_cursor(id: UUID) -> str:
+    """Encode the last seen primary key as an opaque pagination cursor"""
+    return base64.urlsafe_b64encode(id.bytes).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> UUID:
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        return UUID(bytes=base64.urlsafe_b64decode(cursor + padding))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def encode_sort_cursor(value: Any, id: UUID) -> str:
+    """Cursor of a page sorted by another column, the primary key breaks ties"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, id.hex]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_sort_cursor(cursor: str, column) -> Tuple[Any, UUID]:
+    """Decode a cursor produced by encode_sort_cursor, raising ValueError if malformed"""
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        value, id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(value, str):
+            raise ValueError("Invalid cursor value")
+        if column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        return value, UUID(hex=id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def prefix_clauses(expression, prefix: str) -> list:
+    """
+    Case-sensitive prefix match as a range over an index of `expression`,
+    LIKE alone is not sargable under every collation. LIKE rechecks the range.
+    """
+    clauses = [expression >= prefix, expression.startswith(prefix, autoescape=True)]
+    if ord(prefix[-1]) < 0x10FFFF:
+        clauses.append(expression < prefix[:-1] + chr(ord(prefix[-1]) + 1))
+    return clauses
+
 
 class CRUDBase(Generic[ModelType]):
     def __init__(self, model: Type[ModelType]):
@@ -13,14 +78,89 @@ class CRUDBase(Generic[ModelType]):
         db_obj = self.model(**obj_in)
         db.add(db_obj)
         db.commit()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
+    def create_many(self, db: Session, objs_in: List[dict]) -> List[ModelType]:
+        """Insert all objects with one multi-row INSERT in a single transaction"""
+        db_objs = [self.model(**obj_in) for obj_in in objs_in]
+        if db_objs:
+            db.exec(insert(self.model), params=[obj.model_dump() for obj in db_objs])
+            db.commit()
+            for db_obj in db_objs:
+                self.invalidate(db_obj.id)
+        return db_objs
+
     def get(self, db: Session, id: UUID) -> Optional[ModelType]:
         return db.get(self.model, id)
 
-    def get_multi(self, db: Session, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        return db.exec(select(self.model).offset(skip).limit(limit)).all()
+    def _select(self, columns: Optional[Sequence] = None, options: Sequence = ()):
+        """
+        Select whole models, or only `columns` (returning rows) when given.
+        `options` are loader options such as selectinload.
+        """
+        if columns:
+            return select(*columns)
+        return select(self.model).options(*options)
+
+    def _order_by(self, order_by=None, descending: bool = False) -> list:
+        keys = [self.model.id] if order_by is None else [order_by, self.model.id]
+        return [key.desc() for key in keys] if descending else keys
+
+    def get_multi(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        *whereclauses,
+        columns: Optional[Sequence] = None,
+        options: Sequence = (),
+        order_by=None,
+        descending: bool = False,
+    ) -> List[ModelType]:
+        """Legacy OFFSET pagination, prefer get_page for deep pages"""
+        return db.exec(
+            self._select(columns, options)
+            .where(*whereclauses)
+            .order_by(*self._order_by(order_by, descending))
+            .offset(skip)
+            .limit(limit)
+        ).all()
+
+    def get_page(
+        self,
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        *whereclauses,
+        columns: Optional[Sequence] = None,
+        options: Sequence = (),
+        order_by=None,
+        descending: bool = False,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Keyset pagination ordered by primary key, or by the `order_by` column
+        and then the primary key (a composite index on both serves the page).
+        Returns the page and the cursor of the next page (None on the last page).
+        `columns` must include the primary key and the `order_by` column.
+        """
+        statement = self._select(columns, options).where(*whereclauses)
+        if cursor and order_by is None:
+            statement = statement.where(self.model.id > decode_cursor(cursor))
+        elif cursor:
+            keys, after = tuple_(order_by, self.model.id), tuple_(*decode_sort_cursor(cursor, order_by))
+            statement = statement.where(keys < after if descending else keys > after)
+        # Fetch one extra row to know whether another page exists
+        rows = db.exec(
+            statement.order_by(*self._order_by(order_by, descending)).limit(limit + 1)
+        ).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            if order_by is None:
+                return rows, encode_cursor(rows[-1].id)
+            return rows, encode_sort_cursor(getattr(rows[-1], order_by.key), rows[-1].id)
+        return rows, None
 
     def update(self, db: Session, id: UUID, obj_in: dict) -> Optional[ModelType]:
         db_obj = self.get(db, id)
@@ -28,6 +168,7 @@ class CRUDBase(Generic[ModelType]):
             for key, value in obj_in.items():
                 setattr(db_obj, key, value)
             db.commit()
+            self.invalidate(id)
             db.refresh(db_obj)
         return db_obj
 
@@ -36,5 +177,32 @@ class CRUDBase(Generic[ModelType]):
         if db_obj:
             db.delete(db_obj)
             db.commit()
+            self.invalidate(id)
             return True
         return False
+
+    def update_many(self, db: Session, objs_in: List[dict]) -> None:
+        """
+        Update rows by primary key in a single transaction. Every dict holds
+        the `id` of its row plus the fields to change.
+        """
+        if not objs_in:
+            return
+        db.exec(update(self.model), params=objs_in)
+        db.commit()
+        for obj_in in objs_in:
+            self.invalidate(obj_in["id"])
+
+    def delete_many(self, db: Session, ids: List[UUID]) -> None:
+        """Delete rows by primary key with a single statement"""
+        if not ids:
+            return
+        db.exec(delete(self.model).where(self.model.id.in_(ids)))
+        db.commit()
+        for id in ids:
+            self.invalidate(id)
+
+    def invalidate(self, id: UUID) -> None:
+        """Run the invalidation hooks registered for this model"""
+        for hook in _invalidation_hooks.get(self.model, ()):
+            hook(id)
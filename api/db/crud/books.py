@@ -1,27 +1,364 @@
-from typing import List, Optional
+import re
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from uuid import UUID
-from sqlmodel import Session, select
-from db.crud.base import CRUDBase
-from db.models import Books, Users, AccountType
+from fastapi.concurrency import iterate_in_threadpool
+from sqlalchemy import Row, func, literal_column
+from sqlmodel import Session, and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from db.crud.async_base import AsyncCRUD, run_db
+from db.crud.author_stats import BookState, author_stats, count_deltas
+from db.crud.base import CRUDBase, prefix_clauses, register_invalidation_hook
+from db.database import DBSession, is_read_session, primary_session
+from db.models import Books, BookContent, BookSummary, Users, AccountType
+from core.cache import LoadingCache, TTLCache
+from core.config import settings
+from core.metrics import metrics
+
+# Generated tsvector column, created by migration b7e2c41d9a35 on Postgres only
+SEARCH_VECTOR = literal_column("books.search_vector")
+SEARCH_CONFIG = "english"
+
+# Columns of BookSummary, content is never read for list views
+SUMMARY_COLUMNS = (
+    Books.id, Books.title, Books.published, Books.author_id, Books.version, Books.favorites_count,
+)
+
+# Columns of the catalogue export, read as plain rows so the session keeps no objects
+EXPORT_COLUMNS = (
+    Books.id, Books.title, Books.content, Books.published,
+    Books.author_id, Books.version, Books.updated_at,
+)
+
+# Sort keys of GET /books -> (column, descending), ties are broken by id.
+# Every key is backed by a composite (column, id) index, see Books.__table_args__.
+BOOK_SORTS = {
+    "id": (None, False),
+    "title": (Books.title, False),
+    "-title": (Books.title, True),
+    "updated_at": (Books.updated_at, False),
+    "-updated_at": (Books.updated_at, True),
+}
+
+
+@dataclass
+class BookFilters:
+    """Filters and sort key of a list of books, None leaves a filter out"""
+    published: Optional[bool] = None
+    author_id: Optional[UUID] = None
+    title_prefix: Optional[str] = None
+    sort: str = "id"
+
+    def clauses(self) -> list:
+        clauses = []
+        if self.published is not None:
+            clauses.append(Books.published == self.published)
+        if self.author_id:
+            clauses.append(Books.author_id == self.author_id)
+        if self.title_prefix:
+            clauses += prefix_clauses(Books.title, self.title_prefix)
+        return clauses
+
+
+# Books by id and lists of books by author, read through AsyncCRUDBooks.
+# Any write to books clears the author lists, which are cheap to reload.
+book_cache: LoadingCache[Books] = LoadingCache(
+    TTLCache(maxsize=settings.BOOK_CACHE_SIZE, ttl=settings.BOOK_CACHE_TTL_SECONDS)
+)
+author_books_cache: LoadingCache[List[Books]] = LoadingCache(
+    TTLCache(maxsize=settings.BOOK_CACHE_SIZE, ttl=settings.BOOK_CACHE_TTL_SECONDS)
+)
+metrics.register_loading_cache("books", book_cache)
+metrics.register_loading_cache("author_books", author_books_cache)
+
+
+def invalidate_book(id: UUID) -> None:
+    book_cache.invalidate(id)
+    author_books_cache.clear()
+
+
+register_invalidation_hook(Books, invalidate_book)
 
 
 class CRUDBooks(CRUDBase[Books]):
+    """
+    Every write also applies its change of the author counts to
+    author_stats before the commit, see db.crud.author_stats.
+    """
+
+    def create(self, db: Session, obj_in: dict) -> Books:
+        author_stats.apply(db, count_deltas(added=[self._state(obj_in)]))
+        return super().create(db, obj_in)
+
+    def create_many(self, db: Session, objs_in: List[dict]) -> List[Books]:
+        author_stats.apply(db, count_deltas(added=map(self._state, objs_in)))
+        return super().create_many(db, objs_in)
+
     def create_book(self, db: Session, obj_in: dict, author: Users) -> Books:
         db_obj = Books(**obj_in, author_id=author.id)
         db.add(db_obj)
+        author_stats.apply(db, count_deltas(added=[(author.id, db_obj.published)]))
         db.commit()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
+    def create_books(self, db: Session, objs_in: List[dict], author: Users) -> List[Books]:
+        return self.create_many(
+            db, [{**obj_in, "author_id": author.id} for obj_in in objs_in]
+        )
+
+    def update(self, db: Session, id: UUID, obj_in: dict) -> Optional[Books]:
+        db_obj = self.get(db, id)
+        if db_obj:
+            before = (db_obj.author_id, db_obj.published)
+            author_stats.apply(db, count_deltas([before], [self._state(obj_in, *before)]))
+        return super().update(db, id, obj_in)
+
+    def delete(self, db: Session, id: UUID) -> bool:
+        db_obj = self.get(db, id)
+        if db_obj:
+            author_stats.apply(db, count_deltas(removed=[(db_obj.author_id, db_obj.published)]))
+        return super().delete(db, id)
+
+    def update_many(self, db: Session, objs_in: List[dict]) -> None:
+        states = self._states(db, [obj_in["id"] for obj_in in objs_in])
+        existing = [obj_in for obj_in in objs_in if obj_in["id"] in states]
+        author_stats.apply(db, count_deltas(
+            [states[obj_in["id"]] for obj_in in existing],
+            [self._state(obj_in, *states[obj_in["id"]]) for obj_in in existing],
+        ))
+        super().update_many(db, objs_in)
+
+    def delete_many(self, db: Session, ids: List[UUID]) -> None:
+        author_stats.apply(db, count_deltas(removed=self._states(db, ids).values()))
+        super().delete_many(db, ids)
+
+    @staticmethod
+    def _state(
+        obj_in: dict, author_id: Optional[UUID] = None, published: bool = False
+    ) -> BookState:
+        """(author_id, published) of a book after writing `obj_in` over the given values"""
+        return obj_in.get("author_id", author_id), obj_in.get("published", published)
+
+    def _states(self, db: Session, ids: List[UUID]) -> Dict[UUID, BookState]:
+        if not ids:
+            return {}
+        rows = db.exec(
+            select(Books.id, Books.author_id, Books.published).where(Books.id.in_(ids))
+        ).all()
+        return {id: (author_id, published) for id, author_id, published in rows}
+
+    def get_author_ids(self, db: Session, ids: List[UUID]) -> Dict[UUID, Optional[UUID]]:
+        """Map each existing book id to its author id, missing books are left out"""
+        if not ids:
+            return {}
+        return dict(db.exec(select(Books.id, Books.author_id).where(Books.id.in_(ids))).all())
+
     def get_books_by_author(
         self, db: Session, author_id: UUID, skip: int = 0, limit: int = 100
     ) -> List[Books]:
+        return self.get_multi(db, skip, limit, Books.author_id == author_id)
+
+    def get_books_by_author_page(
+        self,
+        db: Session,
+        author_id: UUID,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Books], Optional[str]]:
+        return self.get_page(db, cursor, limit, Books.author_id == author_id)
+
+    def get_summaries(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        author_id: Optional[UUID] = None,
+    ) -> List[BookSummary]:
+        rows = self.get_multi(
+            db, skip, limit, *self._author_filter(author_id), columns=SUMMARY_COLUMNS
+        )
+        return [BookSummary.model_validate(row._mapping) for row in rows]
+
+    def get_summaries_page(
+        self,
+        db: Session,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        author_id: Optional[UUID] = None,
+    ) -> Tuple[List[BookSummary], Optional[str]]:
+        rows, next_cursor = self.get_page(
+            db, cursor, limit, *self._author_filter(author_id), columns=SUMMARY_COLUMNS
+        )
+        return [BookSummary.model_validate(row._mapping) for row in rows], next_cursor
+
+    def get_filtered(
+        self,
+        db: Session,
+        filters: BookFilters,
+        skip: int = 0,
+        limit: int = 100,
+        summary: bool = False,
+    ) -> Union[List[Books], List[BookSummary]]:
+        order_by, descending = BOOK_SORTS[filters.sort]
+        rows = self.get_multi(
+            db, skip, limit, *filters.clauses(),
+            columns=self._filtered_columns(order_by, summary),
+            order_by=order_by, descending=descending,
+        )
+        return [BookSummary.model_validate(row._mapping) for row in rows] if summary else rows
+
+    def get_filtered_page(
+        self,
+        db: Session,
+        filters: BookFilters,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        summary: bool = False,
+    ) -> Tuple[Union[List[Books], List[BookSummary]], Optional[str]]:
+        """Keyset page of the books matching `filters`, in the order of its sort key"""
+        order_by, descending = BOOK_SORTS[filters.sort]
+        rows, next_cursor = self.get_page(
+            db, cursor, limit, *filters.clauses(),
+            columns=self._filtered_columns(order_by, summary),
+            order_by=order_by, descending=descending,
+        )
+        if summary:
+            rows = [BookSummary.model_validate(row._mapping) for row in rows]
+        return rows, next_cursor
+
+    @staticmethod
+    def _filtered_columns(order_by, summary: bool) -> Optional[tuple]:
+        """Summary columns plus the sort column, which the next cursor is built from"""
+        if not summary:
+            return None
+        if order_by is None or any(order_by is column for column in SUMMARY_COLUMNS):
+            return SUMMARY_COLUMNS
+        return SUMMARY_COLUMNS + (order_by,)
+
+    def get_content(self, db: Session, id: UUID) -> Optional[BookContent]:
+        row = db.exec(select(Books.id, Books.content).where(Books.id == id)).first()
+        return BookContent.model_validate(row._mapping) if row else None
+
+    def export_statement(self, author_id: Optional[UUID] = None, batch_size: int = 1000):
+        """
+        All books (of one author) in id order. yield_per makes the driver use
+        a server-side cursor where supported and fetch `batch_size` rows at a time.
+        """
+        return (
+            select(*EXPORT_COLUMNS)
+            .where(*self._author_filter(author_id))
+            .order_by(Books.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+    def export_partitions(
+        self, db: Session, author_id: Optional[UUID] = None, batch_size: int = 1000
+    ) -> Iterator[Sequence[Row]]:
+        yield from db.exec(self.export_statement(author_id, batch_size)).partitions()
+
+    @staticmethod
+    def _author_filter(author_id: Optional[UUID]) -> tuple:
+        return (Books.author_id == author_id,) if author_id else ()
+
+    def search(
+        self, db: Session, q: str, skip: int = 0, limit: int = 100
+    ) -> List[Books]:
+        """Full-text search over title and content, best matches first"""
+        if db.get_bind().dialect.name != "postgresql":
+            return self._search_fallback(db, q, skip, limit)
+
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
         return db.exec(
             select(Books)
-            .where(Books.author_id == author_id)
+            .where(SEARCH_VECTOR.op("@@")(query))
+            .order_by(func.ts_rank(SEARCH_VECTOR, query).desc(), Books.id)
             .offset(skip)
             .limit(limit)
         ).all()
 
+    def _search_fallback(
+        self, db: Session, q: str, skip: int, limit: int
+    ) -> List[Books]:
+        """
+        Pure-Python ranking for databases without full-text search (SQLite in
+        tests). Every term has to match the title or the content, title hits
+        weigh more, like the A/B weights of the Postgres search vector.
+        """
+        terms = re.findall(r"\w+", q.lower())
+        if not terms:
+            return []
+
+        candidates = db.exec(
+            select(Books).where(and_(*(
+                or_(Books.title.ilike(f"%{term}%"), Books.content.ilike(f"%{term}%"))
+                for term in terms
+            )))
+        ).all()
+
+        def rank(book: Books) -> float:
+            title = re.findall(r"\w+", book.title.lower())
+            content = re.findall(r"\w+", book.content.lower())
+            return sum(
+                title.count(term) + 0.4 * content.count(term) for term in terms
+            )
+
+        ranked = sorted(candidates, key=lambda book: (-rank(book), book.id))
+        return ranked[skip:skip + limit]
+
+
+class AsyncCRUDBooks(AsyncCRUD[CRUDBooks]):
+    """
+    Reads through book_cache and author_books_cache. A miss is loaded with
+    a session of its own on the primary, shared by the concurrent misses of
+    the key; replica sessions bypass the caches, a lagging replica could
+    otherwise store a row older than the write that just invalidated it.
+    """
+
+    async def get(self, db: DBSession, id: UUID) -> Optional[Books]:
+        """Get a book through book_cache, concurrent misses share one query"""
+        if is_read_session(db):
+            return await self.get_uncached(db, id)
+
+        async def load() -> Optional[Books]:
+            async with primary_session() as session:
+                book = await run_db(session, self.crud.get, id)
+                # Cache a detached copy so it never lazy loads through a closed session
+                return Books(**book.model_dump()) if book else None
+
+        return await book_cache.get_or_load(id, load)
+
+    async def get_uncached(self, db: DBSession, id: UUID) -> Optional[Books]:
+        """Get a book from `db`, writes check existence and ownership with this"""
+        return await run_db(db, self.crud.get, id)
+
+    async def get_books_by_author(
+        self, db: DBSession, author_id: UUID, skip: int = 0, limit: int = 100
+    ) -> List[Books]:
+        if is_read_session(db):
+            return await run_db(db, self.crud.get_books_by_author, author_id, skip, limit)
+
+        async def load() -> List[Books]:
+            async with primary_session() as session:
+                rows = await run_db(session, self.crud.get_books_by_author, author_id, skip, limit)
+                return [Books(**book.model_dump()) for book in rows]
+
+        return await author_books_cache.get_or_load((author_id, skip, limit), load)
+
+    async def stream_export(
+        self, db: DBSession, author_id: Optional[UUID] = None, batch_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:
+        """Yield the export rows in batches, holding one batch in memory at a time"""
+        if isinstance(db, AsyncSession):
+            result = await db.stream(self.crud.export_statement(author_id, batch_size))
+            async for partition in result.partitions():
+                yield partition
+        else:
+            partitions = self.crud.export_partitions(db, author_id, batch_size)
+            async for partition in iterate_in_threadpool(partitions):
+                yield partition
+
 
 books = CRUDBooks(Books)
+async_books = AsyncCRUDBooks(books)
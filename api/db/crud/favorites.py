@@ -0,0 +1,108 @@
+from typing import List, Optional, Set, Tuple
+from uuid import UUID
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from db.crud.async_base import AsyncCRUD
+from db.crud.base import CRUDBase
+from db.crud.books import book_cache, books
+from db.models import Books, UserFavorites
+
+
+class CRUDFavorites(CRUDBase[UserFavorites]):
+    """
+    Favorites of users. Books.favorites_count is adjusted in the transaction
+    that adds or removes the row, so it is never recounted. The count is not
+    a change of the book: it keeps its version (ETag) and updated_at, and
+    only its book_cache entry is evicted, not the books invalidation hooks,
+    so favoriting a popular book doesn't keep defeating revalidation.
+    """
+
+    def add(self, db: Session, user_id: UUID, book_id: UUID) -> bool:
+        """
+        Favorite a book, False if the user already had. Raises IntegrityError
+        if the book doesn't exist (where foreign keys are enforced).
+        """
+        if db.get(UserFavorites, (user_id, book_id)):
+            return False
+        db.add(UserFavorites(user_id=user_id, book_id=book_id))
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            if db.get(UserFavorites, (user_id, book_id)):
+                # Lost a race with a concurrent request of the same user
+                return False
+            raise
+        self._adjust_counts(db, [book_id], 1)
+        db.commit()
+        book_cache.invalidate(book_id)
+        return True
+
+    def remove(self, db: Session, user_id: UUID, book_id: UUID) -> bool:
+        """Unfavorite a book, False if it was not a favorite"""
+        result = db.exec(
+            delete(UserFavorites)
+            .where(UserFavorites.user_id == user_id, UserFavorites.book_id == book_id)
+        )
+        if not result.rowcount:
+            db.rollback()
+            return False
+        self._adjust_counts(db, [book_id], -1)
+        db.commit()
+        book_cache.invalidate(book_id)
+        return True
+
+    def remove_all(self, db: Session, user_id: UUID) -> List[UUID]:
+        """
+        Remove every favorite of a user without committing, e.g. before the
+        user is deleted. Returns the ids of the books, whose book_cache
+        entries must be evicted after the commit.
+        """
+        book_ids = db.exec(
+            delete(UserFavorites)
+            .where(UserFavorites.user_id == user_id)
+            .returning(UserFavorites.book_id)
+        ).scalars().all()
+        self._adjust_counts(db, book_ids, -1)
+        return book_ids
+
+    @staticmethod
+    def _adjust_counts(db: Session, book_ids: List[UUID], delta: int) -> None:
+        if not book_ids:
+            return
+        db.exec(
+            update(Books)
+            .where(Books.id.in_(book_ids))
+            # Favorites don't change the book itself, setting version and
+            # updated_at to themselves skips their onupdate
+            .values(
+                favorites_count=Books.favorites_count + delta,
+                version=Books.version,
+                updated_at=Books.updated_at,
+            )
+        )
+
+    def get_favorited(self, db: Session, user_id: UUID, book_ids: List[UUID]) -> Set[UUID]:
+        """Which of `book_ids` the user favorited, with a single query"""
+        if not book_ids:
+            return set()
+        return set(db.exec(
+            select(UserFavorites.book_id)
+            .where(UserFavorites.user_id == user_id, UserFavorites.book_id.in_(book_ids))
+        ).all())
+
+    def get_books_page(
+        self,
+        db: Session,
+        user_id: UUID,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[Books], Optional[str]]:
+        """Keyset page of the books favorited by the user"""
+        favorited = select(UserFavorites.book_id).where(UserFavorites.user_id == user_id)
+        return books.get_page(db, cursor, limit, Books.id.in_(favorited))
+
+
+favorites = CRUDFavorites(UserFavorites)
+async_favorites = AsyncCRUD(favorites)
@@ -1,9 +1,26 @@
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
-from db.crud.base import CRUDBase
-from db.models import Users
-from core.security import get_password_hash, verify_password
+from db.crud.async_base import AsyncCRUD, run_db
+from db.crud.base import CRUDBase, register_invalidation_hook
+from db.crud.books import SUMMARY_COLUMNS, book_cache, books
+from db.crud.favorites import favorites
+from db.database import DBSession
+from db.models import (
+    AccountType, AuthorStats, AuthorStatsRead, Books, BookSummary, UserDetail, Users,
+)
+from core.cache import TTLCache
+from core.config import settings
+from core.metrics import metrics
+from core.security import password_hasher
+
+# Authenticated users by id, evicted whenever a user is updated or deleted
+user_cache: TTLCache[Users] = TTLCache(
+    maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+)
+register_invalidation_hook(Users, user_cache.invalidate)
+metrics.register_cache("users", user_cache)
 
 
 class CRUDUsers(CRUDBase[Users]):
@@ -11,25 +28,141 @@ class CRUDUsers(CRUDBase[Users]):
         # Create a new dict without the password
         obj_data = {k: v for k, v in obj_in.items() if k != "password"}
         # Add the hashed password
-        obj_data["password"] = get_password_hash(obj_in["password"])
+        obj_data["password"] = password_hasher.hash(obj_in["password"])
         
         db_obj = Users(**obj_data)
         db.add(db_obj)
         db.commit()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
+    def delete(self, db: Session, id: UUID) -> bool:
+        # Decrement the favorites counts of the books in the same transaction
+        book_ids = favorites.remove_all(db, id)
+        deleted = super().delete(db, id)
+        for book_id in book_ids:
+            book_cache.invalidate(book_id)
+        return deleted
+
     def authenticate(self, db: Session, email: str, password: str) -> Optional[Users]:
         user = db.exec(select(Users).where(Users.email == email)).first()
         
         if not user:
             return None
-        if not verify_password(password, user.password):
+        if not password_hasher.verify(password, user.password):
             return None
         return user
 
     def get_by_email(self, db: Session, email: str) -> Optional[Users]:
         return db.exec(select(Users).where(Users.email == email)).first()
 
+    def get_detail(
+        self,
+        db: Session,
+        id: UUID,
+        books_cursor: Optional[str] = None,
+        books_limit: int = 20,
+    ) -> Optional[UserDetail]:
+        """
+        Get a user with their book counts and one page of their books. The
+        books are fetched with a separate keyset query, so the page size is
+        bounded however many books the author has.
+        """
+        row = db.exec(
+            select(Users, AuthorStats)
+            .outerjoin(AuthorStats, AuthorStats.author_id == Users.id)
+            .where(Users.id == id)
+        ).first()
+        if row is None:
+            return None
+        user, stats = row
+        detail = UserDetail(**user.model_dump())
+        if user.account_type == AccountType.AUTHOR:
+            # Counts come with the user, authors without books have no row yet
+            detail.stats = (
+                AuthorStatsRead.model_validate(stats, from_attributes=True)
+                if stats else AuthorStatsRead()
+            )
+            detail.books, detail.books_next_cursor = books.get_summaries_page(
+                db, books_cursor, books_limit, author_id=id
+            )
+        return detail
+
+    def get_details(
+        self, db: Session, skip: int = 0, limit: int = 100
+    ) -> List[UserDetail]:
+        """Legacy OFFSET variant of get_details_page"""
+        return self._to_details(
+            self.get_multi(db, skip, limit, options=self._books_loader())
+        )
+
+    def get_details_page(
+        self, db: Session, cursor: Optional[str] = None, limit: int = 100
+    ) -> Tuple[List[UserDetail], Optional[str]]:
+        """
+        Page of users with all their books. Books of the whole page are loaded
+        with one extra SELECT ... IN query instead of one query per user.
+        """
+        page, next_cursor = self.get_page(db, cursor, limit, options=self._books_loader())
+        return self._to_details(page), next_cursor
+
+    @staticmethod
+    def _books_loader():
+        return (selectinload(Users.books).load_only(*SUMMARY_COLUMNS),)
+
+    @staticmethod
+    def _to_details(page: List[Users]) -> List[UserDetail]:
+        return [
+            UserDetail(
+                **user.model_dump(),
+                books=[BookSummary.model_validate(book) for book in user.books],
+            )
+            for user in page
+        ]
+
+
+class AsyncCRUDUsers(AsyncCRUD[CRUDUsers]):
+    async def get_cached(self, db: DBSession, id: UUID) -> Optional[Users]:
+        """Get a user through user_cache, only querying the database on a miss"""
+        user = user_cache.get(id)
+        if user is not None:
+            return user
+        user = await self.get(db, id)
+        if user is not None:
+            # Cache a detached copy so it never lazy loads through a closed session
+            user_cache.set(id, Users(**user.model_dump()))
+        return user
+
+    async def create(self, db: DBSession, obj_in: dict) -> Users:
+        # Hash in the process pool first, then insert with the base implementation
+        obj_data = {k: v for k, v in obj_in.items() if k != "password"}
+        obj_data["password"] = await password_hasher.hash_async(obj_in["password"])
+        return await run_db(db, super(CRUDUsers, self.crud).create, obj_data)
+
+    async def authenticate(
+        self, db: DBSession, email: str, password: str
+    ) -> Optional[Users]:
+        # Only the lookup goes through the session; bcrypt must not run on the event loop
+        user = await run_db(db, self._get_by_email_and_release, email)
+
+        if not user:
+            return None
+        if not await password_hasher.verify_async(password, user.password):
+            return None
+        return user
+
+    def _get_by_email_and_release(self, db: Session, email: str) -> Optional[Users]:
+        """
+        Look up the user and hand the connection back in the same call: logins
+        waiting for a hash slot would otherwise hold one each, and more of them
+        than DB_POOL_SIZE + DB_MAX_OVERFLOW starve every other request
+        """
+        try:
+            return self.crud.get_by_email(db, email)
+        finally:
+            db.close()
+
 
 users = CRUDUsers(Users)
+async_users = AsyncCRUDUsers(users)
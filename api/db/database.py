@@ -1,5 +1,17 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional, Union
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.sql.dml import UpdateBase
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from core.config import settings
+from core.metrics import metrics
+from db.instrumentation import instrument_engine
 import os
 import logging
 import time
@@ -9,8 +21,15 @@ from db.models import *
 
 logger = logging.getLogger(__name__)
 
+# Session type handed to the v1 endpoints, see get_db
+DBSession = Union[Session, AsyncSession]
+
 def get_database_url() -> str:
     """Get database URL based on environment"""
+    if settings.DATABASE_URL:
+        logger.info("Using database from DATABASE_URL")
+        return settings.DATABASE_URL
+    
     if os.getenv("TESTING"):
         # Testing database
         logger.info("Using testing database")
@@ -66,8 +85,99 @@ def get_database_url() -> str:
     )
 
 
+def get_async_database_url(db_url: Optional[str] = None) -> str:
+    """Translate the sync database URL (or `db_url`) to its async driver equivalent"""
+    url = make_url(db_url or get_database_url())
+    
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    
+    query = dict(url.query)
+    if "unix_sock" in query:
+        # pg8000 takes the socket file, asyncpg the directory containing it
+        query["host"] = os.path.dirname(query.pop("unix_sock"))
+    return url.set(
+        drivername="postgresql+asyncpg", query=query
+    ).render_as_string(hide_password=False)
+
+
+def register_pool_metrics(pool, name: str) -> None:
+    """Report connection usage of a QueuePool (NullPool keeps no connections)"""
+    if not hasattr(pool, "checkedout"):
+        return
+    metrics.register_gauge(
+        "db_pool_size", "Connections the pool keeps open", pool.size, pool=name
+    )
+    metrics.register_gauge(
+        "db_pool_checked_out", "Connections currently in use", pool.checkedout, pool=name
+    )
+    metrics.register_gauge(
+        "db_pool_overflow", "Connections opened beyond the pool size (negative while below it)",
+        pool.overflow, pool=name,
+    )
+
+
+def pool_options() -> dict:
+    """Connection pool arguments of create_engine, see the DB_POOL_* settings"""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(db_url: str, name: str) -> Engine:
+    """Create an instrumented engine, `name` labels its pool metrics"""
+    # Create engine with connection pooling and retry logic
+    connect_args = {}
+    
+    # Add appropriate timeout parameter based on the driver
+    if db_url.startswith("sqlite"):
+        # Sessions are handed between threadpool workers
+        connect_args["check_same_thread"] = False
+    elif "+pg8000" in db_url:
+        # pg8000 uses timeout in seconds
+        connect_args["timeout"] = 30
+    else:
+        # psycopg2 uses connect_timeout in seconds
+        connect_args["connect_timeout"] = 30
+    
+    db_engine = create_engine(
+        db_url, 
+        echo=False,
+        connect_args=connect_args,
+        **pool_options()
+    )
+    instrument_engine(db_engine)
+    register_pool_metrics(db_engine.pool, name)
+    return db_engine
+
+
+def create_async_db_engine(db_url: str, name: str) -> AsyncEngine:
+    """Create an instrumented async engine from an async driver URL"""
+    if db_url.startswith("sqlite"):
+        # aiosqlite connections are bound to the event loop that opened them
+        db_engine = create_async_engine(db_url, echo=False, poolclass=NullPool)
+    else:
+        db_engine = create_async_engine(
+            db_url,
+            echo=False,
+            connect_args={"timeout": 30},
+            **pool_options()
+        )
+    instrument_engine(db_engine.sync_engine)
+    register_pool_metrics(db_engine.sync_engine.pool, name)
+    return db_engine
+
+
 # Create engine based on environment
 engine = None
+async_engine = None
+# Engines of the optional read replica, see get_read_session
+read_engine = None
+async_read_engine = None
 
 def get_engine():
     """Get or create SQLAlchemy engine with lazy initialization"""
@@ -76,25 +186,169 @@ def get_engine():
         db_url = get_database_url()
         logger.info(f"Initializing database connection to: {db_url}")
         
-        # Create engine with connection pooling and retry logic
-        connect_args = {}
-        
-        # Add appropriate timeout parameter based on the driver
-        if "+pg8000" in db_url:
-            # pg8000 uses timeout in seconds
-            connect_args["timeout"] = 30
-        else:
-            # psycopg2 uses connect_timeout in seconds
-            connect_args["connect_timeout"] = 30
+        engine = create_db_engine(db_url, "sync")
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get or create the async SQLAlchemy engine used when ASYNC_DB is enabled"""
+    global async_engine
+    if async_engine is None:
+        db_url = get_async_database_url()
+        logger.info("Initializing async database connection")
         
-        engine = create_engine(
-            db_url, 
-            echo=False,
-            pool_pre_ping=True,
-            pool_recycle=300,  # Recycle connections every 5 minutes
-            connect_args=connect_args
+        async_engine = create_async_db_engine(db_url, "async")
+    return async_engine
+
+
+def get_read_engine() -> Engine:
+    """Get or create the engine of READ_DATABASE_URL"""
+    global read_engine
+    if read_engine is None:
+        logger.info("Initializing read replica connection")
+        read_engine = create_db_engine(settings.READ_DATABASE_URL, "read")
+    return read_engine
+
+
+def get_async_read_engine() -> AsyncEngine:
+    global async_read_engine
+    if async_read_engine is None:
+        logger.info("Initializing async read replica connection")
+        async_read_engine = create_async_db_engine(
+            get_async_database_url(settings.READ_DATABASE_URL), "async_read"
         )
-    return engine
+    return async_read_engine
+
+
+class ReplicaHealth:
+    """Sends reads to the primary for `retry_after` seconds after the replica failed"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        self._retry_at = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self._retry_at
+
+    def mark_unhealthy(self, error: Exception) -> None:
+        logger.warning(
+            f"Read replica unavailable, reading from the primary for {self.retry_after}s: {error}"
+        )
+        self._retry_at = time.monotonic() + self.retry_after
+
+
+replica_health = ReplicaHealth(settings.READ_REPLICA_RETRY_SECONDS)
+metrics.register_gauge(
+    "db_read_replica_healthy", "Whether reads currently go to the read replica",
+    lambda: int(bool(settings.READ_DATABASE_URL) and replica_health.healthy),
+)
+
+
+class ReadSession(Session):
+    """
+    Session reading from the replica it is bound to. Writes go to the
+    primary engine in `info["primary"]`, and so does every later statement,
+    so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, **kw):
+        if self.info.get("wrote") or self._flushing or isinstance(kw.get("clause"), UpdateBase):
+            self.info["wrote"] = True
+            return self.info["primary"]
+        return super().get_bind(mapper, **kw)
+
+
+def is_read_session(db: DBSession) -> bool:
+    """Whether `db` reads from the replica (see get_read_session)"""
+    return isinstance(getattr(db, "sync_session", db), ReadSession)
+
+
+async def open_read_session() -> Optional[DBSession]:
+    """Open a session on the read replica, None if it can't be reached"""
+    try:
+        if settings.ASYNC_DB:
+            session = AsyncSession(
+                get_async_read_engine(),
+                expire_on_commit=False,
+                sync_session_class=ReadSession,
+                info={"primary": get_async_engine().sync_engine},
+            )
+            try:
+                # Check out a connection now to fall back before the handler runs
+                await session.connection()
+            except Exception:
+                await session.close()
+                raise
+        else:
+            session = ReadSession(get_read_engine(), info={"primary": get_engine()})
+            try:
+                await run_in_threadpool(session.connection)
+            except Exception:
+                await run_in_threadpool(session.close)
+                raise
+        return session
+    except (DBAPIError, OSError) as e:
+        replica_health.mark_unhealthy(e)
+        return None
+
+
+def warm_up_pool(db_engine: Engine, connections: int) -> None:
+    """Open up to `connections` pooled connections ahead of the first requests"""
+    if not hasattr(db_engine.pool, "size"):
+        return  # NullPool keeps no connections
+    # Hold them all at once, connections returned one by one would be reused
+    opened = []
+    try:
+        for _ in range(min(connections, db_engine.pool.size())):
+            opened.append(db_engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+    logger.info(f"Opened {len(opened)} database connections")
+
+
+async def warm_up_async_pool(db_engine: AsyncEngine, connections: int) -> None:
+    if not hasattr(db_engine.pool, "size"):
+        return
+    opened = []
+    try:
+        for _ in range(min(connections, db_engine.pool.size())):
+            opened.append(await db_engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    logger.info(f"Opened {len(opened)} async database connections")
+
+
+def ping(db_engine: Engine) -> None:
+    """
+    Run a trivial query. When it fails with a disconnect error SQLAlchemy
+    invalidates the whole pool, so stale connections are replaced on their
+    next checkout instead of failing a request.
+    """
+    with db_engine.connect() as connection:
+        connection.exec_driver_sql("SELECT 1")
+
+
+async def ping_async(db_engine: AsyncEngine) -> None:
+    async with db_engine.connect() as connection:
+        await connection.exec_driver_sql("SELECT 1")
+
+
+async def validate_pools(interval: float) -> None:
+    """Ping the initialized engines every `interval` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for db_engine in (engine, read_engine):
+                if db_engine is not None:
+                    await run_in_threadpool(ping, db_engine)
+            for db_engine in (async_engine, async_read_engine):
+                if db_engine is not None:
+                    await ping_async(db_engine)
+        except Exception as e:
+            logger.warning(f"Database connection validation failed: {e}")
 
 
 def init_db():
@@ -133,3 +387,57 @@ def get_session():
     """Get database session"""
     with Session(get_engine()) as session:
         yield session
+
+
+async def get_async_session():
+    """Get async database session"""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+@asynccontextmanager
+async def primary_session() -> AsyncIterator[DBSession]:
+    """
+    Session on the primary, an AsyncSession when settings.ASYNC_DB is
+    enabled and a regular Session otherwise.
+    """
+    if settings.ASYNC_DB:
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            yield session
+    else:
+        session = Session(get_engine())
+        try:
+            yield session
+        finally:
+            await run_in_threadpool(session.close)
+
+
+async def get_db():
+    """
+    Session dependency of the v1 endpoints, see primary_session. Both
+    session types are supported so the paths can be benchmarked side by side.
+    """
+    async with primary_session() as session:
+        yield session
+
+
+async def get_read_session():
+    """
+    Session dependency of the read-only v1 endpoints. Uses the replica of
+    READ_DATABASE_URL when configured and reachable, the primary otherwise.
+    """
+    session = None
+    if settings.READ_DATABASE_URL and replica_health.healthy:
+        session = await open_read_session()
+    if session is None:
+        if settings.ASYNC_DB:
+            session = AsyncSession(get_async_engine(), expire_on_commit=False)
+        else:
+            session = Session(get_engine())
+    try:
+        yield session
+    finally:
+        if isinstance(session, AsyncSession):
+            await session.close()
+        else:
+            await run_in_threadpool(session.close)
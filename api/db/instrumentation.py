@@ -0,0 +1,87 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by track_queries when more statements than `budget` were executed"""
+
+
+@dataclass
+class QueryStats:
+    """SQL statements executed while tracking, see track_queries"""
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: Optional[str] = None
+    # Only filled when tracking with keep_statements=True
+    statements: List[str] = field(default_factory=list)
+    keep_statements: bool = False
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+        if self.keep_statements:
+            self.statements.append(statement)
+
+
+# Stats of the current request (or test block). The object is shared with
+# the contexts copied into threadpool workers, so statements executed by
+# sync sessions are counted too.
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries(
+    budget: Optional[int] = None, keep_statements: bool = False
+) -> Iterator[QueryStats]:
+    """
+    Count the statements executed on instrumented engines inside the block.
+    With `budget`, raise QueryBudgetExceeded on exit if more were executed:
+
+        with track_queries(budget=2):
+            users.get_detail(db, author.id)
+    """
+    stats = QueryStats(keep_statements=keep_statements)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+    if budget is not None and stats.count > budget:
+        raise QueryBudgetExceeded(
+            f"{stats.count} statements executed, budget is {budget}: {stats.statements}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+
+def _handle_error(exception_context):
+    # The failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record the statements of `engine` (use `.sync_engine` of async engines)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
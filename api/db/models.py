@@ -1,9 +1,15 @@
+from datetime import datetime, timezone
 from typing import List, Optional
 from uuid import UUID, uuid4
+from sqlalchemy import DDL, DateTime, Index, event, func, literal_column, text
 from sqlmodel import SQLModel, Field, Relationship
 from enum import Enum
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class AccountType(str, Enum):
     AUTHOR = "AUTHOR"
     READER = "READER"
@@ -22,11 +28,212 @@ class Users(SQLModel, table=True):
 
 
 class Books(SQLModel, table=True):
+    # Access paths of the filters and sort keys of GET /books (see
+    # db.crud.books.BOOK_SORTS), id last for the keyset pagination
+    __table_args__ = (
+        Index("ix_books_author_id_id", "author_id", "id"),
+        Index("ix_books_author_id_updated_at_id", "author_id", "updated_at", "id"),
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_updated_at_id", "updated_at", "id"),
+        # Readers only list published books, partial indexes skip the drafts
+        Index(
+            "ix_books_published_id", "id",
+            postgresql_where=text("published"), sqlite_where=text("published = 1"),
+        ),
+        Index(
+            "ix_books_published_updated_at_id", "updated_at", "id",
+            postgresql_where=text("published"), sqlite_where=text("published = 1"),
+        ),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     title: str
     content: str
     published: bool = Field(default=False)
+    # Bumped by every UPDATE (ORM, bulk and Core), the ETag of the book
+    version: int = Field(
+        default=1,
+        sa_column_kwargs={"onupdate": text("version + 1"), "server_default": text("1")},
+    )
+    updated_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"onupdate": utcnow, "server_default": text("CURRENT_TIMESTAMP")},
+    )
+    # Rows of user_favorites for this book, maintained by db.crud.favorites
+    # without bumping the version
+    favorites_count: int = Field(default=0, sa_column_kwargs={"server_default": text("0")})
     
     # Foreign key to author
     author_id: Optional[UUID] = Field(default=None, foreign_key="users.id")
     author: Optional[Users] = Relationship(back_populates="books")
+
+
+# Generated search vector of CRUDBooks.search, Postgres only and not part of
+# the model. create_all adds it like migration b7e2c41d9a35 does
+event.listen(Books.__table__, "after_create", DDL("""
+ALTER TABLE books ADD COLUMN search_vector tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+) STORED
+""").execute_if(dialect="postgresql"))
+event.listen(Books.__table__, "after_create", DDL(
+    "CREATE INDEX ix_books_search_vector ON books USING gin (search_vector)"
+).execute_if(dialect="postgresql"))
+
+# Prefix lookups of db.crud.autocomplete, Postgres only. Keys in "C" collation
+# sort by code point, so every prefix is a contiguous range of the index
+AUTHOR_ONLY = text("account_type = 'AUTHOR'")
+Index("ix_books_title_prefix", func.lower(Books.title).collate("C")).ddl_if(dialect="postgresql")
+Index(
+    "ix_users_author_name_prefix",
+    func.lower(Users.first_name + literal_column("' '") + Users.last_name).collate("C"),
+    postgresql_where=AUTHOR_ONLY,
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_users_author_last_name_prefix",
+    func.lower(Users.last_name).collate("C"),
+    postgresql_where=AUTHOR_ONLY,
+).ddl_if(dialect="postgresql")
+
+
+class UserFavorites(SQLModel, table=True):
+    """Books saved by a user, see db.crud.favorites"""
+    __tablename__ = "user_favorites"
+
+    user_id: UUID = Field(foreign_key="users.id", primary_key=True, ondelete="CASCADE")
+    book_id: UUID = Field(
+        foreign_key="books.id", primary_key=True, index=True, ondelete="CASCADE"
+    )
+    created_at: datetime = Field(
+        default_factory=utcnow,
+        sa_type=DateTime(timezone=True),
+        sa_column_kwargs={"server_default": text("CURRENT_TIMESTAMP")},
+    )
+
+
+class AuthorStats(SQLModel, table=True):
+    """Book counts of an author, maintained by db.crud.author_stats"""
+    __tablename__ = "author_stats"
+
+    author_id: UUID = Field(foreign_key="users.id", primary_key=True, ondelete="CASCADE")
+    book_count: int = Field(default=0, index=True)
+    published_count: int = Field(default=0, index=True)
+    # Last create, update or delete of one of the author's books
+    last_updated: Optional[datetime] = Field(default=None, sa_type=DateTime(timezone=True))
+
+
+class AuthorStatsRead(SQLModel):
+    book_count: int = 0
+    published_count: int = 0
+    last_updated: Optional[datetime] = None
+
+
+class AuthorRanking(AuthorStatsRead):
+    """Entry of the authors leaderboard"""
+    author_id: UUID
+    first_name: str
+    last_name: str
+
+
+class BookSummary(SQLModel):
+    """Book without its content, for list views"""
+    id: UUID
+    title: str
+    published: bool
+    author_id: Optional[UUID] = None
+    version: int = 1
+    favorites_count: int = 0
+
+
+class FavoritedBook(SQLModel):
+    """Book of a GET /books page with whether the current user favorited it"""
+    id: UUID
+    title: str
+    content: str
+    published: bool
+    version: int
+    updated_at: datetime
+    favorites_count: int = 0
+    author_id: Optional[UUID] = None
+    favorited: bool = False
+
+
+class FavoritedBookSummary(BookSummary):
+    favorited: bool = False
+
+
+class UserDetail(SQLModel):
+    """User with a page of their books (always empty for readers)"""
+    id: UUID
+    first_name: str
+    last_name: str
+    email: str
+    account_type: AccountType
+    books: List[BookSummary] = []
+    books_next_cursor: Optional[str] = None
+    # Only set for authors
+    stats: Optional[AuthorStatsRead] = None
+
+
+class BookContent(SQLModel):
+    id: UUID
+    content: str
+
+
+class BookCreate(SQLModel):
+    title: str
+    content: str
+    published: bool = False
+
+
+class BookUpdate(SQLModel):
+    title: Optional[str] = None
+    content: Optional[str] = None
+    published: Optional[bool] = None
+
+
+class BookBulkUpdate(BookUpdate):
+    id: UUID
+
+
+class BulkItemResult(SQLModel):
+    """Outcome of one item of a bulk request, `status` mirrors the single-item endpoint"""
+    index: int
+    status: int
+    id: Optional[UUID] = None
+    detail: Optional[str] = None
+
+
+class BulkResult(SQLModel):
+    results: List[BulkItemResult]
+
+
+class ImportLineError(SQLModel):
+    line: int
+    detail: str
+
+
+class ImportResult(SQLModel):
+    """Summary of an import, `errors` holds the first IMPORT_MAX_ERRORS failed lines"""
+    created: int = 0
+    failed: int = 0
+    errors: List[ImportLineError] = []
+
+
+class TitleSuggestion(SQLModel):
+    id: UUID
+    title: str
+
+
+class AuthorSuggestion(SQLModel):
+    id: UUID
+    first_name: str
+    last_name: str
+
+
+class AutocompleteResult(SQLModel):
+    """Books and authors whose title or name starts with the typed prefix"""
+    books: List[TitleSuggestion] = []
+    authors: List[AuthorSuggestion] = []
@@ -1,8 +1,23 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from db.database import init_db
-from v1.endpoints import books, auth, users
+from core.metrics import metrics
+from core.middleware import QUERY_COUNT_HEADER, MetricsMiddleware, QueryStatsMiddleware
+from core.security import password_hasher
+from core.config import settings
+from db.database import (
+    get_async_engine,
+    get_engine,
+    init_db,
+    validate_pools,
+    warm_up_async_pool,
+    warm_up_pool,
+)
+from v1.endpoints import autocomplete, books, auth, favorites, users
+from v1.pagination import NEXT_CURSOR_HEADER
 import os
 import logging
 
@@ -30,15 +45,29 @@ async def lifespan(app: FastAPI):
         if env_mode == 'production':
             logger.info("In production mode - database schema should be managed by migrations")
         
+        # Open connections of the engine serving requests before the first request
+        if settings.DB_POOL_WARMUP:
+            if settings.ASYNC_DB:
+                await warm_up_async_pool(get_async_engine(), settings.DB_POOL_WARMUP)
+            else:
+                await run_in_threadpool(warm_up_pool, get_engine(), settings.DB_POOL_WARMUP)
+        
     except Exception as e:
         logger.error(f"Error during startup: {e}")
         # In production, we'll continue even if there's an error
         # This allows the API to start and serve non-DB endpoints
     
+    validation = None
+    if settings.DB_POOL_VALIDATION_INTERVAL:
+        validation = asyncio.create_task(validate_pools(settings.DB_POOL_VALIDATION_INTERVAL))
+    
     yield
     
     # Cleanup code (if needed)
     logger.info("Shutting down application")
+    if validation is not None:
+        validation.cancel()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -57,18 +86,24 @@ origins = [
     "https://fabooks-frontend-254943040140.us-central1.run.app",
 ]
 
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, QUERY_COUNT_HEADER, "Server-Timing", "ETag"],
 )
 
 # Include routers
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(books.router, prefix="/api/v1")
 app.include_router(users.router, prefix="/api/v1")
+app.include_router(favorites.router, prefix="/api/v1")
+app.include_router(autocomplete.router, prefix="/api/v1")
 
 
 @app.get("/")
@@ -79,3 +114,11 @@ async def root():
         "status": "running",
         "environment": os.getenv("ENVIRONMENT", "development")
     }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Request, connection pool and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
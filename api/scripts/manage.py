@@ -1,10 +1,24 @@
+import csv
+import io
+import itertools
+import multiprocessing
+import time
 import typer
 import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+from uuid import uuid4
+from alembic.config import Config
+from alembic.script import ScriptDirectory
 from faker import Faker
-from db.database import init_db, engine
-from db.models import Users, Books, AccountType
+from sqlalchemy import Engine, Table, insert
+from db.audit import AuditReport, render_migration, run_audit
+from db.crud.author_stats import author_stats
+from db.database import init_db, get_engine
+from db.models import AuthorStats, Users, Books, AccountType, UserFavorites
 from sqlmodel import Session, select, delete
-from core.security import get_password_hash
+from core.security import password_hasher
 
 app = typer.Typer()
 fake = Faker()
@@ -23,7 +37,7 @@ def create_random_user(db: Session) -> Users:
     # Generate a plain password and hash it
     plain_password = fake.password()
     print(f"Email: {email} - Plain password: {plain_password}")
-    hashed_password = get_password_hash(plain_password)
+    hashed_password = password_hasher.hash(plain_password)
 
     user = Users(
         first_name=fake.first_name(),
@@ -49,15 +63,154 @@ def create_random_books(db: Session, author: Users, num_books: int) -> None:
     db.commit()
 
 
+def generate_batch(
+    fake: Faker, start: int, count: int, run_id: str, hashes: List[str], contents: List[str]
+) -> Tuple[List[dict], List[dict]]:
+    """Generate `count` users (and books for the authors) as plain column dicts"""
+    users, books = [], []
+    for i in range(start, start + count):
+        first_name, last_name = fake.first_name(), fake.last_name()
+        account_type = random.choice([AccountType.AUTHOR, AccountType.READER])
+        user_id = uuid4()
+        users.append({
+            "id": user_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            # The run id and the counter make emails unique without querying the database
+            "email": f"{first_name.lower()}.{last_name.lower()}.{run_id}{i}@example.com",
+            "password": hashes[i % len(hashes)],
+            "account_type": account_type.value,
+        })
+        if account_type == AccountType.AUTHOR:
+            for _ in range(random.randint(0, 10)):
+                books.append({
+                    "id": uuid4(),
+                    "title": fake.catch_phrase(),
+                    "content": random.choice(contents),
+                    "published": False,
+                    "author_id": user_id,
+                })
+    return users, books
+
+
+def insert_rows(db_engine: Engine, table: Table, rows: List[dict]) -> None:
+    """Insert rows with COPY on psycopg2 and a multi-row executemany elsewhere"""
+    if not rows:
+        return
+    if db_engine.dialect.driver != "psycopg2":
+        with db_engine.begin() as conn:
+            conn.execute(insert(table), rows)
+        return
+
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([row[column] for column in columns] for row in rows)
+    buffer.seek(0)
+    raw = db_engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def populate_range(
+    start: int, count: int, batch_size: int, run_id: str, hashes: List[str]
+) -> Tuple[int, int]:
+    """Insert users start..start+count in batches, returns (users, books) inserted"""
+    fake = Faker()
+    fake.seed_instance(start)
+    # Generating 2000 characters of text per book dominates otherwise
+    contents = [fake.text(max_nb_chars=2000) for _ in range(100)]
+    db_engine = get_engine()
+    total_users = total_books = 0
+    for batch_start in range(start, start + count, batch_size):
+        batch_count = min(batch_size, start + count - batch_start)
+        users, books = generate_batch(fake, batch_start, batch_count, run_id, hashes, contents)
+        insert_rows(db_engine, Users.__table__, users)
+        insert_rows(db_engine, Books.__table__, books)
+        total_users += len(users)
+        total_books += len(books)
+    return total_users, total_books
+
+
+def populate_fast(num_users: int, batch_size: int, workers: int, password_pool: int) -> None:
+    started = time.perf_counter()
+    plain_passwords = [fake.password() for _ in range(password_pool)]
+    hashes = [password_hasher.hash(password) for password in plain_passwords]
+    typer.echo(f"Passwords (assigned round-robin): {', '.join(plain_passwords)}")
+
+    run_id = uuid4().hex[:8]
+    chunk = -(-num_users // workers)
+    ranges = [(start, min(chunk, num_users - start)) for start in range(0, num_users, chunk)]
+    if workers == 1:
+        results = [populate_range(start, count, batch_size, run_id, hashes) for start, count in ranges]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            results = list(executor.map(
+                populate_range,
+                *zip(*ranges),
+                itertools.repeat(batch_size),
+                itertools.repeat(run_id),
+                itertools.repeat(hashes),
+            ))
+
+    users = sum(result[0] for result in results)
+    books = sum(result[1] for result in results)
+    elapsed = time.perf_counter() - started
+    typer.echo(
+        f"Created {users} users and {books} books in {elapsed:.1f}s "
+        f"({(users + books) / elapsed:.0f} rows/s)",
+        color=typer.colors.GREEN,
+    )
+
+
+def reconcile_stats(batch_size: int) -> Tuple[int, int]:
+    """Recompute author_stats for all users, one transaction per batch"""
+    total_users = total_authors = 0
+    last_id = None
+    with Session(get_engine()) as db:
+        while True:
+            # Keyset pagination over the primary key
+            statement = select(Users.id).order_by(Users.id).limit(batch_size)
+            if last_id is not None:
+                statement = statement.where(Users.id > last_id)
+            ids = db.exec(statement).all()
+            if not ids:
+                return total_users, total_authors
+            total_authors += author_stats.reconcile(db, ids)
+            total_users += len(ids)
+            last_id = ids[-1]
+
+
 @app.command()
-def populate(num_users: int = typer.Argument(..., help="Number of users to create")):
+def populate(
+    num_users: int = typer.Argument(..., help="Number of users to create"),
+    fast: bool = typer.Option(False, "--fast", help="Generate and insert in large batches"),
+    batch_size: int = typer.Option(10_000, help="Users per batch in --fast mode"),
+    workers: int = typer.Option(1, help="Worker processes in --fast mode"),
+    password_pool: int = typer.Option(8, help="Distinct password hashes in --fast mode"),
+):
     """
     Populate database with sample data.
     Example: python scripts/manage.py populate 1000
+    Example: python scripts/manage.py populate 1000000 --fast --workers 4
     """
     init_db()
 
-    with Session(engine) as db:
+    if fast:
+        populate_fast(num_users, batch_size, max(1, workers), max(1, password_pool))
+        # Rows are inserted around the CRUD layer, count the new books
+        reconcile_stats(batch_size)
+        return
+
+    with Session(get_engine()) as db:
         for i in range(num_users):
             user = create_random_user(db)
 
@@ -70,6 +223,104 @@ def populate(num_users: int = typer.Argument(..., help="Number of users to creat
                 typer.echo(f"Created {i} users...")
 
         typer.echo(f"Successfully created {num_users} users!", color=typer.colors.GREEN)
+    reconcile_stats(1000)
+
+
+@app.command("reconcile-author-stats")
+def reconcile_author_stats(
+    batch_size: int = typer.Option(1000, help="Users per batch (and transaction)"),
+):
+    """
+    Recompute the book counts of author_stats from the books table.
+    Example: python -m scripts.manage reconcile-author-stats
+    """
+    started = time.perf_counter()
+    total_users, total_authors = reconcile_stats(batch_size)
+    typer.echo(
+        f"Reconciled {total_users} users ({total_authors} with books) "
+        f"in {time.perf_counter() - started:.1f}s",
+        color=typer.colors.GREEN,
+    )
+
+
+def print_audit(report: AuditReport, bloat_threshold: float, verbose: bool) -> None:
+    scanned = [plan for plan in report.plans if plan.seq_scans]
+    typer.echo(
+        f"Query plans ({report.dialect}): {len(report.plans)} statements, "
+        f"{len(scanned)} with sequential scans"
+    )
+    for plan in report.plans if verbose else scanned:
+        typer.echo(f"  {plan.query.operation}: {' '.join(plan.query.statement.split())[:160]}")
+        for scan in plan.seq_scans:
+            typer.secho(f"    full scan of {scan.table} ({scan.detail})", fg=typer.colors.YELLOW)
+        if verbose:
+            for line in plan.plan:
+                typer.echo(f"    | {line}")
+
+    typer.echo("Foreign keys without an index:")
+    for suggestion in report.missing_fk_indexes:
+        typer.echo(f"  {suggestion.table}({', '.join(suggestion.columns)}): {suggestion.reasons[0]}")
+    if not report.missing_fk_indexes:
+        typer.echo("  none")
+
+    if report.dialect == "postgresql":
+        typer.echo("Unused indexes (idx_scan = 0 since the statistics were reset):")
+        for index in report.unused_indexes:
+            typer.echo(f"  {index.table}.{index.index}: {index.size / 1024:.0f} kB")
+        if not report.unused_indexes:
+            typer.echo("  none")
+
+    typer.echo(f"Bloat (dead share >= {bloat_threshold:.0%}):")
+    bloated = [table for table in report.bloat if table.dead_ratio >= bloat_threshold]
+    for table in bloated:
+        typer.echo(
+            f"  {table.table}: {table.dead} dead / {table.live} live {table.unit} "
+            f"({table.dead_ratio:.0%})"
+        )
+    if not bloated:
+        typer.echo("  none")
+
+    typer.echo("Suggested indexes:")
+    for suggestion in report.suggestions:
+        typer.secho(
+            f"  {suggestion.name} ON {suggestion.table} ({', '.join(suggestion.columns)}): "
+            f"{'; '.join(suggestion.reasons)}",
+            fg=typer.colors.GREEN,
+        )
+    if not report.suggestions:
+        typer.echo("  none")
+
+
+@app.command("db-audit")
+def db_audit(
+    analyze: bool = typer.Option(
+        False, "--analyze", help="EXPLAIN ANALYZE, executes the statements (Postgres only)"
+    ),
+    migration: bool = typer.Option(
+        False, "--migration", help="Write an Alembic migration creating the suggested indexes"
+    ),
+    bloat_threshold: float = typer.Option(0.2, help="Report tables with this share of dead tuples"),
+    verbose: bool = typer.Option(False, "--verbose", help="Print every statement and plan"),
+):
+    """
+    EXPLAIN the queries of the CRUD layer against the (seeded) database and
+    report sequential scans, foreign keys without an index, unused indexes
+    and bloat. Nothing is written to the database.
+    Example: python -m scripts.manage db-audit --analyze --migration
+    """
+    report = run_audit(get_engine(), analyze=analyze)
+    print_audit(report, bloat_threshold, verbose)
+
+    if migration:
+        if not report.suggestions:
+            typer.echo("No indexes to suggest, no migration written")
+            return
+        config = Config(str(Path(__file__).resolve().parents[1] / "alembic.ini"))
+        script = ScriptDirectory.from_config(config)
+        revision = uuid4().hex[:12]
+        path = Path(script.versions) / f"{revision}_add_suggested_indexes.py"
+        path.write_text(render_migration(report.suggestions, revision, script.get_current_head()))
+        typer.echo(f"Wrote {path}", color=typer.colors.GREEN)
 
 
 @app.command()
@@ -78,7 +329,10 @@ def clean():
     Clean the database.
     Example: python scripts/db.py clean
     """
-    with Session(engine) as db:
+    with Session(get_engine()) as db:
+        db.exec(delete(AuthorStats))
+        # Favorites reference both books and users
+        db.exec(delete(UserFavorites))
         db.exec(delete(Books))
         db.exec(delete(Users))
         db.commit()
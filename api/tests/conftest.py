@@ -1,11 +1,22 @@
+import os
+
+# Run the suite on the async request path. SQLite (aiosqlite for the async
+# engine) stands in for Postgres unless TESTING selects the test_db database
+# (see `make test`) or DATABASE_URL points elsewhere.
+os.environ.setdefault("ASYNC_DB", "true")
+if not os.getenv("TESTING"):
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+
 import pytest
 from sqlmodel import Session, SQLModel
-from db.database import engine
+from db.database import get_engine
 # Import all models to ensure they're registered with SQLModel
 from db.models import Users, AccountType
 from fastapi.testclient import TestClient
 from main import app
 
+engine = get_engine()
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_env():
     """Setup test environment once per test session"""
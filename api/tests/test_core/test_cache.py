@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import pytest
+
+from core.cache import LoadingCache, SingleFlight, TTLCache
+
+
+def test_get_and_set():
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.hits == 1
+    assert cache.misses == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_entries_expire():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_per_entry_ttl():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0)
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_loads():
+    flight = SingleFlight()
+    loads = 0
+    
+    async def load():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return loads
+    
+    results = await asyncio.gather(*(flight.do("a", load) for _ in range(10)))
+    assert results == [1] * 10
+    assert loads == 1
+    assert flight.coalesced == 9
+    # Finished loads are forgotten
+    assert await flight.do("a", load) == 2
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors():
+    flight = SingleFlight()
+    
+    async def load():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database down")
+    
+    results = await asyncio.gather(*(flight.do("a", load) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_loading_cache():
+    cache = LoadingCache(TTLCache(maxsize=10, ttl=60))
+    loads = []
+    
+    async def load():
+        loads.append(1)
+        return "value"
+    
+    assert await cache.get_or_load("a", load) == "value"
+    assert await cache.get_or_load("a", load) == "value"
+    assert len(loads) == 1
+    
+    cache.invalidate("a")
+    assert await cache.get_or_load("a", load) == "value"
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_loading_cache_skips_none():
+    cache = LoadingCache(TTLCache(maxsize=10, ttl=60))
+    
+    async def load():
+        return None
+    
+    assert await cache.get_or_load("a", load) is None
+    assert len(cache.backend) == 0
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_stored():
+    cache = LoadingCache(TTLCache(maxsize=10, ttl=60))
+    
+    async def load():
+        # A write invalidates the key while the old value is being read
+        cache.invalidate("a")
+        return "old"
+    
+    assert await cache.get_or_load("a", load) == "old"
+    assert cache.backend.get("a") is None
@@ -0,0 +1,61 @@
+from fastapi.testclient import TestClient
+
+from core.cache import TTLCache
+from core.metrics import Histogram, Metrics
+
+
+def test_histogram_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    # Bounds are inclusive, the last count is the +Inf bucket
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+
+
+def test_render_request_metrics():
+    registry = Metrics()
+    registry.observe_request("GET", "/books/{book_id}", 200, 0.02)
+    registry.observe_request("GET", "/books/{book_id}", 404, 0.2)
+    text = registry.render()
+    
+    assert 'http_responses_total{method="GET",route="/books/{book_id}",status="200"} 1' in text
+    assert 'http_responses_total{method="GET",route="/books/{book_id}",status="404"} 1' in text
+    # Buckets are cumulative
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/books/{book_id}",le="0.025"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/books/{book_id}",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/books/{book_id}"} 2' in text
+
+
+def test_render_callbacks():
+    registry = Metrics()
+    cache = TTLCache(maxsize=10, ttl=60)
+    registry.register_cache("test", cache)
+    registry.register_gauge("queue_depth", "Queued items", lambda: 3)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    text = registry.render()
+    
+    assert "# TYPE cache_hits_total counter" in text
+    assert 'cache_hits_total{cache="test"} 1' in text
+    assert 'cache_hit_ratio{cache="test"} 0.5' in text
+    assert 'cache_size{cache="test"} 1' in text
+    assert "queue_depth 3" in text
+
+
+def test_metrics_endpoint(client: TestClient):
+    client.get("/api/v1/books/00000000-0000-0000-0000-000000000000")
+    client.get("/not-a-route")
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    # Requests are labelled with the route template
+    assert '/books/{book_id}",status="401"' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert 'cache_hit_ratio{cache="users"}' in text
+    assert "password_hash_queue_depth" in text
+    assert 'db_pool_checked_out{pool="sync"}' in text
@@ -0,0 +1,80 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from db.crud.users import users
+from db.instrumentation import QueryBudgetExceeded, track_queries
+from db.models import AccountType, Users
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a user for the statement counting tests"""
+    email = "query_stats@test.com"
+    return users.get_by_email(db_session, email) or users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Query",
+        "last_name": "Stats",
+        "account_type": AccountType.READER,
+    })
+
+
+def test_track_queries_counts_statements(db_session: Session, test_author: Users):
+    with track_queries(keep_statements=True) as stats:
+        db_session.exec(select(Users).where(Users.id == test_author.id)).first()
+        db_session.exec(select(Users).limit(1)).all()
+    assert stats.count == 2
+    assert len(stats.statements) == 2
+    assert stats.total_time >= stats.slowest_time > 0
+    assert stats.slowest_statement in stats.statements
+
+
+def test_statements_outside_the_block_are_not_counted(db_session: Session):
+    with track_queries() as stats:
+        pass
+    db_session.exec(select(Users).limit(1)).all()
+    assert stats.count == 0
+
+
+def test_query_budget(db_session: Session, test_author: Users):
+    with track_queries(budget=1):
+        users.get_by_email(db_session, test_author.email)
+    
+    with pytest.raises(QueryBudgetExceeded):
+        with track_queries(budget=1):
+            users.get_by_email(db_session, test_author.email)
+            users.get_by_email(db_session, test_author.email)
+
+
+def test_server_timing_headers(client: TestClient, auth_headers):
+    response = client.get("/api/v1/books?limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert int(response.headers["X-Query-Count"]) >= 1
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert "app;dur=" in response.headers["Server-Timing"]
+
+
+def test_requests_over_budget_are_logged(client: TestClient, auth_headers, caplog):
+    from main import app
+    
+    middleware = next(m for m in app.user_middleware if m.cls.__name__ == "QueryStatsMiddleware")
+    original_budget = middleware.kwargs.get("budget")
+    # Rebuild the middleware stack with a budget every request exceeds
+    middleware.kwargs["budget"] = -1
+    app.middleware_stack = None
+    try:
+        with caplog.at_level(logging.WARNING, logger="core.middleware"):
+            client.get("/api/v1/books?limit=1", headers=auth_headers)
+    finally:
+        if original_budget is None:
+            del middleware.kwargs["budget"]
+        else:
+            middleware.kwargs["budget"] = original_budget
+        app.middleware_stack = None
+    
+    record = next(r for r in caplog.records if "SQL statements" in r.getMessage())
+    assert record.query_count >= 1
+    assert record.path == "/api/v1/books"
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+import anyio
+import pytest
+from jose import JWTError, jwt
+
+from core.security import (
+    ALGORITHM,
+    SECRET_KEY,
+    PasswordHasher,
+    Slots,
+    create_access_token,
+    password_hasher,
+    token_cache,
+    verify_password,
+    verify_token,
+)
+
+
+def test_hash_and_verify_in_pool():
+    # Test hashing round-trips through the worker processes
+    hashed = password_hasher.hash("secret123")
+    assert hashed != "secret123"
+    assert verify_password("secret123", hashed)
+    assert password_hasher.verify("secret123", hashed) is True
+    assert password_hasher.verify("wrong", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_async():
+    hashed = await password_hasher.hash_async("secret123")
+    assert await password_hasher.verify_async("secret123", hashed) is True
+    assert await password_hasher.verify_async("wrong", hashed) is False
+
+
+def test_inline_hasher():
+    # Test that a hasher without workers hashes in the calling thread
+    hasher = PasswordHasher(workers=0, max_pending=1)
+    hashed = hasher.hash("secret123")
+    assert hasher.verify("secret123", hashed) is True
+    assert hasher.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_for_a_slot_takes_no_thread():
+    """Logins queued behind PASSWORD_HASH_MAX_PENDING must leave the threadpool to requests"""
+    hasher = PasswordHasher(workers=1, max_pending=1)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    try:
+        storm = asyncio.gather(*(hasher._run_async(time.sleep, 0.01) for _ in range(50)))
+        await asyncio.sleep(0.1)
+        assert hasher._slots.waiting > limiter.total_tokens / 2
+        assert limiter.borrowed_tokens == 0
+        await storm
+        assert hasher.in_flight == 0
+    finally:
+        hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_slots_hand_over_to_threads_and_coroutines():
+    slots = Slots(1)
+    slots.acquire()
+    waiters = [asyncio.ensure_future(slots.acquire_async()) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert slots.waiting == 3
+
+    # A cancelled waiter gives up its place
+    waiters[0].cancel()
+    await asyncio.sleep(0)
+    assert slots.waiting == 2
+
+    # Released from another thread, like the done callbacks of the process pool
+    await asyncio.to_thread(slots.release)
+    await asyncio.wait_for(waiters[1], 1)
+    assert not waiters[2].done()
+
+    # A waiter cancelled while the slot is handed over passes it on
+    waiters[2].cancel()
+    slots.release()
+    await asyncio.sleep(0)
+    thread = threading.Thread(target=slots.acquire)
+    thread.start()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert slots.waiting == 0
+
+
+def test_verify_token_is_cached():
+    token = create_access_token({"sub": "cached-user"})
+    token_cache.clear()
+    assert verify_token(token)["sub"] == "cached-user"
+    hits = token_cache.hits
+    assert verify_token(token)["sub"] == "cached-user"
+    assert token_cache.hits == hits + 1
+    
+    # Callers may change the claims they get, the cached ones stay intact
+    verify_token(token)["sub"] = "someone-else"
+    assert verify_token(token)["sub"] == "cached-user"
+
+
+def test_verify_token_without_expiry_is_not_cached():
+    token = jwt.encode({"sub": "forever"}, SECRET_KEY, algorithm=ALGORITHM)
+    assert verify_token(token)["sub"] == "forever"
+    assert token_cache.get(token) is None
+
+
+def test_verify_token_rejects_invalid_token():
+    with pytest.raises(JWTError):
+        verify_token("invalid_token")
+    assert token_cache.get("invalid_token") is None
+
+
+def test_verify_token_does_not_outlive_expiry():
+    # A token expiring in a moment must not be served from the cache afterwards
+    token = create_access_token({"sub": "short-lived"}, timedelta(seconds=1))
+    verify_token(token)
+    time.sleep(2.1)
+    with pytest.raises(JWTError):
+        verify_token(token)
@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from uuid import uuid4
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.crud.books import async_books, book_cache, books
+from db.instrumentation import track_queries
+from db.crud.users import async_users, users
+from db.database import get_async_engine
+from db.models import AccountType, Users
+from core.security import password_hasher
+
+
+@pytest_asyncio.fixture
+async def async_session():
+    """Provide a session on the async engine"""
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_async_crud@test.com"
+    
+    # Check if user already exists
+    existing_user = users.get_by_email(db_session, email)
+    if existing_user:
+        return existing_user
+    
+    return users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Test",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+@pytest.mark.asyncio
+async def test_get_with_async_session(async_session: AsyncSession, test_user: Users):
+    # Test the facade runs CRUD methods on the async driver
+    user = await async_users.get(async_session, test_user.id)
+    assert user is not None
+    assert user.email == test_user.email
+
+
+@pytest.mark.asyncio
+async def test_get_with_sync_session(db_session: Session, test_user: Users):
+    # Test the facade offloads CRUD methods on a regular session
+    user = await async_users.get(db_session, test_user.id)
+    assert user.id == test_user.id
+
+
+@pytest.mark.asyncio
+async def test_create_and_delete_with_async_session(
+    async_session: AsyncSession, test_author: Users
+):
+    book = await async_books.create_book(
+        async_session, {"title": "Async Book", "content": "Content"}, test_author
+    )
+    assert book.title == "Async Book"
+    assert book.author_id == test_author.id
+
+    assert await async_books.delete(async_session, book.id) is True
+    assert await async_books.get(async_session, book.id) is None
+
+
+@pytest.mark.asyncio
+async def test_authenticate_with_async_session(
+    async_session: AsyncSession, test_user: Users, test_user_data: dict
+):
+    user = await async_users.authenticate(
+        async_session, test_user_data["email"], test_user_data["password"]
+    )
+    assert user is not None
+    assert user.id == test_user.id
+
+    assert await async_users.authenticate(
+        async_session, test_user_data["email"], "wrongpassword"
+    ) is None
+    assert await async_users.authenticate(
+        async_session, f"{uuid4()}@example.com", "whatever"
+    ) is None
+
+
+@pytest.mark.asyncio
+async def test_authenticate_releases_connection_before_hashing(
+    monkeypatch, async_session: AsyncSession, test_engine, test_user: Users, test_user_data: dict
+):
+    verify_async = password_hasher.verify_async
+    # Not db_session, authenticate closes the session and would detach its shared fixtures
+    for db in (async_session, Session(test_engine)):
+        async def verify_without_connection(plain_password: str, hashed_password: str) -> bool:
+            # Waiting for a hash slot must not hold a pooled connection
+            assert not db.in_transaction()
+            return await verify_async(plain_password, hashed_password)
+
+        monkeypatch.setattr(password_hasher, "verify_async", verify_without_connection)
+        user = await async_users.authenticate(
+            db, test_user_data["email"], test_user_data["password"]
+        )
+        assert user.id == test_user.id
+        assert user.email == test_user_data["email"]
+
+
+@pytest.mark.asyncio
+async def test_get_book_is_cached(async_session: AsyncSession, db_session: Session, test_author: Users):
+    book = books.create(db_session, {
+        "title": "Cached Book", "content": "Content", "author_id": test_author.id
+    })
+    await async_books.get(async_session, book.id)
+    
+    with track_queries() as stats:
+        cached = await async_books.get(async_session, book.id)
+    assert stats.count == 0
+    assert cached.title == "Cached Book"
+    
+    # Writes through the CRUD evict the book
+    books.update(db_session, book.id, {"title": "Updated Book"})
+    assert (await async_books.get(async_session, book.id)).title == "Updated Book"
+    
+    books.delete(db_session, book.id)
+    assert await async_books.get(async_session, book.id) is None
+    assert book_cache.backend.get(book.id) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query(async_session: AsyncSession, db_session: Session, test_author: Users):
+    book = books.create(db_session, {
+        "title": "Popular Book", "content": "Content", "author_id": test_author.id
+    })
+    with track_queries() as stats:
+        results = await asyncio.gather(*(async_books.get(async_session, book.id) for _ in range(5)))
+    assert stats.count == 1
+    assert {result.id for result in results} == {book.id}
+
+
+@pytest.mark.asyncio
+async def test_books_by_author_cache_invalidated_on_create(
+    async_session: AsyncSession, test_author: Users
+):
+    before = await async_books.get_books_by_author(async_session, test_author.id)
+    with track_queries() as stats:
+        await async_books.get_books_by_author(async_session, test_author.id)
+    assert stats.count == 0
+    
+    await async_books.create_book(async_session, {"title": "New", "content": "Content"}, test_author)
+    after = await async_books.get_books_by_author(async_session, test_author.id)
+    assert len(after) == len(before) + 1
@@ -0,0 +1,115 @@
+import pytest
+from sqlmodel import Session, select
+
+from db.crud.author_stats import author_stats, count_deltas
+from db.crud.books import books
+from db.crud.users import users
+from db.models import AccountType, AuthorStats, Users
+
+
+def get_or_create_author(db: Session, email: str) -> Users:
+    existing_user = users.get_by_email(db, email)
+    if existing_user:
+        return existing_user
+    return users.create(db, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Test",
+        "last_name": "Stats",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+def remove_books(db: Session, author: Users) -> None:
+    books.delete_many(db, [book.id for book in books.get_books_by_author(db, author.id, limit=1000)])
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    author = get_or_create_author(db_session, "author_stats@test.com")
+    yield author
+    remove_books(db_session, author)
+
+
+@pytest.fixture
+def other_author(db_session: Session) -> Users:
+    author = get_or_create_author(db_session, "other_author_stats@test.com")
+    yield author
+    remove_books(db_session, author)
+
+
+def counts(db: Session, author: Users):
+    db.expire_all()
+    stats = db.get(AuthorStats, author.id)
+    return (stats.book_count, stats.published_count) if stats else (0, 0)
+
+
+def test_count_deltas():
+    a, b = object(), object()
+    assert count_deltas(added=[(a, True), (a, False), (None, True)]) == {a: (2, 1)}
+    assert count_deltas([(a, False)], [(a, True)]) == {a: (0, 1)}
+    assert count_deltas([(a, True)], [(b, True)]) == {a: (-1, -1), b: (1, 1)}
+
+
+def test_single_writes(db_session: Session, test_author: Users):
+    book = books.create_book(db_session, {"title": "A", "content": "a"}, test_author)
+    assert counts(db_session, test_author) == (1, 0)
+    
+    books.update(db_session, book.id, {"published": True})
+    assert counts(db_session, test_author) == (1, 1)
+    # Other fields leave the counts alone
+    books.update(db_session, book.id, {"title": "B"})
+    assert counts(db_session, test_author) == (1, 1)
+    
+    books.create(db_session, {"title": "C", "content": "c", "author_id": test_author.id})
+    assert counts(db_session, test_author) == (2, 1)
+    
+    assert books.delete(db_session, book.id)
+    assert counts(db_session, test_author) == (1, 0)
+
+
+def test_bulk_writes(db_session: Session, test_author: Users, other_author: Users):
+    created = books.create_books(db_session, [
+        {"title": f"Bulk {i}", "content": "x", "published": i < 2} for i in range(5)
+    ], test_author)
+    assert counts(db_session, test_author) == (5, 2)
+    
+    books.update_many(db_session, [
+        {"id": created[0].id, "published": False},
+        {"id": created[4].id, "published": True, "author_id": other_author.id},
+    ])
+    assert counts(db_session, test_author) == (4, 1)
+    assert counts(db_session, other_author) == (1, 1)
+    
+    books.delete_many(db_session, [book.id for book in created[:3]])
+    assert counts(db_session, test_author) == (1, 0)
+
+
+def test_reconcile(db_session: Session, test_author: Users, other_author: Users):
+    books.create_books(db_session, [
+        {"title": f"Drift {i}", "content": "x", "published": True} for i in range(3)
+    ], test_author)
+    # Simulate rows written around the CRUD layer
+    stats = db_session.get(AuthorStats, test_author.id)
+    stats.book_count, stats.published_count = 42, 0
+    db_session.commit()
+    
+    assert author_stats.reconcile(db_session, [test_author.id, other_author.id]) == 1
+    assert counts(db_session, test_author) == (3, 3)
+    assert db_session.exec(
+        select(AuthorStats).where(AuthorStats.author_id == other_author.id)
+    ).first() is None
+
+
+def test_leaderboard(db_session: Session, test_author: Users, other_author: Users):
+    books.create_books(db_session, [{"title": "One", "content": "x"}], other_author)
+    books.create_books(db_session, [
+        {"title": f"Top {i}", "content": "x", "published": i == 0} for i in range(30)
+    ], test_author)
+    
+    ranking = author_stats.get_leaderboard(db_session, "books", 100)
+    ids = [entry.author_id for entry in ranking]
+    assert ids[0] == test_author.id
+    assert ids.index(test_author.id) < ids.index(other_author.id)
+    assert ranking[0].book_count == 30
+    assert ranking[0].published_count == 1
@@ -0,0 +1,255 @@
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine
+from uuid import uuid4
+from sqlmodel import Session, SQLModel, select
+
+from db.crud.autocomplete import (
+    AsyncAutocomplete, CRUDAutocomplete, MemoryIndex, PrefixIndex, autocomplete, name_order,
+    suggestion_cache,
+)
+from db.crud.books import books
+from db.crud.users import users
+from db.models import AccountType, Books, Users
+
+AUTHORS = [
+    ("Ursula", "Le Guin"), ("Ursula", "Vernon"), ("Uriel", "Lequeux"),
+    ("Lena", "Ulrich"), ("Mary", "Shelley"), ("Percy", "Shelley"),
+]
+TITLES = [
+    "Ubik", "Ulysses", "Ulysses 100%", "Under the Net", "Underworld",
+    "under_score", "Utopia", "Frankenstein", "The Dispossessed", "Ü is for Über",
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(tmp_path_factory):
+    """Separate SQLite database with a few authors, books and one reader"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('autocomplete')}/autocomplete.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        authors = [
+            Users(
+                first_name=first, last_name=last, email=f"{first}.{last}@test.com",
+                password="not-hashed", account_type=AccountType.AUTHOR,
+            )
+            for first, last in AUTHORS
+        ]
+        db.add_all(authors + [Users(
+            first_name="Ulla", last_name="Reader", email="ulla@test.com",
+            password="not-hashed", account_type=AccountType.READER,
+        )])
+        db.commit()
+        books.create_books(db, [
+            {"title": title, "content": "Content"} for title in TITLES
+        ], authors[0])
+    yield engine
+    engine.dispose()
+
+
+def titles(result):
+    return [book.title for book in result.books]
+
+
+def names(result):
+    return [f"{author.first_name} {author.last_name}" for author in result.authors]
+
+
+@pytest.mark.parametrize("mode", ["memory", "database"])
+def test_suggest(seeded_engine, mode):
+    crud = CRUDAutocomplete(mode)
+    with Session(seeded_engine) as db:
+        result = crud.suggest(db, "U", limit=10)
+        assert titles(result) == [
+            "Ubik", "Ulysses", "Ulysses 100%", "Under the Net", "under_score", "Underworld", "Utopia",
+        ]
+        # First or last name, never readers, ordered by full name
+        assert names(result) == ["Lena Ulrich", "Uriel Lequeux", "Ursula Le Guin", "Ursula Vernon"]
+        
+        result = crud.suggest(db, "  ursula l", limit=10)
+        assert titles(result) == []
+        assert names(result) == ["Ursula Le Guin"]
+        assert names(crud.suggest(db, "shel", limit=10)) == ["Mary Shelley", "Percy Shelley"]
+        # Wildcards are literal
+        assert titles(crud.suggest(db, "ulysses 100%")) == ["Ulysses 100%"]
+        assert titles(crud.suggest(db, "under_")) == ["under_score"]
+        if mode == "memory":
+            # lower() of SQLite only folds ASCII letters, Postgres folds all
+            assert titles(crud.suggest(db, "ü")) == ["Ü is for Über"]
+        assert crud.suggest(db, " ").books == []
+
+
+@pytest.mark.parametrize("prefix", ["u", "ul", "un", "ur", "le", "s", "x"])
+@pytest.mark.parametrize("limit", [1, 2, 3])
+def test_memory_matches_database(seeded_engine, prefix, limit):
+    with Session(seeded_engine) as db:
+        in_memory = CRUDAutocomplete("memory").suggest(db, prefix, limit)
+        assert in_memory == CRUDAutocomplete("database").suggest(db, prefix, limit)
+        assert len(in_memory.books) <= limit and len(in_memory.authors) <= limit
+
+
+def test_memory_index_updated_on_writes(seeded_engine):
+    crud = CRUDAutocomplete("memory", index_ttl=3600)
+    with Session(seeded_engine) as db:
+        crud.suggest(db, "u")
+        crud.suggest(db, "ul")
+        assert crud.memory.builds == 1
+        
+        author = db.exec(select(Users).where(Users.last_name == "Vernon")).one()
+        book = books.create(db, {
+            "title": "Ulverton", "content": "Content", "author_id": author.id
+        })
+        crud.memory.mark_changed(Books, book.id)
+        assert titles(crud.suggest(db, "ulv")) == ["Ulverton"]
+        
+        users.update(db, author.id, {"last_name": "Unwin"})
+        crud.memory.mark_changed(Users, author.id)
+        assert names(crud.suggest(db, "unw")) == ["Ursula Unwin"]
+        assert names(crud.suggest(db, "ursula u")) == ["Ursula Unwin"]
+        assert names(crud.suggest(db, "vern")) == []
+        
+        books.delete(db, book.id)
+        crud.memory.mark_changed(Books, book.id)
+        assert titles(crud.suggest(db, "ulv")) == []
+        # Only the changed rows were read again
+        assert crud.memory.builds == 1
+        assert crud.memory.updates == 3
+        
+        users.update(db, author.id, {"last_name": "Vernon"})
+        crud.memory.mark_changed(Users, author.id)
+        assert names(crud.suggest(db, "vern")) == ["Ursula Vernon"]
+        
+        # Memory and database agree after the updates
+        for prefix in ("u", "ul", "ur", "v"):
+            assert crud.suggest(db, prefix) == CRUDAutocomplete("database").suggest(db, prefix)
+
+
+def test_memory_index_rebuilt_after_ttl_or_many_changes(seeded_engine):
+    crud = CRUDAutocomplete("memory", index_ttl=3600)
+    crud.memory.max_changes = 2
+    with Session(seeded_engine) as db:
+        crud.suggest(db, "u")
+        for id in (uuid4(), uuid4(), uuid4()):
+            crud.memory.mark_changed(Books, id)
+        crud.suggest(db, "u")
+        assert (crud.memory.builds, crud.memory.updates) == (2, 0)
+        
+        crud.memory.ttl = 0
+        crud.suggest(db, "u")
+        assert crud.memory.builds == 3
+
+
+def test_last_name_matches_stop_at_limit(seeded_engine):
+    """Common last names don't walk every author who has them"""
+    crud = CRUDAutocomplete("memory", index_ttl=3600)
+    with Session(seeded_engine) as db:
+        titles_index, names_index, _ = crud.memory.get(db)[0]
+    authors = [(f"first{i:04}", last) for i in range(1000) for last in ("Smith", "Smythe")]
+    walked = []
+    
+    class CountingIndex(PrefixIndex):
+        def search_each_key(self, prefix, limit):
+            for entry in super().search_each_key(prefix, limit):
+                walked.append(entry)
+                yield entry
+    
+    last_names = CountingIndex(
+        [(last.lower(), uuid4(), (first, last)) for first, last in authors], order=name_order
+    )
+    crud.memory._indexes = (titles_index, names_index, last_names)
+    with Session(seeded_engine) as db:
+        assert names(crud.suggest(db, "sm", limit=3)) == [
+            "first0000 Smith", "first0000 Smythe", "first0001 Smith",
+        ]
+    assert len(walked) == 6
+
+
+@pytest.fixture
+def slow_build(monkeypatch):
+    """Make building the memory indexes take long enough for lookups to overlap it"""
+    build = MemoryIndex._build
+
+    def slow(db):
+        time.sleep(0.2)
+        return build(db)
+
+    monkeypatch.setattr(MemoryIndex, "_build", staticmethod(slow))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_wait_for_first_build(seeded_engine, slow_build):
+    crud = AsyncAutocomplete(CRUDAutocomplete("memory"))
+    suggestion_cache.clear()
+    with Session(seeded_engine) as first, Session(seeded_engine) as second:
+        u, ul = await asyncio.gather(crud.suggest(first, "u"), crud.suggest(second, "ul"))
+    assert titles(u) == ["Ubik", "Ulysses", "Ulysses 100%", "Under the Net", "under_score"]
+    assert titles(ul) == ["Ulysses", "Ulysses 100%"]
+    assert crud.crud.memory.builds == 1
+    assert suggestion_cache.backend.get(("ul", 5)) == ul
+
+
+@pytest.mark.asyncio
+async def test_results_of_outdated_index_not_cached(seeded_engine):
+    crud = AsyncAutocomplete(CRUDAutocomplete("memory"))
+    suggestion_cache.clear()
+    with Session(seeded_engine) as db:
+        crud.crud.memory.get(db)
+        crud.crud.memory.mark_changed(Books, uuid4())
+        # Another lookup is updating the indexes: the previous ones are used meanwhile
+        with crud.crud.memory._lock:
+            assert crud.crud.lookup(db, "ub")[1] is False
+            assert titles(await crud.suggest(db, "ub")) == ["Ubik"]
+        assert suggestion_cache.backend.get(("ub", 5)) is None
+        
+        assert titles(await crud.suggest(db, "ub")) == ["Ubik"]
+        assert crud.crud.memory.updates == 1
+        assert suggestion_cache.backend.get(("ub", 5)) is not None
+
+
+def test_prefix_index():
+    index = PrefixIndex([("b", 2, "B"), ("ab", 1, "AB"), ("abc", 3, "ABC"), ("ab", 0, "AB0")])
+    assert len(index) == 4
+    assert [value for _, _, value in index.search("ab")] == ["AB0", "AB", "ABC"]
+    assert list(index.search("c")) == []
+    
+    updated = index.replace([1, 2, 9], [("aa", 4, "AA"), ("ab", 1, "AB1")])
+    assert [value for _, _, value in updated.search("a")] == ["AA", "AB0", "AB1", "ABC"]
+    assert list(updated.search("b")) == []
+    # The original is left as it was for the searches still using it
+    assert [value for _, _, value in index.search("")] == ["AB0", "AB", "ABC", "B"]
+    
+    ordered = PrefixIndex([("x", 0, "b"), ("x", 1, "a"), ("y", 2, "a")], order=str)
+    assert [value for _, _, value in ordered.search("x")] == ["a", "b"]
+    
+    keys = PrefixIndex(
+        [
+            ("x", 0, "b"), ("x", 1, "a"), ("x", 2, "c"),
+            ("x y", 3, "d"), ("xa", 4, "e"), ("y", 5, "f"),
+        ],
+        order=str,
+    )
+    assert [value for _, _, value in keys.search_each_key("x", 2)] == ["a", "b", "d", "e"]
+
+
+def test_writes_invalidate_suggestions(db_session: Session):
+    """Creating a book or an author through the CRUD layer clears the cached results"""
+    suggestion_cache.backend.set(("quixotic", 5), autocomplete.suggest(db_session, "quixotic"))
+    author = users.get_by_email(db_session, "quixotic@test.com") or users.create(db_session, {
+        "email": "quixotic@test.com",
+        "password": "password123",
+        "first_name": "Quixotic",
+        "last_name": "Autocomplete",
+        "account_type": AccountType.AUTHOR
+    })
+    assert suggestion_cache.backend.get(("quixotic", 5)) is None
+    
+    suggestion_cache.backend.set(("quixotic", 5), autocomplete.suggest(db_session, "quixotic"))
+    book = books.create(db_session, {
+        "title": "Quixotic Adventures", "content": "Content", "author_id": author.id
+    })
+    assert suggestion_cache.backend.get(("quixotic", 5)) is None
+    result = autocomplete.suggest(db_session, "quixotic")
+    assert [suggestion.id for suggestion in result.books] == [book.id]
+    assert author.id in [suggestion.id for suggestion in result.authors]
+    books.delete(db_session, book.id)
@@ -1,7 +1,7 @@
 import pytest
 from uuid import UUID, uuid4
 from sqlmodel import Session
-from db.crud.base import CRUDBase
+from db.crud.base import CRUDBase, decode_cursor, encode_cursor
 from db.models import Users, AccountType
 
 @pytest.fixture
@@ -67,4 +67,26 @@ def test_delete(db_session: Session, crud_base: CRUDBase, test_user: Users):
     
     # Test delete method
     assert crud_base.delete(db_session, user_to_delete.id) is True
-    assert crud_base.get(db_session, user_to_delete.id) is None 
\ No newline at end of file
+    assert crud_base.get(db_session, user_to_delete.id) is None
+
+
+def test_get_page(db_session: Session, crud_base: CRUDBase, test_user: Users):
+    # Walk every page with the cursor and make sure no row is repeated or skipped
+    seen = []
+    page, cursor = crud_base.get_page(db_session, None, 1)
+    seen.extend(page)
+    while cursor:
+        page, cursor = crud_base.get_page(db_session, cursor, 1)
+        seen.extend(page)
+    assert [user.id for user in seen] == [user.id for user in crud_base.get_multi(db_session)]
+    assert test_user in seen
+
+
+def test_get_page_invalid_cursor(db_session: Session, crud_base: CRUDBase):
+    with pytest.raises(ValueError):
+        crud_base.get_page(db_session, "not a cursor!", 10)
+
+
+def test_cursor_roundtrip():
+    id = uuid4()
+    assert decode_cursor(encode_cursor(id)) == id
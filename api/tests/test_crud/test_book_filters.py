@@ -0,0 +1,141 @@
+import itertools
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, SQLModel
+
+from db.audit import capture_statements, explain
+from db.crud.base import decode_sort_cursor, encode_sort_cursor
+from db.crud.books import BOOK_SORTS, BookFilters, books
+from db.models import AccountType, Books, Users
+
+PREFIX = "Q b"
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(tmp_path_factory):
+    """
+    Separate SQLite database with the current schema, 20 authors of 30 books
+    each (one in ten published) and planner statistics
+    """
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('filters')}/filters.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        authors = [
+            Users(
+                first_name="Filter", last_name=str(n), email=f"filter{n}@test.com",
+                password="not-hashed", account_type=AccountType.AUTHOR,
+            )
+            for n in range(20)
+        ]
+        db.add_all(authors)
+        db.commit()
+        for n, author in enumerate(authors):
+            books.create_books(db, [
+                {"title": f"{chr(65 + i % 26)} book {n}-{i}", "content": "Content",
+                 "published": i % 10 == 0}
+                for i in range(30)
+            ], author)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def author_id(seeded_engine):
+    with Session(seeded_engine) as db:
+        return books.get_multi(db, 0, 1)[0].author_id
+
+
+def combinations(author_id):
+    filters = [
+        {},
+        {"published": True},
+        {"author_id": author_id},
+        {"title_prefix": PREFIX},
+        {"author_id": author_id, "published": True},
+        {"published": True, "title_prefix": PREFIX},
+    ]
+    return [
+        BookFilters(**kwargs, sort=sort) for kwargs, sort in itertools.product(filters, BOOK_SORTS)
+    ]
+
+
+def expected(db: Session, filters: BookFilters) -> list:
+    """Books matching `filters` in the order of its sort key, computed in Python"""
+    order_by, descending = BOOK_SORTS[filters.sort]
+    matching = [
+        book for book in books.get_multi(db, 0, 10_000)
+        if (filters.published is None or book.published == filters.published)
+        and (filters.author_id is None or book.author_id == filters.author_id)
+        and (filters.title_prefix is None or book.title.startswith(filters.title_prefix))
+    ]
+    key = (lambda book: book.id) if order_by is None else (
+        lambda book: (getattr(book, order_by.key), book.id)
+    )
+    return sorted(matching, key=key, reverse=descending)
+
+
+def test_every_filter_and_sort_uses_an_index(seeded_engine, author_id):
+    for filters in combinations(author_id):
+        with seeded_engine.connect() as connection:
+            captured = []
+            with capture_statements(connection, captured), Session(bind=connection) as db:
+                for summary in (False, True):
+                    _, cursor = books.get_filtered_page(db, filters, None, 2, summary=summary)
+                    # The keyset condition of the next pages has to use the index too
+                    books.get_filtered_page(db, filters, cursor, 2, summary=summary)
+            assert len(captured) == 4
+            for query in captured:
+                plan = explain(connection, query, ["books"]).plan
+                accesses = [line for line in plan if " books" in line]
+                assert accesses, plan
+                for line in accesses:
+                    assert "USING INDEX" in line or "USING COVERING INDEX" in line, (filters, plan)
+
+
+def test_filtered_pages_follow_sort_key(seeded_engine, author_id):
+    with Session(seeded_engine) as db:
+        for filters in combinations(author_id):
+            walked, cursor = books.get_filtered_page(db, filters, None, 7)
+            while cursor:
+                page, cursor = books.get_filtered_page(db, filters, cursor, 7)
+                walked += page
+            assert [book.id for book in walked] == [book.id for book in expected(db, filters)]
+
+
+def test_filtered_summaries(seeded_engine, author_id):
+    with Session(seeded_engine) as db:
+        filters = BookFilters(author_id=author_id, sort="-updated_at")
+        page, _ = books.get_filtered_page(db, filters, None, 5, summary=True)
+        assert [row.id for row in page] == [book.id for book in expected(db, filters)[:5]]
+        assert not hasattr(page[0], "content")
+        
+        legacy = books.get_filtered(db, filters, skip=5, limit=5, summary=True)
+        assert [row.id for row in legacy] == [book.id for book in expected(db, filters)[5:10]]
+
+
+def test_title_prefix_is_literal_and_case_sensitive(seeded_engine, author_id):
+    with Session(seeded_engine) as db:
+        assert books.get_filtered(db, BookFilters(title_prefix="q b")) == []
+        assert books.get_filtered(db, BookFilters(title_prefix="%")) == []
+        assert books.get_filtered(db, BookFilters(title_prefix="Q_b")) == []
+        matching = books.get_filtered(db, BookFilters(title_prefix=PREFIX), limit=1000)
+        assert matching and all(book.title.startswith(PREFIX) for book in matching)
+
+
+def test_sort_cursor_roundtrip():
+    book = Books(title="Title", content="Content")
+    assert decode_sort_cursor(encode_sort_cursor(book.title, book.id), Books.title) == (
+        book.title, book.id
+    )
+    assert decode_sort_cursor(
+        encode_sort_cursor(book.updated_at, book.id), Books.updated_at
+    ) == (book.updated_at, book.id)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", encode_sort_cursor(1, Books().id)])
+def test_invalid_sort_cursor(seeded_engine, cursor):
+    with Session(seeded_engine) as db:
+        with pytest.raises(ValueError):
+            books.get_filtered_page(db, BookFilters(sort="title"), cursor, 10)
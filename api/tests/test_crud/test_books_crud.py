@@ -81,4 +81,32 @@ def test_get_user_books(db_session_for_test: Session, crud_books: CRUDBooks, tes
     # Test with non-existent author
     non_existent_id = uuid4()
     result = crud_books.get_books_by_author(db_session_for_test, non_existent_id)
-    assert len(result) == 0 
\ No newline at end of file
+    assert len(result) == 0
+
+
+def test_bulk_operations(db_session: Session, crud_books: CRUDBooks):
+    author = users.create(db_session, {
+        "email": "bulk_author@test.com",
+        "password": "password123",
+        "first_name": "Bulk",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR
+    })
+    created = crud_books.create_books(db_session, [
+        {"title": f"Bulk {i}", "content": "Content"} for i in range(3)
+    ], author)
+    assert all(book.author_id == author.id for book in created)
+    ids = [book.id for book in created]
+    assert crud_books.get_author_ids(db_session, ids) == {id: author.id for id in ids}
+
+    crud_books.update_many(db_session, [
+        {"id": ids[0], "title": "Renamed"},
+        {"id": ids[1], "published": True}
+    ])
+    db_session.expire_all()
+    assert crud_books.get(db_session, ids[0]).title == "Renamed"
+    assert crud_books.get(db_session, ids[1]).published is True
+
+    crud_books.delete_many(db_session, ids[:2])
+    assert list(crud_books.get_author_ids(db_session, ids)) == [ids[2]]
+    crud_books.delete_many(db_session, ids[2:])
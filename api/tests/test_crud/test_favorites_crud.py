@@ -0,0 +1,128 @@
+import pytest
+from uuid import uuid4
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, create_engine
+
+from db.crud.books import books
+from db.crud.autocomplete import autocomplete
+from db.crud.favorites import favorites
+from db.crud.users import users
+from db.models import AccountType, Books, Users
+
+
+def get_or_create_user(db: Session, email: str, account_type: AccountType) -> Users:
+    existing_user = users.get_by_email(db, email)
+    if existing_user:
+        return existing_user
+    return users.create(db, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Test",
+        "last_name": "Favorites",
+        "account_type": account_type
+    })
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    return get_or_create_user(db_session, "author_favorites@test.com", AccountType.AUTHOR)
+
+
+@pytest.fixture
+def test_reader(db_session: Session) -> Users:
+    return get_or_create_user(db_session, "reader_favorites@test.com", AccountType.READER)
+
+
+@pytest.fixture
+def test_books(db_session: Session, test_author: Users):
+    created = books.create_books(db_session, [
+        {"title": f"Favorite {i}", "content": "Content"} for i in range(3)
+    ], test_author)
+    yield created
+    books.delete_many(db_session, [book.id for book in created])
+
+
+def refreshed(db: Session, book: Books) -> Books:
+    db.expire_all()
+    return db.get(Books, book.id)
+
+
+def test_add_and_remove_favorite(db_session: Session, test_reader: Users, test_books):
+    book = test_books[0]
+    assert favorites.add(db_session, test_reader.id, book.id)
+    # Adding again changes nothing
+    assert not favorites.add(db_session, test_reader.id, book.id)
+    
+    db_book = refreshed(db_session, book)
+    assert db_book.favorites_count == 1
+    # The book itself didn't change, neither does its version (ETag)
+    assert db_book.version == book.version
+    
+    assert favorites.remove(db_session, test_reader.id, book.id)
+    assert not favorites.remove(db_session, test_reader.id, book.id)
+    assert refreshed(db_session, book).favorites_count == 0
+
+
+def test_add_missing_book_raises(test_engine, test_reader: Users):
+    # Only a duplicate favorite counts as "already favorited"
+    engine = create_engine(test_engine.url)
+    if engine.dialect.name == "sqlite":
+        event.listen(
+            engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON")
+        )
+    with Session(engine) as db:
+        with pytest.raises(IntegrityError):
+            favorites.add(db, test_reader.id, uuid4())
+    engine.dispose()
+
+
+def test_favorites_skip_books_invalidation_hooks(
+    db_session: Session, test_reader: Users, test_books
+):
+    writes = autocomplete.memory.writes
+    favorites.add(db_session, test_reader.id, test_books[0].id)
+    favorites.remove(db_session, test_reader.id, test_books[0].id)
+    assert autocomplete.memory.writes == writes
+
+
+def test_counts_are_per_book(
+    db_session: Session, test_author: Users, test_reader: Users, test_books
+):
+    first, second, _ = test_books
+    favorites.add(db_session, test_reader.id, first.id)
+    favorites.add(db_session, test_author.id, first.id)
+    favorites.add(db_session, test_author.id, second.id)
+    
+    assert refreshed(db_session, first).favorites_count == 2
+    assert refreshed(db_session, second).favorites_count == 1
+    
+    favorites.remove(db_session, test_author.id, first.id)
+    favorites.remove(db_session, test_author.id, second.id)
+    favorites.remove(db_session, test_reader.id, first.id)
+
+
+def test_get_favorited(db_session: Session, test_reader: Users, test_books):
+    favorites.add(db_session, test_reader.id, test_books[1].id)
+    
+    ids = [book.id for book in test_books]
+    assert favorites.get_favorited(db_session, test_reader.id, ids) == {test_books[1].id}
+    assert favorites.get_favorited(db_session, test_reader.id, []) == set()
+    
+    page, next_cursor = favorites.get_books_page(db_session, test_reader.id)
+    assert [book.id for book in page] == [test_books[1].id]
+    assert next_cursor is None
+    
+    favorites.remove(db_session, test_reader.id, test_books[1].id)
+
+
+def test_deleting_user_decrements_counts(db_session: Session, test_books):
+    user = get_or_create_user(db_session, "deleted_favorites@test.com", AccountType.READER)
+    favorites.add(db_session, user.id, test_books[0].id)
+    favorites.add(db_session, user.id, test_books[2].id)
+    
+    assert users.delete(db_session, user.id)
+    
+    assert refreshed(db_session, test_books[0]).favorites_count == 0
+    assert refreshed(db_session, test_books[2]).favorites_count == 0
+    assert favorites.get_favorited(db_session, user.id, [test_books[0].id]) == set()
@@ -0,0 +1,111 @@
+import pytest
+from sqlalchemy import create_engine, func, text
+from sqlmodel import Session, SQLModel, select
+
+from db import audit
+from db.audit import IndexSuggestion, render_migration, run_audit
+from db.crud.books import books
+from db.models import AccountType, Books, Users
+
+
+@pytest.fixture
+def current_engine(tmp_path):
+    """Separate SQLite database with the current schema and a few books"""
+    engine = create_engine(f"sqlite:///{tmp_path}/audit.db")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as db:
+        author = Users(
+            first_name="Audit", last_name="Author", email="audit@test.com",
+            password="not-hashed", account_type=AccountType.AUTHOR,
+        )
+        db.add(author)
+        db.commit()
+        books.create_books(db, [
+            {"title": f"Audited book {i}", "content": "Content"} for i in range(20)
+        ], author)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def seeded_engine(current_engine):
+    """The same database without the author indexes of books, as before migration e6b1c8d4f203"""
+    with current_engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_books_author_id_id"))
+        connection.execute(text("DROP INDEX ix_books_author_id_updated_at_id"))
+    return current_engine
+
+
+def test_audit_reports_missing_author_index(seeded_engine):
+    report = run_audit(seeded_engine)
+    
+    operations = {plan.query.operation for plan in report.plans}
+    assert {"books.get_books_by_author", "users.get_detail", "books.delete"} <= operations
+    
+    by_author = next(
+        plan for plan in report.plans if plan.query.operation == "books.get_books_by_author"
+    )
+    assert [scan.table for scan in by_author.seq_scans] == ["books"]
+    
+    assert [(s.table, s.columns) for s in report.missing_fk_indexes] == [("books", ("author_id",))]
+    suggestion = next(s for s in report.suggestions if s.name == "ix_books_author_id")
+    assert "foreign key to users" in suggestion.reasons
+    assert "full scan in books.get_books_by_author" in suggestion.reasons
+    # Lookups by primary key never scan
+    by_id = next(plan for plan in report.plans if plan.query.operation == "books.get")
+    assert by_id.seq_scans == []
+
+
+def test_audit_current_schema_indexes_foreign_keys(current_engine):
+    report = run_audit(current_engine)
+    
+    assert report.missing_fk_indexes == []
+    by_author = next(
+        plan for plan in report.plans if plan.query.operation == "books.get_books_by_author"
+    )
+    assert by_author.seq_scans == []
+
+
+def test_audit_leaves_database_unchanged(seeded_engine):
+    run_audit(seeded_engine)
+    with Session(seeded_engine) as db:
+        assert db.exec(select(func.count()).select_from(Books)).one() == 20
+        assert not db.exec(select(Books).where(Books.published)).all()
+        assert not db.exec(select(Books).where(Books.title == "Audit")).all()
+
+
+def test_audit_analyze_executes_statements_before_they_run(seeded_engine, monkeypatch):
+    """EXPLAIN ANALYZE runs each statement, writes included, without breaking the audit"""
+    explain = audit.explain
+    
+    def explain_analyze(connection, query, tables, analyze=False):
+        # SQLite has no EXPLAIN ANALYZE, execute the statement like Postgres
+        # does (on the DBAPI cursor, which the audit doesn't capture)
+        if analyze:
+            connection.connection.cursor().execute(query.statement, query.parameters)
+        return explain(connection, query, tables, analyze)
+    
+    monkeypatch.setattr(audit, "explain", explain_analyze)
+    report = run_audit(seeded_engine, analyze=True)
+    
+    operations = [plan.query.operation for plan in report.plans]
+    assert {"books.create_book", "books.update", "favorites.add", "books.delete"} <= set(operations)
+    with Session(seeded_engine) as db:
+        assert db.exec(select(func.count()).select_from(Books)).one() == 20
+        assert not db.exec(select(Books).where(Books.title == "Audit")).all()
+
+
+def test_render_migration():
+    source = render_migration(
+        [IndexSuggestion("books", ("author_id", "published"), ["foreign key to users"])],
+        revision="0123456789ab",
+        down_revision="d3f7a9c2e184",
+    )
+    compile(source, "migration.py", "exec")
+    assert "revision: str = '0123456789ab'" in source
+    assert "down_revision: Union[str, None] = 'd3f7a9c2e184'" in source
+    assert (
+        "op.create_index('ix_books_author_id_published', 'books', ['author_id', 'published'], "
+        "unique=False, postgresql_concurrently=True, if_not_exists=True)"
+    ) in source
+    assert "autocommit_block" in source
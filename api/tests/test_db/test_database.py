@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, create_mock_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+
+from core.config import settings
+from db import database
+from db.database import pool_options, validate_pools, warm_up_pool
+from db.instrumentation import instrument_engine, track_queries
+
+
+def test_pool_options_follow_settings(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 3)
+    monkeypatch.setattr(settings, "DB_POOL_PRE_PING", False)
+    options = pool_options()
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["pool_pre_ping"] is False
+
+
+def test_warm_up_pool(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/warmup.db", pool_size=3)
+    warm_up_pool(engine, 10)
+    # Capped at the pool size, overflow connections would be closed on return
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+
+def test_validate_pools_pings_engines(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path}/validate.db")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/validate.db")
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "async_engine", async_engine)
+    
+    async def run_briefly():
+        task = asyncio.create_task(validate_pools(0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await async_engine.dispose()
+    
+    with track_queries(keep_statements=True) as stats:
+        asyncio.run(run_briefly())
+    engine.dispose()
+    # Both engines are pinged on every round
+    assert stats.statements.count("SELECT 1") >= 4
+
+
+@pytest.mark.parametrize("url, created", [("postgresql://", True), ("sqlite://", False)])
+def test_create_all_adds_search_vector_on_postgres(url, created):
+    """create_all (tests, init_db) builds the schema of migration b7e2c41d9a35"""
+    statements = []
+    engine = create_mock_engine(
+        url, lambda sql, *args, **kwargs: statements.append(str(sql.compile(dialect=engine.dialect)))
+    )
+    SQLModel.metadata.create_all(engine, checkfirst=False)
+    assert any("ADD COLUMN search_vector tsvector" in sql for sql in statements) is created
+    assert any("ix_books_search_vector" in sql for sql in statements) is created
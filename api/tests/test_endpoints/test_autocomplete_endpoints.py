@@ -0,0 +1,86 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from db.crud.books import books
+from db.crud.users import users
+from db.models import AccountType, Users
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_autocomplete_endpoint@test.com"
+    
+    # Check if user already exists
+    existing_user = users.get_by_email(db_session, email)
+    if existing_user:
+        return existing_user
+    
+    return users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Zephyrine",
+        "last_name": "Wordsmith",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+@pytest.fixture
+def test_books(db_session: Session, test_author: Users):
+    created = books.create_books(db_session, [
+        {"title": title, "content": "Content"}
+        for title in ("Zephyr Winds", "Zephyr Tides", "Zeppelin Days")
+    ], test_author)
+    yield created
+    books.delete_many(db_session, [book.id for book in created])
+
+
+def test_autocomplete(client: TestClient, auth_headers, test_author, test_books):
+    response = client.get("/api/v1/autocomplete?q=zeph", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("private, max-age=")
+    assert [book["title"] for book in response.json()["books"]] == ["Zephyr Tides", "Zephyr Winds"]
+    assert response.json()["authors"] == [{
+        "id": str(test_author.id), "first_name": "Zephyrine", "last_name": "Wordsmith"
+    }]
+    
+    response = client.get("/api/v1/autocomplete?q=zep&limit=1", headers=auth_headers)
+    assert [book["title"] for book in response.json()["books"]] == ["Zephyr Tides"]
+    
+    response = client.get("/api/v1/autocomplete?q=wordsm", headers=auth_headers)
+    assert response.json()["books"] == []
+    assert [author["id"] for author in response.json()["authors"]] == [str(test_author.id)]
+
+
+def test_autocomplete_cached_per_prefix(client: TestClient, auth_headers, test_books):
+    # Warm up the user cache of the authenticated user
+    client.get("/api/v1/users/me", headers=auth_headers)
+    
+    client.get("/api/v1/autocomplete?q=zepp", headers=auth_headers)
+    response = client.get("/api/v1/autocomplete?q=zepp", headers=auth_headers)
+    assert response.headers["X-Query-Count"] == "0"
+    assert [book["title"] for book in response.json()["books"]] == ["Zeppelin Days"]
+
+
+def test_autocomplete_sees_new_books(client: TestClient, auth_headers, test_books):
+    assert client.get("/api/v1/autocomplete?q=zeppelin", headers=auth_headers).json()["books"]
+    response = client.post(
+        "/api/v1/books", json={"title": "Zeppelin Nights", "content": "Content"},
+        headers=auth_headers
+    )
+    assert response.status_code in (200, 201)
+    
+    suggestions = client.get("/api/v1/autocomplete?q=zeppelin", headers=auth_headers).json()
+    assert [book["title"] for book in suggestions["books"]] == ["Zeppelin Days", "Zeppelin Nights"]
+    client.delete(f"/api/v1/books/{response.json()['id']}", headers=auth_headers)
+
+
+@pytest.mark.parametrize("params", [{}, {"q": ""}, {"q": "a", "limit": 0}, {"q": "a", "limit": 21}])
+def test_autocomplete_invalid(client: TestClient, auth_headers, params):
+    response = client.get("/api/v1/autocomplete", params=params, headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_autocomplete_requires_auth(client: TestClient):
+    assert client.get("/api/v1/autocomplete?q=ze").status_code == 401
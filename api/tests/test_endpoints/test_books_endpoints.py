@@ -3,9 +3,9 @@ from uuid import uuid4
 from fastapi.testclient import TestClient
 from sqlmodel import Session
 
-from db.crud.books import books
+from db.crud.books import book_cache, books
 from db.crud.users import users
-from db.models import AccountType, Users
+from db.models import AccountType, Books, Users
 
 @pytest.fixture
 def test_author(db_session: Session) -> Users:
@@ -124,6 +124,44 @@ def test_update_book(client: TestClient, auth_headers, test_book):
     assert response.status_code == 200
     assert response.json()["title"] == update_data["title"]
 
+def test_server_managed_fields_are_ignored(client: TestClient, auth_headers):
+    """Test clients can't set the id, counters or timestamps of a book"""
+    forged = {
+        "id": str(uuid4()),
+        "favorites_count": 999,
+        "version": 99,
+        "updated_at": "2000-01-01T00:00:00Z",
+    }
+    response = client.post(
+        "/api/v1/books",
+        json={"title": "Forged Book", "content": "Content", **forged},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    created = response.json()
+    assert created["id"] != forged["id"]
+    assert created["favorites_count"] == 0
+    assert created["version"] == 1
+    assert not created["updated_at"].startswith("2000")
+
+    response = client.put(
+        f"/api/v1/books/{created['id']}",
+        json={"title": "Forged Update", **forged},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    updated = response.json()
+    assert updated["id"] == created["id"]
+    assert updated["title"] == "Forged Update"
+    assert updated["favorites_count"] == 0
+    assert updated["version"] == 2
+    assert not updated["updated_at"].startswith("2000")
+
+def test_create_book_without_content(client: TestClient, auth_headers):
+    """Test creating a book without the required fields"""
+    response = client.post("/api/v1/books", json={"title": "No Content"}, headers=auth_headers)
+    assert response.status_code == 422
+
 def test_update_other_authors_book(client: TestClient, reader_headers, test_book):
     """Test updating another author's book (should fail)"""
     update_data = {
@@ -143,6 +181,28 @@ def test_delete_book(client: TestClient, auth_headers, test_book):
     response = client.delete(f"/api/v1/books/{test_book.id}", headers=auth_headers)
     assert response.status_code == 204
 
+def test_writes_ignore_stale_cached_books(
+    client: TestClient, auth_headers, db_session: Session, test_book
+):
+    """Test update and delete check the owner and existence on the primary, not book_cache"""
+    # Cached by another worker before the book changed hands
+    book_cache.backend.set(test_book.id, Books(**{**test_book.model_dump(), "author_id": uuid4()}))
+    response = client.put(
+        f"/api/v1/books/{test_book.id}", json={"title": "Still Mine"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+
+    # Deleted by another worker, still cached here
+    stale = Books(**books.get(db_session, test_book.id).model_dump())
+    books.delete(db_session, test_book.id)
+    book_cache.backend.set(test_book.id, stale)
+    for method in ("put", "delete"):
+        response = client.request(
+            method, f"/api/v1/books/{test_book.id}", json={"title": "Gone"}, headers=auth_headers
+        )
+        assert response.status_code == 404
+    book_cache.invalidate(test_book.id)
+
 def test_delete_other_authors_book(client: TestClient, reader_headers, test_book):
     """Test deleting another author's book (should fail)"""
     response = client.delete(f"/api/v1/books/{test_book.id}", headers=reader_headers)
@@ -152,3 +212,315 @@ def test_delete_nonexistent_book(client: TestClient, auth_headers):
     """Test deleting a book that doesn't exist"""
     response = client.delete(f"/api/v1/books/{uuid4()}", headers=auth_headers)
     assert response.status_code == 404
+
+def test_get_books_cursor_pagination(client: TestClient, db_session: Session, auth_headers, test_book):
+    """Test walking the book list page by page with the X-Next-Cursor header"""
+    books.create(db_session, {
+        "title": "Second Test Book",
+        "content": "More content",
+        "author_id": test_book.author_id
+    })
+    
+    response = client.get("/api/v1/books?limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    
+    seen_ids = [book["id"] for book in response.json()]
+    while "X-Next-Cursor" in response.headers:
+        response = client.get(
+            "/api/v1/books",
+            params={"limit": 1, "cursor": response.headers["X-Next-Cursor"]},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        seen_ids.extend(book["id"] for book in response.json())
+    
+    assert len(seen_ids) == len(set(seen_ids))
+    assert str(test_book.id) in seen_ids
+    assert len(seen_ids) == len(client.get("/api/v1/books", headers=auth_headers).json())
+
+def test_get_books_invalid_cursor(client: TestClient, auth_headers):
+    """Test that a malformed cursor is rejected"""
+    response = client.get("/api/v1/books?cursor=not-a-cursor!", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_search_books(client: TestClient, db_session: Session, auth_headers, test_book):
+    """Test full-text search ranks title matches first"""
+    author_id = test_book.author_id
+    in_content = books.create(db_session, {
+        "title": "Ordinary Title",
+        "content": "A story about a quokka and nothing else",
+        "author_id": author_id
+    })
+    in_title = books.create(db_session, {
+        "title": "The Quokka Chronicles",
+        "content": "Adventures of a quokka on an island",
+        "author_id": author_id
+    })
+    
+    response = client.get("/api/v1/books/search?q=quokka", headers=auth_headers)
+    assert response.status_code == 200
+    ids = [book["id"] for book in response.json()]
+    assert ids == [str(in_title.id), str(in_content.id)]
+    
+    # Every term has to match
+    response = client.get("/api/v1/books/search?q=quokka chronicles", headers=auth_headers)
+    assert [book["id"] for book in response.json()] == [str(in_title.id)]
+
+def test_search_books_requires_query(client: TestClient, auth_headers):
+    """Test that an empty search query is rejected"""
+    response = client.get("/api/v1/books/search?q=", headers=auth_headers)
+    assert response.status_code == 422
+
+def test_get_books_summary_view(client: TestClient, auth_headers, test_book):
+    """Test that the summary view leaves out the book content"""
+    response = client.get("/api/v1/books?view=summary", headers=auth_headers)
+    assert response.status_code == 200
+    
+    summary = next(book for book in response.json() if book["id"] == str(test_book.id))
+    assert summary == {
+        "id": str(test_book.id),
+        "title": test_book.title,
+        "published": test_book.published,
+        "author_id": str(test_book.author_id),
+        "version": test_book.version,
+        "favorites_count": 0,
+        "favorited": False
+    }
+
+def test_get_books_summary_view_cursor(client: TestClient, auth_headers, test_book):
+    """Test that summaries paginate with the cursor as well"""
+    response = client.get("/api/v1/books?view=summary&limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert "content" not in response.json()[0]
+    
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor:
+        response = client.get(
+            "/api/v1/books",
+            params={"view": "summary", "limit": 1, "cursor": cursor},
+            headers=auth_headers
+        )
+        assert response.status_code == 200
+        assert "content" not in response.json()[0]
+
+def test_get_book_content(client: TestClient, auth_headers, test_book):
+    """Test fetching the content of a book on its own"""
+    response = client.get(f"/api/v1/books/{test_book.id}/content", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": str(test_book.id), "content": test_book.content}
+
+def test_get_nonexistent_book_content(client: TestClient, auth_headers):
+    """Test fetching the content of a book that doesn't exist"""
+    response = client.get(f"/api/v1/books/{uuid4()}/content", headers=auth_headers)
+    assert response.status_code == 404
+
+def test_create_books_bulk(client: TestClient, auth_headers):
+    """Test creating many books with per-item results"""
+    response = client.post("/api/v1/books/bulk", json=[
+        {"title": "Bulk Book 1", "content": "Content 1"},
+        {"content": "Missing title"},
+        {"title": "Bulk Book 2", "content": "Content 2", "published": True}
+    ], headers=auth_headers)
+    assert response.status_code == 200
+    
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == [201, 422, 201]
+    assert "title" in results[1]["detail"]
+    
+    created = client.get(f"/api/v1/books/{results[2]['id']}", headers=auth_headers).json()
+    assert created["title"] == "Bulk Book 2"
+    assert created["published"] is True
+
+def test_create_books_bulk_as_reader(client: TestClient, reader_headers):
+    """Test bulk creation as a reader (should fail)"""
+    response = client.post(
+        "/api/v1/books/bulk",
+        json=[{"title": "Reader's Book", "content": "Content"}],
+        headers=reader_headers
+    )
+    assert response.status_code == 403
+
+def test_create_books_bulk_too_large(client: TestClient, auth_headers, monkeypatch):
+    """Test that batches above the configured size are rejected"""
+    from core.config import settings
+    monkeypatch.setattr(settings, "BULK_MAX_BATCH_SIZE", 1)
+    
+    response = client.post("/api/v1/books/bulk", json=[
+        {"title": "Book 1", "content": "Content"},
+        {"title": "Book 2", "content": "Content"}
+    ], headers=auth_headers)
+    assert response.status_code == 413
+
+def test_update_books_bulk(client: TestClient, db_session: Session, auth_headers, test_book, test_reader):
+    """Test updating many books with per-item results"""
+    others_book = books.create(db_session, {
+        "title": "Someone Else's Book",
+        "content": "Content",
+        "author_id": test_reader.id
+    })
+    
+    response = client.patch("/api/v1/books/bulk", json=[
+        {"id": str(test_book.id), "title": "Bulk Updated"},
+        {"id": str(uuid4()), "title": "Missing"},
+        {"id": str(others_book.id), "title": "Not mine"},
+        {"id": "not-a-uuid"}
+    ], headers=auth_headers)
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == [200, 404, 403, 422]
+    
+    response = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers)
+    assert response.json()["title"] == "Bulk Updated"
+    response = client.get(f"/api/v1/books/{others_book.id}", headers=auth_headers)
+    assert response.json()["title"] == "Someone Else's Book"
+
+def test_delete_books_bulk(client: TestClient, auth_headers, test_book):
+    """Test deleting many books with per-item results"""
+    missing_id = str(uuid4())
+    response = client.request(
+        "DELETE",
+        "/api/v1/books/bulk",
+        json=[str(test_book.id), missing_id],
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()["results"]] == [200, 404]
+    
+    response = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_get_book_etag(client: TestClient, auth_headers, test_book):
+    response = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert response.json()["version"] == 1
+    
+    response = client.get(
+        f"/api/v1/books/{test_book.id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    
+    # A different ETag gets the full book
+    response = client.get(
+        f"/api/v1/books/{test_book.id}", headers={**auth_headers, "If-None-Match": '"stale"'}
+    )
+    assert response.status_code == 200
+
+
+def test_get_book_etag_changes_on_update(client: TestClient, auth_headers, test_book):
+    etag = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers).headers["ETag"]
+    client.put(f"/api/v1/books/{test_book.id}", json={"title": "New title"}, headers=auth_headers)
+    
+    response = client.get(
+        f"/api/v1/books/{test_book.id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+    assert response.headers["ETag"] != etag
+
+
+def test_get_book_etag_after_delete(client: TestClient, auth_headers, test_book):
+    etag = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers).headers["ETag"]
+    client.delete(f"/api/v1/books/{test_book.id}", headers=auth_headers)
+    
+    response = client.get(
+        f"/api/v1/books/{test_book.id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_get_books_etag(client: TestClient, auth_headers, test_book, view):
+    url = f"/api/v1/books?limit=1000&view={view}"
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    
+    # Updating any book of the page changes the page ETag
+    client.put(f"/api/v1/books/{test_book.id}", json={"title": "Changed"}, headers=auth_headers)
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    
+    # So does removing one
+    client.delete(f"/api/v1/books/{test_book.id}", headers=auth_headers)
+    response = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_bulk_update_bumps_version(client: TestClient, auth_headers, test_book):
+    etag = client.get(f"/api/v1/books/{test_book.id}", headers=auth_headers).headers["ETag"]
+    client.patch(
+        "/api/v1/books/bulk", json=[{"id": str(test_book.id), "published": True}],
+        headers=auth_headers,
+    )
+    response = client.get(
+        f"/api/v1/books/{test_book.id}", headers={**auth_headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == 2
+
+
+def test_get_books_filters(client: TestClient, db_session: Session, auth_headers, test_book, test_reader):
+    """Test filtering the book list by author, publication and title prefix"""
+    published = books.create(db_session, {
+        "title": "Filtered Published", "content": "Content",
+        "published": True, "author_id": test_book.author_id
+    })
+    other = books.create(db_session, {
+        "title": "Filtered Other", "content": "Content", "author_id": test_reader.id
+    })
+    
+    def ids(**params):
+        response = client.get("/api/v1/books", params={"limit": 1000, **params}, headers=auth_headers)
+        assert response.status_code == 200
+        return {book["id"] for book in response.json()}
+    
+    by_author = ids(author_id=str(test_book.author_id))
+    assert {str(test_book.id), str(published.id)} <= by_author
+    assert str(other.id) not in by_author
+    assert ids(title_prefix="Filtered ") == {str(published.id), str(other.id)}
+    assert ids(title_prefix="Filtered ", published="true") == {str(published.id)}
+    assert ids(title_prefix="filtered ") == set()
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_get_books_sorted_cursor_pagination(client: TestClient, db_session: Session, auth_headers, test_book, view):
+    """Test walking a sorted book list page by page"""
+    prefix = f"Sorted {view} "
+    for letter in "CAB":
+        books.create(db_session, {"title": prefix + letter, "content": "Content", "author_id": test_book.author_id})
+    
+    for sort, expected in (("title", "ABC"), ("-title", "CBA")):
+        params = {"limit": 1, "title_prefix": prefix, "sort": sort, "view": view}
+        response = client.get("/api/v1/books", params=params, headers=auth_headers)
+        titles = [book["title"] for book in response.json()]
+        while "X-Next-Cursor" in response.headers:
+            response = client.get(
+                "/api/v1/books",
+                params={**params, "cursor": response.headers["X-Next-Cursor"]},
+                headers=auth_headers
+            )
+            assert response.status_code == 200
+            titles.extend(book["title"] for book in response.json())
+        assert titles == [prefix + letter for letter in expected]
+
+def test_get_books_sorted_by_update(client: TestClient, auth_headers, test_book):
+    """Test that the last updated book comes first with sort=-updated_at"""
+    client.put(f"/api/v1/books/{test_book.id}", json={"title": "Just Updated"}, headers=auth_headers)
+    response = client.get("/api/v1/books?sort=-updated_at&limit=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == str(test_book.id)
+    
+    # Cursors of one sort key are rejected by another
+    cursor = response.headers.get("X-Next-Cursor")
+    if cursor:
+        response = client.get(f"/api/v1/books?sort=id&cursor={cursor}", headers=auth_headers)
+        assert response.status_code == 400
+
+@pytest.mark.parametrize("params", [{"sort": "content"}, {"title_prefix": ""}, {"author_id": "nope"}])
+def test_get_books_invalid_filters(client: TestClient, auth_headers, params):
+    response = client.get("/api/v1/books", params=params, headers=auth_headers)
+    assert response.status_code == 422
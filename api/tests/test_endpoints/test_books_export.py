@@ -0,0 +1,122 @@
+import csv
+import io
+import json
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from db.crud.books import async_books, books
+from db.crud.users import users
+from db.database import get_async_engine
+from db.models import AccountType, Books, Users
+from v1.serialization import ndjson_lines
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_export@test.com"
+    
+    # Check if user already exists
+    existing_user = users.get_by_email(db_session, email)
+    if existing_user:
+        return existing_user
+    
+    return users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Export",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+@pytest.fixture
+def export_books(db_session: Session, test_author: Users):
+    """Three books of the export author, removed afterwards"""
+    created = books.create_books(db_session, [
+        {"title": f"Export {i}", "content": f"Line one, \"quoted\"\nline {i}"} for i in range(3)
+    ], test_author)
+    yield created
+    books.delete_many(db_session, [book.id for book in created])
+
+
+def test_export_ndjson(client: TestClient, auth_headers, test_author, export_books):
+    response = client.get(
+        "/api/v1/books/export", params={"author_id": str(test_author.id)}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="books.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["id"] for row in rows) == sorted(str(book.id) for book in export_books)
+    assert rows[0]["content"].startswith("Line one")
+    assert rows[0]["author_id"] == str(test_author.id)
+    assert rows[0]["version"] == 1
+
+
+def test_export_csv(client: TestClient, auth_headers, test_author, export_books):
+    response = client.get(
+        "/api/v1/books/export",
+        params={"format": "csv", "author_id": str(test_author.id)},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3
+    assert {row["title"] for row in rows} == {"Export 0", "Export 1", "Export 2"}
+    # Quotes and newlines in the content survive the round trip
+    assert rows[0]["content"].startswith('Line one, "quoted"\nline')
+
+
+def test_export_all_authors(client: TestClient, auth_headers, export_books):
+    response = client.get("/api/v1/books/export", headers=auth_headers)
+    assert response.status_code == 200
+    ids = {json.loads(line)["id"] for line in response.text.splitlines()}
+    assert {str(book.id) for book in export_books} <= ids
+
+
+def test_export_invalid_format(client: TestClient, auth_headers):
+    response = client.get("/api/v1/books/export", params={"format": "xml"}, headers=auth_headers)
+    assert response.status_code == 422
+
+
+def test_export_requires_auth(client: TestClient):
+    assert client.get("/api/v1/books/export").status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_export_memory_is_bounded(db_session: Session, test_author: Users):
+    """
+    Export 20k books of 1 KB each (~20 MB of NDJSON) and check that the
+    peak of memory allocated meanwhile stays a small fraction of the output
+    """
+    count, content = 20_000, "x" * 1024
+    books.create_books(db_session, [
+        {"title": f"Bulk {i}", "content": content} for i in range(count)
+    ], test_author)
+    try:
+        async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
+            exported, size = 0, 0
+            tracemalloc.start()
+            try:
+                async for partition in async_books.stream_export(
+                    session, test_author.id, batch_size=500
+                ):
+                    exported += len(partition)
+                    size += len(ndjson_lines(partition))
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        assert exported == count
+        assert size > 20 * 1024 * 1024
+        assert peak < 5 * 1024 * 1024
+    finally:
+        ids = db_session.exec(
+            select(Books.id).where(Books.author_id == test_author.id)
+        ).all()
+        books.delete_many(db_session, list(ids))
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from core.config import settings
+from db.crud.books import books
+from db.crud.users import users
+from db.models import AccountType, Books, Users
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_import@test.com"
+    
+    # Check if user already exists
+    existing_user = users.get_by_email(db_session, email)
+    if existing_user:
+        return existing_user
+    
+    return users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Import",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+@pytest.fixture
+def author_books(db_session: Session, test_author: Users):
+    """Titles of the author's books, all of them are removed afterwards"""
+    def titles():
+        db_session.expire_all()
+        return sorted(db_session.exec(
+            select(Books.title).where(Books.author_id == test_author.id)
+        ).all())
+    yield titles
+    ids = db_session.exec(select(Books.id).where(Books.author_id == test_author.id)).all()
+    books.delete_many(db_session, list(ids))
+
+
+def test_import_ndjson(client: TestClient, auth_headers, author_books, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 2)
+    body = "\n".join([
+        json.dumps({"title": "One", "content": "1"}),
+        json.dumps({"title": "Two", "content": "2", "published": True}),
+        json.dumps({"title": "No content"}),
+        "{broken",
+        json.dumps({"title": "Three", "content": "3"}),
+    ])
+    response = client.post(
+        "/api/v1/books/import", content=body.encode(),
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 3
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [3, 4]
+    assert "content" in result["errors"][0]["detail"]
+    assert author_books() == ["One", "Three", "Two"]
+
+
+def test_import_csv(client: TestClient, auth_headers, author_books):
+    body = 'title,content,published\nA,"multi\nline",true\nB,b,\n,missing title,false\n'
+    response = client.post(
+        "/api/v1/books/import", params={"format": "csv"}, content=body.encode(),
+        headers={**auth_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 1)
+    assert result["errors"][0]["line"] == 5
+    assert author_books() == ["A", "B"]
+
+
+def test_import_export_round_trip(client: TestClient, auth_headers, test_author, author_books):
+    client.post(
+        "/api/v1/books/import",
+        content=b'{"title": "Original", "content": "Text, with \\"quotes\\"\\n"}',
+        headers=auth_headers,
+    )
+    exported = client.get(
+        "/api/v1/books/export",
+        params={"format": "csv", "author_id": str(test_author.id)},
+        headers=auth_headers,
+    )
+    response = client.post(
+        "/api/v1/books/import", params={"format": "csv"}, content=exported.content,
+        headers=auth_headers,
+    )
+    assert response.json() == {"created": 1, "failed": 0, "errors": []}
+    assert author_books() == ["Original", "Original"]
+
+
+def test_import_caps_reported_errors(client: TestClient, auth_headers, author_books, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_ERRORS", 2)
+    response = client.post(
+        "/api/v1/books/import", content=b"x\n" * 5, headers=auth_headers
+    )
+    result = response.json()
+    assert result["failed"] == 5
+    assert len(result["errors"]) == 2
+
+
+def test_import_as_reader(client: TestClient, reader_headers):
+    response = client.post(
+        "/api/v1/books/import", content=b'{"title": "A", "content": "a"}', headers=reader_headers
+    )
+    assert response.status_code == 403
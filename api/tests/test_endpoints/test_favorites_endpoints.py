@@ -0,0 +1,145 @@
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from db.crud.books import book_cache, books
+from db.crud.favorites import favorites
+from db.crud.users import users
+from db.models import AccountType, Books, Users
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_favorites_endpoint@test.com"
+    
+    # Check if user already exists
+    existing_user = users.get_by_email(db_session, email)
+    if existing_user:
+        return existing_user
+    
+    return users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Test",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR
+    })
+
+
+@pytest.fixture
+def test_books(db_session: Session, test_author: Users):
+    created = books.create_books(db_session, [
+        {"title": f"Favorite endpoint {i}", "content": "Content"} for i in range(3)
+    ], test_author)
+    yield created
+    for book in created:
+        favorites.remove(db_session, test_author.id, book.id)
+    books.delete_many(db_session, [book.id for book in created])
+
+
+def test_favorite_flow(client: TestClient, auth_headers, test_books):
+    book_id = str(test_books[0].id)
+    
+    response = client.put(f"/api/v1/favorites/{book_id}", headers=auth_headers)
+    assert response.status_code == 204
+    # Idempotent
+    assert client.put(f"/api/v1/favorites/{book_id}", headers=auth_headers).status_code == 204
+    
+    response = client.get("/api/v1/favorites", headers=auth_headers)
+    assert response.status_code == 200
+    assert [book["id"] for book in response.json()] == [book_id]
+    
+    response = client.get(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert response.json()["favorites_count"] == 1
+    
+    assert client.delete(f"/api/v1/favorites/{book_id}", headers=auth_headers).status_code == 204
+    assert client.delete(f"/api/v1/favorites/{book_id}", headers=auth_headers).status_code == 204
+    assert client.get("/api/v1/favorites", headers=auth_headers).json() == []
+    
+    response = client.get(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert response.json()["favorites_count"] == 0
+
+
+def test_favorite_nonexistent_book(client: TestClient, auth_headers):
+    response = client.put(f"/api/v1/favorites/{uuid4()}", headers=auth_headers)
+    assert response.status_code == 404
+
+
+def test_favorite_deleted_book_still_cached(
+    client: TestClient, auth_headers, db_session: Session, test_author: Users
+):
+    book = books.create_book(
+        db_session, {"title": "Soon deleted", "content": "Content"}, test_author
+    )
+    stale = Books(**book.model_dump())
+    books.delete(db_session, book.id)
+    # Deleted by another worker, still cached here
+    book_cache.backend.set(book.id, stale)
+    
+    response = client.put(f"/api/v1/favorites/{book.id}", headers=auth_headers)
+    assert response.status_code == 404
+    assert favorites.get_favorited(db_session, test_author.id, [book.id]) == set()
+    book_cache.invalidate(book.id)
+
+
+def test_favorites_require_auth(client: TestClient, test_books):
+    assert client.get("/api/v1/favorites").status_code == 401
+    assert client.put(f"/api/v1/favorites/{test_books[0].id}").status_code == 401
+
+
+@pytest.mark.parametrize("view", ["full", "summary"])
+def test_get_books_favorited_flags(client: TestClient, auth_headers, test_books, view):
+    client.put(f"/api/v1/favorites/{test_books[1].id}", headers=auth_headers)
+    
+    response = client.get("/api/v1/books", params={"view": view}, headers=auth_headers)
+    assert response.status_code == 200
+    flags = {book["id"]: book["favorited"] for book in response.json()}
+    assert flags[str(test_books[1].id)] is True
+    assert flags[str(test_books[0].id)] is False
+    assert flags[str(test_books[2].id)] is False
+
+
+def test_get_books_favorited_flags_single_query(client: TestClient, auth_headers, test_books):
+    for book in test_books:
+        client.put(f"/api/v1/favorites/{book.id}", headers=auth_headers)
+    # Warm up the user cache of the authenticated user
+    client.get("/api/v1/users/me", headers=auth_headers)
+    
+    counts = {
+        limit: client.get(
+            "/api/v1/books", params={"limit": limit}, headers=auth_headers
+        ).headers["X-Query-Count"]
+        for limit in (1, 3, 100)
+    }
+    # The page and the flags of all of its books
+    assert set(counts.values()) == {"2"}
+
+
+def test_favoriting_changes_page_etag(client: TestClient, auth_headers, test_books):
+    response = client.get("/api/v1/books", headers=auth_headers)
+    etag = response.headers["ETag"]
+    
+    client.put(f"/api/v1/favorites/{test_books[0].id}", headers=auth_headers)
+    
+    response = client.get("/api/v1/books", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_other_users_favorites_keep_etags(
+    client: TestClient, auth_headers, reader_headers, test_books
+):
+    book_id = test_books[0].id
+    page_etag = client.get("/api/v1/books", headers=auth_headers).headers["ETag"]
+    book_etag = client.get(f"/api/v1/books/{book_id}", headers=auth_headers).headers["ETag"]
+    
+    client.put(f"/api/v1/favorites/{book_id}", headers=reader_headers)
+    
+    response = client.get("/api/v1/books", headers={**auth_headers, "If-None-Match": page_etag})
+    assert response.status_code == 304
+    response = client.get(f"/api/v1/books/{book_id}", headers=auth_headers)
+    assert response.headers["ETag"] == book_etag
+    assert response.json()["favorites_count"] == 1
+    client.delete(f"/api/v1/favorites/{book_id}", headers=reader_headers)
@@ -0,0 +1,108 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel
+
+from core.config import settings
+from db import database
+from db.crud.books import book_cache, books
+from db.crud.users import users
+from db.database import ReadSession, replica_health
+from db.models import AccountType, Books, Users
+
+
+@pytest.fixture
+def test_author(db_session: Session) -> Users:
+    """Create a test author"""
+    email = "author_read_replica@test.com"
+    return users.get_by_email(db_session, email) or users.create(db_session, {
+        "email": email,
+        "password": "password123",
+        "first_name": "Replica",
+        "last_name": "Author",
+        "account_type": AccountType.AUTHOR,
+    })
+
+
+@pytest.fixture
+def use_replica(monkeypatch):
+    """Point READ_DATABASE_URL at `url` with fresh replica engines"""
+    def configure(url: str) -> None:
+        monkeypatch.setattr(settings, "READ_DATABASE_URL", url)
+        monkeypatch.setattr(database, "read_engine", None)
+        monkeypatch.setattr(database, "async_read_engine", None)
+        monkeypatch.setattr(replica_health, "_retry_at", 0.0)
+    
+    yield configure
+    for db_engine in (database.read_engine, database.async_read_engine):
+        if db_engine is not None:
+            getattr(db_engine, "sync_engine", db_engine).dispose()
+
+
+@pytest.fixture
+def replica_engine(tmp_path, use_replica):
+    """A second SQLite database standing in for the replica"""
+    url = f"sqlite:///{tmp_path}/replica.db"
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    use_replica(url)
+    yield engine
+    engine.dispose()
+
+
+def test_get_endpoints_read_from_replica(
+    client: TestClient, auth_headers, db_session: Session, test_author: Users, replica_engine
+):
+    primary_book = books.create(db_session, {
+        "title": "Primary only", "content": "Content", "author_id": test_author.id
+    })
+    with Session(replica_engine) as replica:
+        replica_book = Books(title="Replica only", content="Content", author_id=test_author.id)
+        replica.add(replica_book)
+        replica.commit()
+        replica.refresh(replica_book)
+    
+    response = client.get(f"/api/v1/books/{replica_book.id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Replica only"
+    # A lagging replica must not refill the cache after a write invalidated it
+    assert book_cache.backend.get(replica_book.id) is None
+    assert client.get(f"/api/v1/books/{primary_book.id}", headers=auth_headers).status_code == 404
+    
+    # Writes still go to the primary
+    response = client.put(
+        f"/api/v1/books/{primary_book.id}", json={"title": "Updated"}, headers=auth_headers
+    )
+    assert response.status_code == 200
+
+
+def test_unreachable_replica_falls_back_to_primary(
+    client: TestClient, auth_headers, db_session: Session, test_author: Users, tmp_path, use_replica
+):
+    book = books.create(db_session, {
+        "title": "Fallback", "content": "Content", "author_id": test_author.id
+    })
+    use_replica(f"sqlite:///{tmp_path}/missing/directory/replica.db")
+    
+    response = client.get(f"/api/v1/books/{book.id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["title"] == "Fallback"
+    assert not replica_health.healthy
+
+
+def test_read_session_reads_its_own_writes(db_session: Session, test_author: Users, replica_engine):
+    primary_book = books.create(db_session, {
+        "title": "Primary only", "content": "Content", "author_id": test_author.id
+    })
+    with ReadSession(replica_engine, info={"primary": db_session.get_bind()}) as session:
+        assert session.get(Books, primary_book.id) is None
+        
+        book = Books(title="Written", content="Content", author_id=test_author.id)
+        session.add(book)
+        session.commit()
+        # Sent to the primary after the write, the replica has no such book
+        assert session.get(Books, book.id) is not None
+    
+    with Session(replica_engine) as replica:
+        assert replica.get(Books, book.id) is None
+    assert books.get(db_session, book.id) is not None
@@ -111,4 +111,17 @@ def test_get_user_books_pagination(client: TestClient, auth_headers, test_author
     response = client.get("/api/v1/books/user?limit=1", headers=auth_headers)
     assert response.status_code == 200
     assert isinstance(response.json(), list)
-    assert len(response.json()) == 1  # Should return exactly 1 book 
\ No newline at end of file
+    assert len(response.json()) == 1  # Should return exactly 1 book 
+
+def test_get_user_books_summary_view(client: TestClient, auth_headers, test_author, test_books):
+    """Test getting the current user's books without their content"""
+    response = client.get("/api/v1/books/user?view=summary", headers=auth_headers)
+    assert response.status_code == 200
+    
+    books_list = response.json()
+    book_ids = [book["id"] for book in books_list]
+    for test_book in test_books:
+        assert str(test_book.id) in book_ids
+    for book in books_list:
+        assert "content" not in book
+        assert book["author_id"] == str(test_author.id)
@@ -128,4 +128,112 @@ def test_get_user_unauthenticated(client: TestClient, test_author):
     response = client.get(
         f"/api/v1/users/{test_author.id}"
     )
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+@pytest.fixture
+def author_books(db_session: Session, test_author: Users):
+    """Make sure the test author has three books"""
+    from db.crud.books import books
+    
+    existing = books.get_books_by_author(db_session, test_author.id)
+    for i in range(len(existing), 3):
+        books.create(db_session, {
+            "title": f"Users Endpoint Book {i}",
+            "content": "Content",
+            "author_id": test_author.id
+        })
+    return books.get_books_by_author(db_session, test_author.id)
+
+
+def test_get_user_with_books(client: TestClient, auth_headers, test_author, author_books):
+    """Test that an author comes with a paginated list of book summaries"""
+    response = client.get(
+        f"/api/v1/users/{test_author.id}?books_limit=2", headers=auth_headers
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert "password" not in body
+    assert len(body["books"]) == 2
+    assert all("content" not in book for book in body["books"])
+    assert body["books_next_cursor"]
+    
+    response = client.get(
+        f"/api/v1/users/{test_author.id}",
+        params={"books_limit": 2, "books_cursor": body["books_next_cursor"]},
+        headers=auth_headers
+    )
+    ids = [book["id"] for book in body["books"] + response.json()["books"]]
+    assert ids == [str(book.id) for book in author_books]
+
+
+def test_get_user_invalid_books_cursor(client: TestClient, auth_headers, test_author):
+    """Test that a malformed books cursor is rejected"""
+    response = client.get(
+        f"/api/v1/users/{test_author.id}?books_cursor=nope!", headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def test_get_user_query_count(
+    client: TestClient, auth_headers, test_author, test_reader, author_books
+):
+    """Test the number of SQL statements issued by GET /users/{user_id}"""
+    # Warm up the user cache of the authenticated user
+    client.get("/api/v1/users/me", headers=auth_headers)
+    
+    response = client.get(f"/api/v1/users/{test_author.id}", headers=auth_headers)
+    # The user and one page of their books
+    assert response.headers["X-Query-Count"] == "2"
+    
+    response = client.get(f"/api/v1/users/{test_reader.id}", headers=auth_headers)
+    # Readers have no books to load
+    assert response.headers["X-Query-Count"] == "1"
+
+
+def test_get_users_with_books_query_count(
+    client: TestClient, auth_headers, test_author, author_books
+):
+    """Test that books of a whole page of users are loaded with one query"""
+    client.get("/api/v1/users/me", headers=auth_headers)
+    
+    response = client.get("/api/v1/users/all?include_books=true", headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) > 1
+    # The page of users and one SELECT ... IN for all of their books
+    assert response.headers["X-Query-Count"] == "2"
+    
+    author = next(user for user in response.json() if user["id"] == str(test_author.id))
+    assert {book["id"] for book in author["books"]} == {str(book.id) for book in author_books}
+
+
+def test_get_user_stats(client: TestClient, auth_headers, test_author, author_books, test_reader):
+    """Test that authors come with their book counts, readers without"""
+    response = client.get(f"/api/v1/users/{test_author.id}", headers=auth_headers)
+    stats = response.json()["stats"]
+    assert stats["book_count"] == len(author_books)
+    assert stats["published_count"] == sum(book.published for book in author_books)
+    assert stats["last_updated"]
+    
+    response = client.get(f"/api/v1/users/{test_reader.id}", headers=auth_headers)
+    assert response.json()["stats"] is None
+
+
+@pytest.mark.parametrize("by, key", [("books", "book_count"), ("published", "published_count")])
+def test_get_authors_leaderboard(
+    client: TestClient, auth_headers, test_author, author_books, by, key
+):
+    response = client.get(
+        "/api/v1/users/leaderboard", params={"by": by, "limit": 100}, headers=auth_headers
+    )
+    assert response.status_code == 200
+    ranking = response.json()
+    counts = [entry[key] for entry in ranking]
+    assert counts == sorted(counts, reverse=True)
+    entry = next(entry for entry in ranking if entry["author_id"] == str(test_author.id))
+    assert entry["first_name"] == test_author.first_name
+    assert entry["book_count"] == len(author_books)
+
+
+def test_get_authors_leaderboard_invalid_key(client: TestClient, auth_headers):
+    response = client.get("/api/v1/users/leaderboard?by=title", headers=auth_headers)
+    assert response.status_code == 422
@@ -112,4 +112,29 @@ async def test_get_current_user_malformed_uuid(db_session):
         await get_current_user(db_session, token)
     
     assert exc_info.value.status_code == 401
-    assert exc_info.value.detail == "Could not validate credentials" 
\ No newline at end of file
+    assert exc_info.value.detail == "Could not validate credentials" 
+
+@pytest.mark.asyncio
+async def test_get_current_user_uses_cache(db_session, auth_test_user, valid_token):
+    """Test that repeated lookups are served from the user cache"""
+    from db.crud.users import user_cache
+    
+    user_cache.clear()
+    await get_current_user(db_session, valid_token)
+    hits = user_cache.hits
+    
+    user = await get_current_user(db_session, valid_token)
+    assert user.id == auth_test_user.id
+    assert user_cache.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_user_cache_invalidated_on_update(db_session, auth_test_user, valid_token):
+    """Test that updating a user evicts the cached copy"""
+    from db.crud.base import CRUDBase
+    
+    await get_current_user(db_session, valid_token)
+    CRUDBase(Users).update(db_session, auth_test_user.id, {"last_name": "Renamed"})
+    
+    user = await get_current_user(db_session, valid_token)
+    assert user.last_name == "Renamed"
@@ -0,0 +1,83 @@
+import json
+import tracemalloc
+
+import pytest
+
+from v1.imports import iter_lines, parse_csv, parse_ndjson
+
+
+async def chunked(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [1, 3, 1024])
+async def test_iter_lines_across_chunks(size):
+    lines = await collect(iter_lines(chunked(b"one\r\ntwo\n\nthree", size), 100))
+    assert lines == [(1, b"one"), (2, b"two"), (3, b""), (4, b"three")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [2, 1024])
+async def test_iter_lines_skips_long_lines(size):
+    data = b"ok\n" + b"x" * 50 + b"\nfine\n"
+    lines = await collect(iter_lines(chunked(data, size), 10))
+    assert lines == [(1, b"ok"), (2, None), (3, b"fine")]
+
+
+@pytest.mark.asyncio
+async def test_parse_ndjson():
+    data = b'{"title": "A"}\n\nnot json\n[1]\n' + b"\xff\n" + b'{"title": "B"}'
+    rows = await collect(parse_ndjson(iter_lines(chunked(data, 4), 100), 100))
+    assert [(line, row) for line, row, error in rows if error is None] == [
+        (1, {"title": "A"}), (6, {"title": "B"})
+    ]
+    errors = {line: error for line, _, error in rows if error}
+    assert errors[3].startswith("Invalid JSON")
+    assert errors[4] == "Expected a JSON object"
+    assert errors[5] == "Line is not valid UTF-8"
+
+
+@pytest.mark.asyncio
+async def test_parse_csv_multiline_records():
+    data = (
+        b'title,content,published\n'
+        b'A,"first\nsecond ""quoted""",true\n'
+        b'B,plain,\n'
+        b'C,too,many,fields\n'
+        b'D,"unterminated\n'
+    )
+    rows = await collect(parse_csv(iter_lines(chunked(data, 5), 1000), 1000))
+    assert rows == [
+        (2, {"title": "A", "content": 'first\nsecond "quoted"', "published": "true"}, None),
+        (4, {"title": "B", "content": "plain"}, None),
+        (5, None, "Expected 3 fields, got 4"),
+        (6, None, "Unterminated quoted field"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_parse_memory_is_bounded():
+    """Parse ~20 MB of NDJSON generated on the fly, the peak stays far below it"""
+    line = (json.dumps({"title": "Book", "content": "x" * 1024}) + "\n").encode()
+
+    async def body():
+        for _ in range(20_000):
+            yield line * 4
+
+    tracemalloc.start()
+    try:
+        count = 0
+        async for _, row, error in parse_ndjson(iter_lines(body(), 4096), 4096):
+            assert error is None
+            count += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert count == 80_000
+    assert peak < 1024 * 1024
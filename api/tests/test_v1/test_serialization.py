@@ -0,0 +1,56 @@
+import json
+from uuid import uuid4
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from db.models import Books, BookSummary, FavoritedBook, FavoritedBookSummary
+from v1.pagination import NEXT_CURSOR_HEADER
+from v1.serialization import json_list
+
+
+def make_books(count: int):
+    author_id = uuid4()
+    return [
+        Books(title=f"Book {i}", content="Content", published=bool(i % 2), author_id=author_id)
+        for i in range(count)
+    ]
+
+
+def test_json_list_matches_the_response_model_output():
+    rows = make_books(3)
+    response = json_list(Response(), rows, Books)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == jsonable_encoder(rows)
+
+
+def test_json_list_summaries():
+    rows = [BookSummary.model_validate(book, from_attributes=True) for book in make_books(2)]
+    body = json.loads(json_list(Response(), rows, BookSummary).body)
+    assert body == jsonable_encoder(rows)
+    assert "content" not in body[0]
+
+
+def test_json_list_favorited_flags():
+    rows = make_books(3)
+    summaries = [BookSummary.model_validate(book, from_attributes=True) for book in rows]
+    favorited = {rows[1].id}
+    for page, model in ((rows, FavoritedBook), (summaries, FavoritedBookSummary)):
+        body = json.loads(json_list(Response(), page, type(page[0]), favorited).body)
+        # Same as serializing copies of the rows into the response model
+        assert body == jsonable_encoder([
+            model.model_validate(
+                row, from_attributes=True, update={"favorited": row.id in favorited}
+            )
+            for row in page
+        ])
+        assert [book["favorited"] for book in body] == [False, True, False]
+
+
+def test_json_list_keeps_headers():
+    response = Response()
+    response.headers[NEXT_CURSOR_HEADER] = "abc"
+    result = json_list(response, [], Books)
+    assert result.body == b"[]"
+    assert result.headers[NEXT_CURSOR_HEADER] == "abc"
+    assert result.headers["content-length"] == "2"
@@ -1,20 +1,19 @@
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlmodel import Session
+from jose import JWTError
 from uuid import UUID
 
-from core.security import SECRET_KEY, ALGORITHM
-from db.database import get_session
-from db.crud.users import users
+from core.security import verify_token
+from db.database import DBSession, get_db
+from db.crud.users import async_users as users
 from db.models import Users
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
 async def get_current_user(
-    db: Session = Depends(get_session),
+    db: DBSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> Users:
     credentials_exception = HTTPException(
@@ -24,7 +23,7 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -32,7 +31,7 @@ async def get_current_user(
         raise credentials_exception
         
     try:
-        user = users.get(db, UUID(user_id))
+        user = await users.get_cached(db, UUID(user_id))
         if user is None:
             raise credentials_exception
         return user
@@ -1,28 +1,26 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
-from jose import JWTError, jwt
+from jose import JWTError
 from uuid import UUID
 
 from core.security import (
     create_access_token, 
     create_token_pair,
     ACCESS_TOKEN_EXPIRE_MINUTES,
-    SECRET_KEY,
-    ALGORITHM
+    verify_token
 )
-from db.crud.users import users
-from db.database import get_session
+from db.crud.users import async_users as users
+from db.database import DBSession, get_db
 from db.models import Users, AccountType
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register")
-def register(
+async def register(
     *,
-    db: Session = Depends(get_session),
+    db: DBSession = Depends(get_db),
     email: str,
     password: str,
     first_name: str,
@@ -31,7 +29,7 @@ def register(
 ) -> Users:
     """Register a new user"""
     # Check if user exists
-    if users.get_by_email(db, email):
+    if await users.get_by_email(db, email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
@@ -52,12 +50,12 @@ def register(
 
 
 @router.post("/login")
-def login(
-    db: Session = Depends(get_session),
+async def login(
+    db: DBSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> dict:
     """Login to get access token and refresh token"""
-    user = users.authenticate(db, form_data.username, form_data.password)
+    user = await users.authenticate(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -77,8 +75,8 @@ def login(
 
 
 @router.post("/refresh")
-def refresh_token(
-    db: Session = Depends(get_session),
+async def refresh_token(
+    db: DBSession = Depends(get_db),
     refresh_token: str = Body(..., embed=True)
 ) -> dict:
     """Get a new access token using a refresh token"""
@@ -90,7 +88,7 @@ def refresh_token(
     
     try:
         # Decode the refresh token
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_token(refresh_token)
         
         # Check if it's a refresh token
         if payload.get("token_type") != "refresh":
@@ -102,7 +100,7 @@ def refresh_token(
             raise credentials_exception
             
         # Check if the user exists
-        user = users.get(db, UUID(user_id))
+        user = await users.get_cached(db, UUID(user_id))
         if user is None:
             raise credentials_exception
             
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends, Query, Response
+
+from core.config import settings
+from db.crud.autocomplete import async_autocomplete as autocomplete
+from db.database import DBSession, get_read_session
+from db.models import AutocompleteResult, Users
+from v1.dependencies import get_current_user
+
+router = APIRouter(prefix="/autocomplete", tags=["autocomplete"])
+
+
+@router.get("", response_model=AutocompleteResult)
+async def get_suggestions(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(5, ge=1, le=20),
+    db: DBSession = Depends(get_read_session),
+    _: Users = Depends(get_current_user),
+):
+    """
+    Book titles and author names starting with `q` (case-insensitive), at
+    most `limit` of each. Meant to be called on every keystroke: results
+    are cached per prefix, and the browser may reuse them for as long.
+    """
+    response.headers["Cache-Control"] = f"private, max-age={int(settings.AUTOCOMPLETE_CACHE_TTL_SECONDS)}"
+    return await autocomplete.suggest(db, q, limit)
@@ -1,63 +1,387 @@
-from typing import List
+from typing import List, Literal, Optional, Union
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 
-from db.crud.books import books
-from db.database import get_session
-from db.models import Books, Users, AccountType
+from core.config import settings
+from db.crud.books import EXPORT_COLUMNS, BookFilters, async_books as books
+from db.crud.favorites import async_favorites as favorites
+from db.database import DBSession, get_db, get_read_session
+from db.models import (
+    Books,
+    BookBulkUpdate,
+    BookContent,
+    BookCreate,
+    BookSummary,
+    BookUpdate,
+    BulkItemResult,
+    BulkResult,
+    FavoritedBook,
+    FavoritedBookSummary,
+    ImportLineError,
+    ImportResult,
+    Users,
+    AccountType,
+)
 from v1.dependencies import get_current_user
+from v1.etags import book_etag, page_etag, revalidate
+from v1.imports import iter_lines, parse_csv, parse_ndjson
+from v1.pagination import NEXT_CURSOR_HEADER, paginate
+from v1.serialization import csv_lines, json_list, ndjson_lines
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+# `summary` lists books without their content, see GET /books/{book_id}/content
+BookView = Literal["full", "summary"]
 
-@router.get("", response_model=List[Books])
-def get_books(
+# Keys of db.crud.books.BOOK_SORTS, a leading "-" sorts descending
+BookSort = Literal["id", "title", "-title", "updated_at", "-updated_at"]
+
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+@router.get("", response_model=Union[List[FavoritedBook], List[FavoritedBookSummary]])
+async def get_books(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_session),
-    _: Users = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    view: BookView = "full",
+    published: Optional[bool] = None,
+    author_id: Optional[UUID] = None,
+    title_prefix: Optional[str] = Query(None, min_length=1, max_length=200),
+    sort: BookSort = "id",
+    db: DBSession = Depends(get_read_session),
+    current_user: Users = Depends(get_current_user),
 ):
-    """Get all books"""
-    return books.get_multi(db, skip=skip, limit=limit)
+    """
+    Get all books, flagging those the current user favorited.
+    Filter by `published`, `author_id` and a case-sensitive `title_prefix`,
+    order by `sort`. Pass the X-Next-Cursor header of the previous page as
+    `cursor` to paginate (with the same filters and sort); `skip` is kept
+    for legacy clients only.
+    Answers 304 when If-None-Match holds the ETag of the unchanged page.
+    """
+    filters = BookFilters(published, author_id, title_prefix, sort)
+    summary = view == "summary"
+    if skip and not cursor:
+        page = await books.get_filtered(db, filters, skip=skip, limit=limit, summary=summary)
+    else:
+        page = await paginate(
+            response,
+            lambda c: books.get_filtered_page(db, filters, c, limit, summary=summary),
+            cursor,
+        )
+    # One query for the flags of the whole page. Favorites leave the version
+    # of a book alone, so the ETag covers the flags of the current user
+    favorited = await favorites.get_favorited(db, current_user.id, [row.id for row in page])
+    etag = page_etag(
+        page, view, response.headers.get(NEXT_CURSOR_HEADER),
+        ",".join(sorted(str(id) for id in favorited)),
+    )
+    not_modified = revalidate(request, response, etag)
+    if not_modified:
+        return not_modified
+    # Serialized as FavoritedBook(Summary), the flags are added on the way
+    model = BookSummary if view == "summary" else Books
+    return json_list(response, page, model, favorited)
 
 
-@router.get("/user", response_model=List[Books])
-def get_current_user_books(
+@router.get("/user", response_model=Union[List[Books], List[BookSummary]])
+async def get_current_user_books(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    view: BookView = "full",
+    db: DBSession = Depends(get_read_session),
     current_user: Users = Depends(get_current_user),
 ):
     """Get books authored by the current user (authors only)"""
     if current_user.account_type != AccountType.AUTHOR:
         return []
-    return books.get_books_by_author(
-        db, current_user.id, skip=skip, limit=limit
+    if view == "summary":
+        if skip and not cursor:
+            page = await books.get_summaries(
+                db, skip=skip, limit=limit, author_id=current_user.id
+            )
+        else:
+            page = await paginate(
+                response,
+                lambda c: books.get_summaries_page(db, c, limit, author_id=current_user.id),
+                cursor,
+            )
+        return json_list(response, page, BookSummary)
+    if skip and not cursor:
+        page = await books.get_books_by_author(
+            db, current_user.id, skip=skip, limit=limit
+        )
+    else:
+        page = await paginate(
+            response,
+            lambda c: books.get_books_by_author_page(db, current_user.id, c, limit),
+            cursor,
+        )
+    return json_list(response, page, Books)
+
+
+@router.get("/search", response_model=List[Books])
+async def search_books(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    db: DBSession = Depends(get_read_session),
+    _: Users = Depends(get_current_user),
+):
+    """Full-text search in book titles and content, best matches first"""
+    return await books.search(db, q, skip=skip, limit=limit)
+
+
+def check_batch_size(items: list) -> None:
+    if len(items) > settings.BULK_MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_MAX_BATCH_SIZE} items per request",
+        )
+
+
+def validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors()
+    )
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def create_books_bulk(
+    *,
+    db: DBSession = Depends(get_db),
+    books_in: List[dict] = Body(...),
+    current_user: Users = Depends(get_current_user),
+):
+    """Create many books in one transaction (authors only)"""
+    if current_user.account_type != AccountType.AUTHOR:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only authors can create books",
+        )
+    check_batch_size(books_in)
+
+    results = []
+    valid = []
+    for index, book_in in enumerate(books_in):
+        try:
+            valid.append((index, BookCreate.model_validate(book_in).model_dump()))
+        except ValidationError as e:
+            results.append(BulkItemResult(
+                index=index,
+                status=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=validation_detail(e),
+            ))
+
+    created = await books.create_books(db, [book for _, book in valid], current_user)
+    results.extend(
+        BulkItemResult(index=index, status=status.HTTP_201_CREATED, id=book.id)
+        for (index, _), book in zip(valid, created)
+    )
+    return BulkResult(results=sorted(results, key=lambda result: result.index))
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_books(
+    *,
+    request: Request,
+    format: ExportFormat = "ndjson",
+    db: DBSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user),
+):
+    """
+    Create books of the current author (authors only) from an NDJSON or CSV
+    request body, e.g. the output of GET /books/export.
+    The body is parsed while it is received and valid rows are inserted
+    IMPORT_BATCH_SIZE at a time, each batch in its own transaction, so a
+    failed line does not abort the import. Returns the counts of created
+    and failed rows with the reason of each failed line.
+    """
+    if current_user.account_type != AccountType.AUTHOR:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only authors can create books",
+        )
+
+    max_bytes = settings.IMPORT_MAX_LINE_BYTES
+    parse = parse_csv if format == "csv" else parse_ndjson
+    result = ImportResult()
+    batch = []
+
+    async def flush():
+        result.created += len(await books.create_books(db, batch, current_user))
+        batch.clear()
+
+    async for line, row, error in parse(iter_lines(request.stream(), max_bytes), max_bytes):
+        if error is None:
+            try:
+                batch.append(BookCreate.model_validate(row).model_dump())
+            except ValidationError as e:
+                error = validation_detail(e)
+        if error is not None:
+            result.failed += 1
+            if len(result.errors) < settings.IMPORT_MAX_ERRORS:
+                result.errors.append(ImportLineError(line=line, detail=error))
+        if len(batch) >= settings.IMPORT_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return result
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def update_books_bulk(
+    *,
+    db: DBSession = Depends(get_db),
+    books_in: List[dict] = Body(...),
+    current_user: Users = Depends(get_current_user),
+):
+    """Update many books in one transaction (author of each book only)"""
+    check_batch_size(books_in)
+
+    results = []
+    valid = []
+    for index, book_in in enumerate(books_in):
+        try:
+            book = BookBulkUpdate.model_validate(book_in)
+            # Fields are NOT NULL, so an explicit null leaves the field untouched
+            valid.append((index, book.model_dump(exclude_unset=True, exclude_none=True)))
+        except ValidationError as e:
+            results.append(BulkItemResult(
+                index=index,
+                status=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail=validation_detail(e),
+            ))
+
+    author_ids = await books.get_author_ids(db, [book["id"] for _, book in valid])
+    updates = []
+    for index, book in valid:
+        result = ownership_result(index, book["id"], author_ids, current_user)
+        if result.status == status.HTTP_200_OK and len(book) > 1:
+            updates.append(book)
+        results.append(result)
+
+    await books.update_many(db, updates)
+    return BulkResult(results=sorted(results, key=lambda result: result.index))
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def delete_books_bulk(
+    *,
+    db: DBSession = Depends(get_db),
+    book_ids: List[UUID] = Body(...),
+    current_user: Users = Depends(get_current_user),
+):
+    """Delete many books with one statement (author of each book only)"""
+    check_batch_size(book_ids)
+
+    author_ids = await books.get_author_ids(db, book_ids)
+    results = [
+        ownership_result(index, book_id, author_ids, current_user)
+        for index, book_id in enumerate(book_ids)
+    ]
+    await books.delete_many(db, list({
+        result.id for result in results if result.status == status.HTTP_200_OK
+    }))
+    return BulkResult(results=results)
+
+
+def ownership_result(
+    index: int, book_id: UUID, author_ids: dict, current_user: Users
+) -> BulkItemResult:
+    """Check a bulk item the way the single-item endpoints do"""
+    if book_id not in author_ids:
+        return BulkItemResult(
+            index=index,
+            status=status.HTTP_404_NOT_FOUND,
+            id=book_id,
+            detail="Book not found",
+        )
+    if author_ids[book_id] != current_user.id:
+        return BulkItemResult(
+            index=index,
+            status=status.HTTP_403_FORBIDDEN,
+            id=book_id,
+            detail="Only the author can modify this book",
+        )
+    return BulkItemResult(index=index, status=status.HTTP_200_OK, id=book_id)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_books(
+    format: ExportFormat = "ndjson",
+    author_id: Optional[UUID] = None,
+    db: DBSession = Depends(get_read_session),
+    _: Users = Depends(get_current_user),
+):
+    """
+    Export all books (of `author_id` when given) as NDJSON or CSV.
+    Rows are read in batches through a server-side cursor and sent as they
+    are encoded, so memory use does not grow with the size of the catalogue.
+    The session is closed once the last batch has been sent.
+    """
+    async def body():
+        if format == "csv":
+            yield csv_lines((), header=[column.key for column in EXPORT_COLUMNS])
+        async for partition in books.stream_export(
+            db, author_id, batch_size=settings.EXPORT_BATCH_SIZE
+        ):
+            yield csv_lines(partition) if format == "csv" else ndjson_lines(partition)
+
+    return StreamingResponse(
+        body(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="books.{format}"'},
     )
 
 
 @router.get("/{book_id}", response_model=Books)
-def get_book(
+async def get_book(
+    request: Request,
+    response: Response,
     book_id: UUID,
-    db: Session = Depends(get_session),
+    db: DBSession = Depends(get_read_session),
     _: Users = Depends(get_current_user),
 ):
-    """Get a specific book by ID"""
-    db_book = books.get(db, book_id)
+    """Get a specific book by ID, 304 if If-None-Match holds its current ETag"""
+    db_book = await books.get(db, book_id)
     if not db_book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Book not found",
         )
-    return db_book
+    return revalidate(request, response, book_etag(db_book)) or db_book
+
+
+@router.get("/{book_id}/content", response_model=BookContent)
+async def get_book_content(
+    book_id: UUID,
+    db: DBSession = Depends(get_read_session),
+    _: Users = Depends(get_current_user),
+):
+    """Get only the content of a book, for clients listing summaries"""
+    content = await books.get_content(db, book_id)
+    if not content:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    return content
 
 
 @router.post("", response_model=Books)
-def create_book(
+async def create_book(
     *,
-    db: Session = Depends(get_session),
-    book_in: dict,
+    db: DBSession = Depends(get_db),
+    book_in: BookCreate,
     current_user: Users = Depends(get_current_user),
 ):
     """Create a new book (authors only)"""
@@ -66,19 +390,20 @@ def create_book(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only authors can create books",
         )
-    return books.create_book(db, book_in, current_user)
+    return await books.create_book(db, book_in.model_dump(), current_user)
 
 
 @router.put("/{book_id}", response_model=Books)
-def update_book(
+async def update_book(
     *,
-    db: Session = Depends(get_session),
+    db: DBSession = Depends(get_db),
     book_id: UUID,
-    book_in: dict,
+    book_in: BookUpdate,
     current_user: Users = Depends(get_current_user),
 ):
     """Update a book (author of the book only)"""
-    db_book = books.get(db, book_id)
+    # Not through book_cache, the check must see the current owner
+    db_book = await books.get_uncached(db, book_id)
     if not db_book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,18 +414,28 @@ def update_book(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the author can modify this book",
         )
-    return books.update(db, book_id, book_in)
+    # Like PATCH /bulk, an explicit null leaves the field untouched
+    updated = await books.update(
+        db, book_id, book_in.model_dump(exclude_unset=True, exclude_none=True)
+    )
+    if not updated:
+        # Deleted concurrently
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    return updated
 
 
 @router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_book(
+async def delete_book(
     *,
-    db: Session = Depends(get_session),
+    db: DBSession = Depends(get_db),
     book_id: UUID,
     current_user: Users = Depends(get_current_user),
 ):
     """Delete a book (author of the book only)"""
-    db_book = books.get(db, book_id)
+    db_book = await books.get_uncached(db, book_id)
     if not db_book:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -111,4 +446,8 @@ def delete_book(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only the author can delete this book",
         )
-    books.delete(db, book_id) 
\ No newline at end of file
+    if not await books.delete(db, book_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
@@ -0,0 +1,62 @@
+from typing import List, Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.exc import IntegrityError
+
+from db.crud.books import async_books as books
+from db.crud.favorites import async_favorites as favorites
+from db.database import DBSession, get_db, get_read_session
+from db.models import Books, Users
+from v1.dependencies import get_current_user
+from v1.pagination import paginate
+from v1.serialization import json_list
+
+router = APIRouter(prefix="/favorites", tags=["favorites"])
+
+
+@router.get("", response_model=List[Books])
+async def get_favorites(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: Users = Depends(get_current_user),
+):
+    """Get the books favorited by the current user (see get_books for cursor pagination)"""
+    page = await paginate(
+        response, lambda c: favorites.get_books_page(db, current_user.id, c, limit), cursor
+    )
+    return json_list(response, page, Books)
+
+
+@router.put("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def add_favorite(
+    book_id: UUID,
+    db: DBSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user),
+):
+    """Save a book to the current user's favorites, idempotent"""
+    # Not through book_cache, a book deleted by another worker may still be cached
+    if not await books.get_uncached(db, book_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+    try:
+        await favorites.add(db, current_user.id, book_id)
+    except IntegrityError:
+        # Deleted since the check
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Book not found",
+        )
+
+
+@router.delete("/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_favorite(
+    book_id: UUID,
+    db: DBSession = Depends(get_db),
+    current_user: Users = Depends(get_current_user),
+):
+    """Remove a book from the current user's favorites, idempotent"""
+    await favorites.remove(db, current_user.id, book_id)
@@ -1,50 +1,90 @@
-from typing import List
+from typing import List, Literal, Optional, Union
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
-from db.crud.users import users
-from db.database import get_session
-from db.models import Users
+from db.crud.author_stats import async_author_stats as author_stats
+from db.crud.users import async_users as users
+from db.database import DBSession, get_read_session
+from db.models import AuthorRanking, UserDetail, Users
 from v1.dependencies import get_current_user
+from v1.pagination import paginate
+from v1.serialization import json_list
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
-@router.get("/all", response_model=List[Users])
-def get_users(
+@router.get("/all", response_model=Union[List[Users], List[UserDetail]])
+async def get_users(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    include_books: bool = False,
+    db: DBSession = Depends(get_read_session),
     _: Users = Depends(get_current_user),
 ):
-    """Get all users"""
-    all_users = users.get_multi(db, skip=skip, limit=limit)
-    return all_users
+    """
+    Get all users (see get_books for cursor pagination).
+    With `include_books` every user comes with their book summaries.
+    """
+    if include_books:
+        if skip and not cursor:
+            page = await users.get_details(db, skip=skip, limit=limit)
+        else:
+            page = await paginate(
+                response, lambda c: users.get_details_page(db, c, limit), cursor
+            )
+        return json_list(response, page, UserDetail)
+    if skip and not cursor:
+        page = await users.get_multi(db, skip=skip, limit=limit)
+    else:
+        page = await paginate(
+            response, lambda c: users.get_page(db, c, limit), cursor
+        )
+    return json_list(response, page, Users)
 
 
 @router.get("/me", response_model=Users)
-def get_current_user_info(
+async def get_current_user_info(
     current_user: Users = Depends(get_current_user),
 ):
     """Get information about the currently authenticated user"""
     return current_user
 
 
-@router.get("/{user_id}", response_model=Users)
-def get_user(
+@router.get("/leaderboard", response_model=List[AuthorRanking])
+async def get_authors_leaderboard(
+    by: Literal["books", "published"] = "books",
+    limit: int = Query(10, ge=1, le=100),
+    db: DBSession = Depends(get_read_session),
+    _: Users = Depends(get_current_user),
+):
+    """Authors with the most books (or published books)"""
+    return await author_stats.get_leaderboard(db, by, limit)
+
+
+@router.get("/{user_id}", response_model=UserDetail)
+async def get_user(
     user_id: UUID,
-    db: Session = Depends(get_session),
+    books_cursor: Optional[str] = None,
+    books_limit: int = Query(20, ge=1, le=100),
+    db: DBSession = Depends(get_read_session),
     _: Users = Depends(get_current_user),
 ):
-    """Get a specific user and their books (if they are an author)"""
-    user = users.get(db, user_id)
+    """
+    Get a specific user and a page of their books (if they are an author).
+    Pass `books_next_cursor` back as `books_cursor` for the next page.
+    """
+    try:
+        user = await users.get_detail(db, user_id, books_cursor, books_limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    
-    # Books will be included in the response due to the relationship 
-    # (if user is an author)
     return user
@@ -0,0 +1,52 @@
+import hashlib
+from typing import Any, Optional, Sequence
+from fastapi import Request, Response, status
+
+# Responses depend on the caller's token, so only the browser may keep them,
+# and it must revalidate with If-None-Match before reusing one
+CACHE_CONTROL = "private, no-cache"
+
+
+def book_etag(book: Any) -> str:
+    """ETag of a single book, `version` is bumped by every UPDATE"""
+    return f'"{book.id}-{book.version}"'
+
+
+def page_etag(rows: Sequence[Any], *parts: Optional[str]) -> str:
+    """
+    ETag of a page of books (full or summaries) built from the id and version
+    of each row, so it changes when a row is updated, added or removed.
+    `parts` distinguish representations of the same rows (e.g. the view).
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(f"{part}|".encode())
+    for row in rows:
+        digest.update(f"{row.id}:{row.version};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def revalidate(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """
+    Set the ETag of the response. Returns an empty 304 for the handler to
+    send instead (skipping serialization) when the client already holds
+    the current version, None otherwise.
+    """
+    if etag_matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": CACHE_CONTROL},
+        )
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return None
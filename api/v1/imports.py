@@ -0,0 +1,125 @@
+"""
+Incremental parsing of the NDJSON and CSV uploads of POST /books/import.
+
+The request body is read chunk by chunk and rows are yielded as soon as
+their line is complete, so besides the current chunk at most one line (or
+CSV record) of `max_bytes` is held in memory. Rows are yielded as
+(line number, row, error) with either `row` or `error` set.
+"""
+import csv
+import io
+import json
+from typing import AsyncIterator, Optional, Tuple
+
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_bytes: int
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a byte stream into numbered lines. A line longer than `max_bytes`
+    is yielded once as None and the rest of it is skipped.
+    """
+    buffer = bytearray()
+    number = 1
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b"\n", start)) != -1:
+            piece = chunk[start:end]
+            if skipping:
+                skipping = False
+            elif len(buffer) + len(piece) > max_bytes:
+                yield number, None
+            else:
+                buffer += piece
+                yield number, bytes(buffer).removesuffix(b"\r")
+            buffer.clear()
+            number += 1
+            start = end + 1
+        rest = chunk[start:]
+        if skipping:
+            continue
+        if len(buffer) + len(rest) > max_bytes:
+            yield number, None
+            buffer.clear()
+            skipping = True
+        else:
+            buffer += rest
+    if buffer and not skipping:
+        yield number, bytes(buffer).removesuffix(b"\r")
+
+
+def _decode(line: bytes) -> Tuple[Optional[str], Optional[str]]:
+    try:
+        return line.decode("utf-8-sig"), None
+    except UnicodeDecodeError:
+        return None, "Line is not valid UTF-8"
+
+
+async def parse_ndjson(
+    lines: AsyncIterator[Tuple[int, Optional[bytes]]], max_bytes: int
+) -> AsyncIterator[ParsedRow]:
+    """One JSON object per line, blank lines are skipped"""
+    async for number, line in lines:
+        if line is None:
+            yield number, None, f"Line exceeds {max_bytes} bytes"
+            continue
+        text, error = _decode(line)
+        if error:
+            yield number, None, error
+            continue
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, row, None
+
+
+async def parse_csv(
+    lines: AsyncIterator[Tuple[int, Optional[bytes]]], max_bytes: int
+) -> AsyncIterator[ParsedRow]:
+    """
+    CSV with a header row. Quoted fields may span lines: a record is
+    complete once its quotes are balanced. Empty fields are left out of the
+    row, so optional columns keep their defaults.
+    """
+    header = None
+    record, first_line = "", 0
+    async for number, line in lines:
+        if line is None:
+            yield number, None, f"Line exceeds {max_bytes} bytes"
+            record = ""
+            continue
+        text, error = _decode(line)
+        if error:
+            yield number, None, error
+            record = ""
+            continue
+        if not record:
+            first_line = number
+        record += text + "\n"
+        if record.count('"') % 2:
+            if len(record) > max_bytes:
+                yield first_line, None, f"Record exceeds {max_bytes} bytes"
+                record = ""
+            continue
+        values, record = next(csv.reader(io.StringIO(record)), []), ""
+        if not values:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield first_line, None, f"Expected {len(header)} fields, got {len(values)}"
+            continue
+        yield first_line, {name: value for name, value in zip(header, values) if value != ""}, None
+    if record:
+        yield first_line, None, "Unterminated quoted field"
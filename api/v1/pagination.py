@@ -0,0 +1,23 @@
+from typing import Awaitable, Callable, List, Optional, Tuple
+from fastapi import HTTPException, Response, status
+
+# Response header carrying the opaque cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+async def paginate(
+    response: Response,
+    fetch_page: Callable[[Optional[str]], Awaitable[Tuple[List, Optional[str]]]],
+    cursor: Optional[str] = None,
+) -> List:
+    """Run a keyset page query and expose the next cursor as a response header"""
+    try:
+        items, next_cursor = await fetch_page(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return items